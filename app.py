@@ -1,34 +1,42 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
+from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Any
 import asyncio
+import functools
 import json
 import logging
-import pandas as pd
-import numpy as np
 import random
-from datetime import datetime, timedelta
+import time
+import zlib
+from datetime import datetime
 import os
-import pathlib
+from collections import OrderedDict
 
 # Import custom modules
 from meuRobo.iq_option_connector import IQOptionConnector
-from meuRobo.strategy import StochasticStrategy
+from meuRobo.strategy import StreamingStochasticStrategy
 from meuRobo.money_management import MoneyManager
+from meuRobo.settlement_tracker import SettlementTracker
+from meuRobo.async_connector import AsyncConnector
+from meuRobo.candle_archive import CandleArchive
+from meuRobo.optimizer import (PARAM_SPACE, ParameterOptimizer, grid_candidates, load_params,
+                               random_candidates, save_params)
+from meuRobo.connection_supervisor import get_supervisor
+from meuRobo.session_manager import (DEFAULT_CONFIG, DEFAULT_SESSION, FairExecutor, SessionManager,
+                                     new_daily_result)
+from meuRobo.risk_simulator import RiskSimulator
+from meuRobo.session_recording import RecordingConnector, ReplaySession, SessionRecorder, SessionRecording
+from meuRobo.sharded_analysis import STRATEGY_PARAMS, ShardedAnalyzer
+from meuRobo.state_protocol import ENCODINGS, PROTOCOLS, StateDocument, encode, state_changes
+from meuRobo.logging_config import setup_logging, log_event, paused_events
+from meuRobo.metrics import (REGISTRY, STAGE_SECONDS, SETTLEMENT_SECONDS, CYCLES, SIGNALS, ORDERS, ERRORS,
+                             paused_metrics)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("trading_bot.log"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger("robo-trader")
+# Configure logging: records are queued and written (with rotation) by a background thread
+logger = setup_logging("trading_bot.log")
 
 # Initialize FastAPI app
 app = FastAPI(title="IQ Option Robot")
@@ -40,66 +48,243 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # The dashboard revalidates the history with it
 )
 
 # Serve static files
 app.mount("/static", StaticFiles(directory="."), name="static")
 
-# Global state
-iq_connector = None
-active_bot = False
-operation_history = []
-current_config = {
-    "assets": [],
-    "account_type": "PRACTICE",
-    "candle_time": 60,  # seconds
-    "expiration_time": 5,  # minutes
-    "money_management": "flat",
-    "entry_amount": 2,
-    "stop_gain": 50,
-    "stop_loss": 30,
-}
-daily_result = {
-    "total_operations": 0,
-    "wins": 0,
-    "losses": 0,
-    "win_rate": 0,
-    "profit_loss": 0,
-    "max_profit": 0,
-    "max_loss": 0,
-    "max_amount": 0,
-    "min_amount": float('inf'),
-    "current_balance": 0,
-    "is_running": False
-}
-
 # WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+class ClientConnection:
+    """
+    Outgoing message queue of one dashboard, drained by its own writer task.
+    
+    State messages ('update', and 'analysis' per asset) are coalesced: a newer
+    one replaces the pending one. When the queue is full the oldest state
+    message is dropped. Deltas cannot be dropped, so a delta client whose
+    queue is full gets its backlog replaced by a fresh snapshot; any other
+    client whose queue is full of messages that cannot be dropped is too slow
+    and gets disconnected.
+    """
+    
+    COALESCED_TYPES = ("update", "analysis", "state")
+    
+    def __init__(self, websocket: WebSocket, on_dead, max_queue: int = 100, send_timeout: float = 10.0,
+                 protocol: str = "full", encoding: str = "json", resync=None):
+        self.websocket = websocket
+        self.on_dead = on_dead
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.protocol = protocol
+        self.encoding = encoding
+        self.resync = resync  # Returns an encoded snapshot (delta protocol)
+        self.pending: "OrderedDict[Any, Any]" = OrderedDict()
+        self.dropped = 0
+        self._sequence = 0
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop())
+    
+    def enqueue(self, message_type: Optional[str], key: Optional[str], payload) -> bool:
+        """Queue a serialized message (text or bytes); returns False if the client must be evicted"""
+        if message_type in self.COALESCED_TYPES:
+            queue_key = (message_type, key)
+        else:
+            self._sequence += 1
+            queue_key = self._sequence
+        
+        self.pending[queue_key] = payload
+        
+        if len(self.pending) > self.max_queue:
+            coalescible = next((k for k in self.pending if isinstance(k, tuple)), None)
+            if coalescible is not None:
+                del self.pending[coalescible]
+                self.dropped += 1
+            elif self.resync is not None:
+                # Start over from the current state
+                self.dropped += len(self.pending)
+                self.pending.clear()
+                self.pending["snapshot"] = self.resync()
+            else:
+                return False
+        
+        self._ready.set()
+        return True
+    
+    async def _write_loop(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self.pending:
+                    _, payload = self.pending.popitem(last=False)
+                    if isinstance(payload, bytes):
+                        send = self.websocket.send_bytes(payload)
+                    else:
+                        send = self.websocket.send_text(payload)
+                    await asyncio.wait_for(send, self.send_timeout)
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Dropping dashboard connection: {str(e) or type(e).__name__}")
+            self.on_dead(self.websocket)
+    
+    def close(self):
+        self._writer.cancel()
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
 
+class ConnectionManager:
+    """
+    Dashboard connections and the messages broadcast to them.
+    
+    Clients pick a protocol when connecting: 'full' gets every message as
+    broadcast, 'delta' gets a snapshot of the session state once and then only
+    the changed fields, each delta with the next sequence number. Delta
+    clients may ask for MessagePack instead of JSON.
+    """
+    
+    def __init__(self, max_queue: int = 100, send_timeout: float = 10.0):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.subscriptions: Dict[WebSocket, str] = {}  # Session each dashboard watches
+        self.states: Dict[str, StateDocument] = {}  # Dashboard state of each session
+    
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
+    
+    async def connect(self, websocket: WebSocket, session_id: str = DEFAULT_SESSION,
+                      protocol: str = "full", encoding: str = "json"):
+        await websocket.accept()
+        resync = None
+        if protocol == "delta":
+            resync = functools.partial(self.encoded_snapshot, session_id, encoding)
+        self.clients[websocket] = ClientConnection(websocket, self.disconnect, self.max_queue,
+                                                   self.send_timeout, protocol, encoding, resync)
+        self.subscriptions[websocket] = session_id
+        if protocol == "delta":
+            self.send_snapshot(websocket)
+    
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
+        self.subscriptions.pop(websocket, None)
+        client = self.clients.pop(websocket, None)
+        if client is not None:
+            client.close()
+    
+    def _enqueue(self, websocket: WebSocket, message_type: Optional[str], key: Optional[str], payload):
+        client = self.clients.get(websocket)
+        if client is not None and not client.enqueue(message_type, key, payload):
+            logger.warning("Dashboard client too slow, disconnecting")
+            self.disconnect(websocket)
+    
+    def state(self, session_id: str) -> StateDocument:
+        document = self.states.get(session_id)
+        if document is None:
+            document = self.states[session_id] = StateDocument()
+        return document
+    
+    def encoded_snapshot(self, session_id: str, encoding: str):
+        return encode(self.state(session_id).snapshot(session_id), encoding)
+    
+    def send_snapshot(self, websocket: WebSocket):
+        """Queue the full state of the client's session (delta protocol)"""
+        client = self.clients.get(websocket)
+        if client is not None:
+            self._enqueue(websocket, "snapshot", None,
+                          self.encoded_snapshot(self.subscriptions[websocket], client.encoding))
+    
+    def publish(self, session_id: str, changes: Dict):
+        """Merge changes into the session state and queue the delta for its delta clients"""
+        delta = self.state(session_id).apply(changes)
+        if delta is not None:
+            self._send_delta_clients(session_id, delta)
+    
+    def _send_delta_clients(self, session_id: Optional[str], message: Dict):
+        # Serialize once per encoding in use
+        encoded = {}
+        for websocket, subscription in list(self.subscriptions.items()):
+            client = self.clients.get(websocket)
+            if client is None or client.protocol != "delta":
+                continue
+            if session_id is not None and subscription != session_id:
+                continue
+            payload = encoded.get(client.encoding)
+            if payload is None:
+                payload = encoded[client.encoding] = encode(message, client.encoding)
+            self._enqueue(websocket, message["type"], None, payload)
+    
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+        for websocket in list(self.clients):
+            self._enqueue(websocket, None, None, message)
             
-    async def broadcast_json(self, data: Dict):
-        for connection in self.active_connections:
-            await connection.send_json(data)
+    async def broadcast_json(self, data: Dict, session_id: Optional[str] = None):
+        """
+        Serialize once and queue for every client (watching session_id, if given);
+        never waits on network writes
+        """
+        with STAGE_SECONDS.labels("broadcast").time():
+            # State changes become deltas of the session state; events go out as they are
+            changes, event = state_changes(data)
+            if changes is not None and session_id is not None:
+                self.publish(session_id, changes)
+            if event is not None:
+                self._send_delta_clients(session_id, event)
+            
+            if session_id is not None:
+                data = dict(data, session_id=session_id)
+            text = None
+            message_type, key = data.get("type"), data.get("asset")
+            for websocket, subscription in list(self.subscriptions.items()):
+                if self.clients[websocket].protocol != "full":
+                    continue
+                if session_id is None or subscription == session_id:
+                    if text is None:
+                        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+                    self._enqueue(websocket, message_type, key, text)
+    
+    async def send_json(self, websocket: WebSocket, data: Dict):
+        """Queue a message for a single client"""
+        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        self._enqueue(websocket, data.get("type", "state"), data.get("asset"), text)
 
 manager = ConnectionManager()
 
+# Worker pool for the blocking iqoptionapi calls, shared round-robin by the sessions
+CONNECTOR_WORKERS = 8
+connector_executor = FairExecutor(max_workers=CONNECTOR_WORKERS, thread_name_prefix="iq-connector")
+
+# Optional analysis in worker processes over shared-memory candle buffers (0 = in the event loop)
+ANALYSIS_WORKERS = int(os.environ.get("ROBO_TRADER_ANALYSIS_WORKERS", "0"))
+sharded_analyzer = None
+analysis_lock = asyncio.Lock()
+
+def get_sharded_analyzer(strategy):
+    """The shared ShardedAnalyzer, started on first use; None when analysis runs in-process"""
+    global sharded_analyzer
+    if ANALYSIS_WORKERS > 0 and sharded_analyzer is None:
+        sharded_analyzer = ShardedAnalyzer(strategy, workers=ANALYSIS_WORKERS)
+    return sharded_analyzer
+
+# Optional on-disk candle history shared by every connector (unset = always download)
+CANDLE_ARCHIVE_DIR = os.environ.get("ROBO_TRADER_CANDLE_ARCHIVE")
+candle_archive = CandleArchive(CANDLE_ARCHIVE_DIR) if CANDLE_ARCHIVE_DIR else None
+
+# Strategy parameters written by /api/optimize, loaded when a trading loop starts
+STRATEGY_PARAMS_FILE = os.environ.get("ROBO_TRADER_STRATEGY_PARAMS", "strategy_params.json")
+
+# Optional recording of every session's broker responses, replayed by /api/replay (unset = no recording)
+RECORDING_DIR = os.environ.get("ROBO_TRADER_RECORDINGS")
+
+# Trading sessions, one per account; requests without a session_id use the default session
+sessions = SessionManager(connector_executor, os.environ.get("ROBO_TRADER_HISTORY_DB", "operation_history.db"))
+sessions.get_or_create(DEFAULT_SESSION)
+
 # Data models
 class LoginRequest(BaseModel):
     account_type: str
     email: str
     password: str
+    session_id: Optional[str] = None  # When null, use the query parameter (or the default session)
 
 class ConfigRequest(BaseModel):
     assets: List[str]
@@ -109,10 +294,53 @@ class ConfigRequest(BaseModel):
     entry_amount: float
     stop_gain: float
     stop_loss: float
+    settle_delay: float = DEFAULT_CONFIG["settle_delay"]
 
 class TestEntryRequest(BaseModel):
     direction: Optional[str] = None  # When null, randomly choose
 
+class SimulationRequest(BaseModel):
+    win_probability: float
+    payout: float = 0.8
+    sessions: int = 100000
+    trades_per_session: int = 100
+    draw_probability: float = 0.0
+    bankroll: Optional[float] = None
+    seed: Optional[int] = None
+    # When null, use the configuration of the session
+    money_management: Optional[str] = None
+    entry_amount: Optional[float] = None
+    stop_gain: Optional[float] = None
+    stop_loss: Optional[float] = None
+
+class OptimizeRequest(BaseModel):
+    assets: Optional[List[str]] = None  # When null, the assets of the session
+    days: float = 7
+    search: str = "grid"  # 'grid' or 'random'
+    samples: int = 100  # Random search only
+    seed: Optional[int] = None
+    folds: int = 4  # Walk-forward folds, 0 for none
+    train_fraction: float = 0.5
+    objective: str = "profit_loss"
+    min_trades: int = 10
+    space: Optional[Dict[str, List[float]]] = None  # When null, PARAM_SPACE
+
+class ReplayRequest(BaseModel):
+    recording: str  # File name in the recordings directory
+    run: int = 0  # Trading loop run of the recording (each start of the bot is a run)
+    speed: Optional[float] = None  # 1 replays in real time; when null, as fast as possible
+
+def _not_logged_in():
+    return JSONResponse(status_code=401, content={"message": "Not logged in"})
+
+def _broker_timeout():
+    return JSONResponse(status_code=504, content={"message": "The broker did not respond in time"})
+
+def _logged_in_session(session_id: str):
+    """Session with a connected account, or None"""
+    session = sessions.get(session_id)
+    return session if session is not None and session.logged_in else None
+
 # Root route to serve the HTML file
 @app.get("/", response_class=HTMLResponse)
 async def get_index():
@@ -120,9 +348,7 @@ async def get_index():
 
 # API Routes
 @app.post("/api/login")
-async def login(req: LoginRequest):
-    global iq_connector, daily_result
-    
+async def login(req: LoginRequest, session_id: str = DEFAULT_SESSION):
     try:
         # Use credentials from request instead of prompting
         email = req.email
@@ -131,55 +357,97 @@ async def login(req: LoginRequest):
         if not email or not password:
             return JSONResponse(status_code=400, content={"message": "Email and password are required"})
         
+        try:
+            session = sessions.get_or_create(req.session_id or session_id)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"message": str(e)})
+        
+        # Logging in again replaces the session's account
+        session.logout()
+        
         # Initialize connector
-        iq_connector = IQOptionConnector(email, password)
-        connected = iq_connector.connect()
+        connector = IQOptionConnector(email, password, candle_archive=candle_archive)
+        broker = AsyncConnector(connector, session.executor)
+        connected = await broker.connect()
         
         if not connected:
-            error_message = iq_connector.get_last_error()
+            error_message = connector.get_last_error()
             logger.error(f"Login failed: {error_message}")
             return JSONResponse(status_code=401, content={"message": error_message})
         
+        if RECORDING_DIR:
+            os.makedirs(RECORDING_DIR, exist_ok=True)
+            session.recorder = SessionRecorder(
+                os.path.join(RECORDING_DIR, f"{session.session_id}-{time.strftime('%Y%m%d-%H%M%S')}.rec"),
+                meta={"session_id": session.session_id, "account_type": req.account_type})
+            connector = RecordingConnector(connector, session.recorder)
+        
+        session.connector = connector
+        get_supervisor().watch(connector, f"{session.session_id}:{email}")
+        session.settlement_tracker = SettlementTracker(
+            connector, functools.partial(on_trade_settled, session), executor=session.executor)
+        
         # Set account type
-        iq_connector.select_account(req.account_type)
-        current_config["account_type"] = req.account_type
+        await session.broker.select_account(req.account_type)
+        session.config["account_type"] = req.account_type
         
         # Get initial balance
-        balance = iq_connector.get_balance()
-        daily_result["current_balance"] = balance
+        balance = await session.broker.get_balance()
+        session.daily_result["current_balance"] = balance
         
-        return {"message": "Login successful", "balance": balance}
+        return {"message": "Login successful", "balance": balance, "session_id": session.session_id}
     
+    except asyncio.TimeoutError:
+        return _broker_timeout()
     except Exception as e:
         logger.error(f"Login error: {str(e)}")
         return JSONResponse(status_code=500, content={"message": f"Error: {str(e)}"})
 
+@app.get("/api/sessions")
+async def list_sessions():
+    return {"sessions": sessions.list()}
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Stop the session's trading and log its account out"""
+    if not sessions.remove(session_id):
+        return JSONResponse(status_code=404, content={"message": "Session not found"})
+    manager.states.pop(session_id, None)
+    if session_id == DEFAULT_SESSION:
+        sessions.get_or_create(DEFAULT_SESSION)
+    return {"message": "Session closed"}
+
 @app.post("/api/config")
-async def set_config(config: ConfigRequest):
-    global current_config
-    
-    if not iq_connector:
-        return JSONResponse(status_code=401, content={"message": "Not logged in"})
+async def set_config(config: ConfigRequest, session_id: str = DEFAULT_SESSION):
+    session = _logged_in_session(session_id)
+    if not session:
+        return _not_logged_in()
     
-    current_config.update({
+    session.config.update({
         "assets": config.assets,
         "candle_time": config.candle_time,
         "expiration_time": config.expiration_time,
         "money_management": config.money_management,
         "entry_amount": config.entry_amount,
         "stop_gain": config.stop_gain,
-        "stop_loss": config.stop_loss
+        "stop_loss": config.stop_loss,
+        "settle_delay": max(config.settle_delay, 0)
     })
     
     return {"message": "Configuration updated"}
 
 @app.get("/api/assets")
-async def get_assets():
-    if not iq_connector:
-        return JSONResponse(status_code=401, content={"message": "Not logged in"})
+async def get_assets(session_id: str = DEFAULT_SESSION):
+    session = _logged_in_session(session_id)
+    if not session:
+        return _not_logged_in()
     
-    digital_assets = iq_connector.get_available_assets("digital")
-    binary_assets = iq_connector.get_available_assets("binary")
+    try:
+        digital_assets, binary_assets = await asyncio.gather(
+            session.broker.get_available_assets("digital"),
+            session.broker.get_available_assets("binary"))
+    except asyncio.TimeoutError:
+        return _broker_timeout()
     
     return {
         "digital": digital_assets,
@@ -187,40 +455,44 @@ async def get_assets():
     }
 
 @app.post("/api/start")
-async def start_bot():
-    global active_bot
-    
-    if not iq_connector:
-        return JSONResponse(status_code=401, content={"message": "Not logged in"})
+async def start_bot(session_id: str = DEFAULT_SESSION):
+    session = _logged_in_session(session_id)
+    if not session:
+        return _not_logged_in()
     
-    if not current_config["assets"]:
+    if not session.config["assets"]:
         return JSONResponse(status_code=400, content={"message": "No assets selected"})
     
-    active_bot = True
-    daily_result["is_running"] = True
+    session.active = True
+    session.daily_result["is_running"] = True
+    log_event("bot_started", session_id=session.session_id, config=dict(session.config))
     
-    # Start the trading loop in a background task
-    asyncio.create_task(trading_loop())
+    # Start the trading loop in a background task (unless the previous one is still running)
+    if not session.running:
+        session.task = asyncio.create_task(trading_loop(session))
     
     return {"message": "Bot started"}
 
 @app.post("/api/stop")
-async def stop_bot():
-    global active_bot
+async def stop_bot(session_id: str = DEFAULT_SESSION):
+    session = sessions.get(session_id)
+    if session is None:
+        return JSONResponse(status_code=404, content={"message": "Session not found"})
     
-    active_bot = False
-    daily_result["is_running"] = False
+    session.stop()
+    log_event("bot_stopped", session_id=session.session_id, reason="user")
     
     return {"message": "Bot stopped"}
 
 @app.post("/api/test-entry")
-async def test_entry(req: TestEntryRequest):
-    if not iq_connector:
-        return JSONResponse(status_code=401, content={"message": "Not logged in"})
+async def test_entry(req: TestEntryRequest, session_id: str = DEFAULT_SESSION):
+    session = _logged_in_session(session_id)
+    if not session:
+        return _not_logged_in()
     
     try:
         # Get available assets
-        available_assets = iq_connector.get_available_assets("digital")
+        available_assets = await session.broker.get_available_assets("digital")
         
         if not available_assets:
             return JSONResponse(status_code=400, content={"message": "No assets available"})
@@ -233,8 +505,8 @@ async def test_entry(req: TestEntryRequest):
         if not direction:
             direction = random.choice(["call", "put"])
         
-        # Execute trade with fixed amount ($2)
-        result = await execute_trade(asset, 2, direction, current_config["expiration_time"])
+        # Place trade with fixed amount ($2); test entries are not added to the statistics
+        result = await execute_trade(session, asset, 2, direction, session.config["expiration_time"], record=False)
         
         return {
             "message": "Test entry executed",
@@ -243,163 +515,532 @@ async def test_entry(req: TestEntryRequest):
             "result": result
         }
     
+    except asyncio.TimeoutError:
+        return _broker_timeout()
     except Exception as e:
         logger.error(f"Test entry error: {str(e)}")
         return JSONResponse(status_code=500, content={"message": f"Error: {str(e)}"})
 
 @app.get("/api/history")
-async def get_history():
-    return {"history": operation_history}
+async def get_history(request: Request, limit: int = 50, cursor: Optional[int] = None,
+                      start: Optional[str] = None, end: Optional[str] = None,
+                      asset: Optional[str] = None, order: str = "desc",
+                      session_id: str = DEFAULT_SESSION):
+    """
+    One page of the operation history, newest first by default.
+    
+    Pass the returned next_cursor as cursor to get the following page.
+    start/end filter by time (ISO format or epoch seconds).
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        return JSONResponse(status_code=404, content={"message": "Session not found"})
+    history_store = session.history_store
+    
+    # The history only changes on appends and clears, so its version and the
+    # query identify a page: the ETag of one query never validates another
+    limit = max(1, min(limit, 500))
+    query = zlib.crc32(repr((limit, cursor, start, end, asset, order)).encode())
+    etag = f'W/"{history_store.version}-{query:08x}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    try:
+        page = history_store.query(
+            limit=limit, cursor=cursor,
+            start=_parse_time(start), end=_parse_time(end), asset=asset, order=order)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": f"Invalid time filter: {str(e)}"})
+    
+    return JSONResponse(content=page, headers={"ETag": etag})
+
+def _parse_time(value: Optional[str]):
+    """Time query parameter: epoch seconds or ISO format"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).isoformat()
+
+@app.get("/api/stats")
+async def get_stats(asset: Optional[str] = None, direction: Optional[str] = None,
+                    session_id: str = DEFAULT_SESSION):
+    """Overall, per asset and per direction statistics with hourly/daily and rolling windows"""
+    session = sessions.get(session_id)
+    if session is None:
+        return JSONResponse(status_code=404, content={"message": "Session not found"})
+    return session.stats.snapshot(asset=asset, direction=direction)
+
+@app.post("/api/simulate")
+async def simulate(req: SimulationRequest, session_id: str = DEFAULT_SESSION):
+    """Monte Carlo risk of ruin of a money management configuration"""
+    if not 0 < req.sessions <= 1000000 or not 0 < req.trades_per_session <= 1000:
+        return JSONResponse(status_code=400, content={"message": "Invalid number of sessions or trades"})
+    
+    session = sessions.get(session_id)
+    config = session.config if session is not None else DEFAULT_CONFIG
+    money_manager = MoneyManager(
+        strategy=req.money_management or config["money_management"],
+        base_amount=req.entry_amount if req.entry_amount is not None else config["entry_amount"],
+        stop_gain=req.stop_gain if req.stop_gain is not None else config["stop_gain"],
+        stop_loss=req.stop_loss if req.stop_loss is not None else config["stop_loss"]
+    )
+    simulator = RiskSimulator(money_manager)
+    
+    try:
+        # CPU bound: keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+            simulator.run, req.win_probability, req.payout, req.sessions, req.trades_per_session,
+            req.draw_probability, req.bankroll, req.seed))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+
+@app.post("/api/optimize")
+async def optimize(req: OptimizeRequest, session_id: str = DEFAULT_SESSION):
+    """Search strategy parameters on the account's candle history and save the best ones for the trading loop"""
+    session = _logged_in_session(session_id)
+    if session is None:
+        return _not_logged_in()
+    if req.search not in ("grid", "random") or not 0 < req.days <= 365 or not 0 <= req.folds <= 20 \
+            or not 0 < req.train_fraction < 1 or req.samples < 1:
+        return JSONResponse(status_code=400, content={"message": "Invalid search settings"})
+    if req.space is not None and not set(req.space) <= set(STRATEGY_PARAMS):
+        return JSONResponse(status_code=400, content={"message": "Unknown strategy parameter"})
+    
+    config = session.config
+    assets = req.assets or config["assets"]
+    if not assets:
+        return JSONResponse(status_code=400, content={"message": "No assets selected"})
+    
+    space = dict(PARAM_SPACE, **(req.space or {}))
+    candidates = (grid_candidates(space) if req.search == "grid"
+                  else random_candidates(space, req.samples, req.seed))
+    try:
+        optimizer = ParameterOptimizer(
+            money_management={
+                "strategy": config["money_management"],
+                "base_amount": config["entry_amount"],
+                "stop_gain": config["stop_gain"],
+                "stop_loss": config["stop_loss"]
+            },
+            expiration=config["expiration_time"],
+            candle_time=config["candle_time"],
+            objective=req.objective,
+            min_trades=req.min_trades
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+    
+    # History from the candle archive when enabled, so repeated searches download nothing
+    start = session.connector.clock.now() - req.days * 86400
+    histories = await asyncio.gather(*(session.run_blocking(session.connector.get_history, asset,
+                                                            config["candle_time"], start)
+                                       for asset in assets))
+    series = {asset: history for asset, history in zip(assets, histories) if len(history['close'])}
+    if not series:
+        return JSONResponse(status_code=400, content={"message": "No candle history available"})
+    
+    def run():
+        result = optimizer.optimize(series, candidates, req.folds, req.train_fraction)
+        save_params(STRATEGY_PARAMS_FILE, result)
+        return result
+    
+    try:
+        # CPU bound: keep it off the event loop (the optimizer runs its own worker processes)
+        result = await asyncio.get_running_loop().run_in_executor(None, run)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+    log_event("strategy_optimized", session_id=session_id, assets=list(series),
+              candidates=len(candidates), default=result["default"])
+    return result
+
+@app.post("/api/replay")
+async def replay(req: ReplayRequest):
+    """Replay a recorded trading run and compare its signals and orders with the recorded ones"""
+    if not RECORDING_DIR:
+        return JSONResponse(status_code=400, content={"message": "Session recording is disabled"})
+    if os.path.basename(req.recording) != req.recording:
+        return JSONResponse(status_code=400, content={"message": "Invalid recording name"})
+    path = os.path.join(RECORDING_DIR, req.recording)
+    if not os.path.isfile(path):
+        return JSONResponse(status_code=404, content={"message": "Recording not found"})
+    if req.speed is not None and req.speed <= 0:
+        return JSONResponse(status_code=400, content={"message": "speed must be positive"})
+    
+    try:
+        recording = await asyncio.get_running_loop().run_in_executor(None, SessionRecording, path)
+        session = ReplaySession(recording, connector_executor, req.run, req.speed)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+    
+    started = time.perf_counter()
+    try:
+        # The replay is not live trading: keep it out of the metrics and the event log
+        with paused_metrics(), paused_events():
+            await replay_session(session)
+        report = session.report()
+    finally:
+        session.close()
+        manager.states.pop(session.session_id, None)
+    report["seconds"] = time.perf_counter() - started
+    log_event("session_replayed", recording=req.recording, run=req.run, identical=report["identical"],
+              seconds=report["seconds"])
+    return report
+
+@app.get("/metrics")
+async def get_metrics():
+    """Latency histograms and counters in the Prometheus text format"""
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/api/clear-history")
-async def clear_history():
-    global operation_history
-    operation_history = []
+async def clear_history(session_id: str = DEFAULT_SESSION):
+    session = sessions.get(session_id)
+    if session is None:
+        return JSONResponse(status_code=404, content={"message": "Session not found"})
+    session.history_store.clear()
+    session.stats.clear()
     return {"message": "History cleared"}
 
 # WebSocket endpoint
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, session_id: str = DEFAULT_SESSION,
+                             protocol: str = "full", encoding: str = "json"):
+    """
+    Dashboard updates of a session.
+    
+    protocol=full (default) sends every message in full, and the current
+    state in reply to each message from the client. protocol=delta sends a
+    snapshot on connect, then 'delta' messages with only the changed fields
+    and consecutive seq numbers; on a gap the client sends 'sync' to get a
+    new snapshot. encoding=msgpack (delta protocol, if msgpack is installed)
+    sends binary MessagePack frames instead of JSON text.
+    """
+    if protocol not in PROTOCOLS:
+        protocol = "full"
+    if protocol != "delta" or encoding not in ENCODINGS:
+        encoding = "json"
+    
+    session = sessions.get(session_id)
+    manager.publish(session_id, {
+        "daily_result": session.daily_result if session else new_daily_result(),
+        "is_running": session.active if session else False
+    })
+    await manager.connect(websocket, session_id, protocol, encoding)
     try:
         while True:
-            # Just keep connection alive
-            await websocket.receive_text()
+            message = await websocket.receive_text()
+            if protocol == "delta":
+                # Other messages just keep the connection alive
+                if message == "sync":
+                    manager.send_snapshot(websocket)
+                continue
             # Send current state
-            await websocket.send_json({
-                "daily_result": daily_result,
-                "is_running": active_bot
+            session = sessions.get(session_id)
+            await manager.send_json(websocket, {
+                "session_id": session_id,
+                "daily_result": session.daily_result if session else new_daily_result(),
+                "is_running": session.active if session else False
             })
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 # Trading logic functions
-async def trading_loop():
-    logger.info("Starting trading loop")
-    global active_bot
+async def trading_loop(session, params=None):
+    """
+    Trade the session's assets on every candle close until the session stops
     
-    strategy = StochasticStrategy(k_period=14, d_period=3, slowing=3, 
-                                 upper_threshold=90, lower_threshold=10, 
-                                 sma_period=20)
+    params is the (default, per-asset) strategy parameters; when None they are
+    loaded from STRATEGY_PARAMS_FILE.
+    """
+    logger.info(f"Starting trading loop (session {session.session_id})")
+    config = session.config
+    daily_result = session.daily_result
+    
+    # Optimized parameters (the defaults when the file does not exist); assets
+    # with their own set get their own strategy
+    default_params, asset_params = params or load_params(STRATEGY_PARAMS_FILE)
+    strategy = StreamingStochasticStrategy(**default_params)
+    asset_strategies = {asset: StreamingStochasticStrategy(**params) for asset, params in asset_params.items()}
+    
+    analyzer = get_sharded_analyzer(strategy)
+    if analyzer is not None and analyzer.params != tuple(default_params[name] for name in STRATEGY_PARAMS):
+        logger.warning("Sharded analysis runs other strategy parameters, analyzing in-process")
+        analyzer = None
     
     money_manager = MoneyManager(
-        strategy=current_config["money_management"],
-        base_amount=current_config["entry_amount"],
-        stop_gain=current_config["stop_gain"],
-        stop_loss=current_config["stop_loss"]
+        strategy=config["money_management"],
+        base_amount=config["entry_amount"],
+        stop_gain=config["stop_gain"],
+        stop_loss=config["stop_loss"]
     )
     
-    while active_bot:
+    clock = session.connector.clock
+    last_boundary = None  # Close time of the last candle analyzed
+    session.record_event("start", config=dict(config), params=[default_params, asset_params],
+                         daily_result=dict(daily_result), history=session.history_store.recent())
+    
+    while session.active:
         try:
             # Check if stop gain or stop loss was reached
-            if (daily_result["profit_loss"] >= current_config["stop_gain"] or 
-                daily_result["profit_loss"] <= -current_config["stop_loss"]):
+            if (daily_result["profit_loss"] >= config["stop_gain"] or
+                daily_result["profit_loss"] <= -config["stop_loss"]):
                 logger.info(f"Stop condition reached: Profit/Loss = {daily_result['profit_loss']}")
+                log_event("bot_stopped", session_id=session.session_id,
+                          reason="stop_gain" if daily_result["profit_loss"] >= 0 else "stop_loss",
+                          profit_loss=daily_result["profit_loss"])
                 await manager.broadcast_json({
                     "type": "alert",
                     "message": f"Bot stopped: {'Stop gain' if daily_result['profit_loss'] >= 0 else 'Stop loss'} reached"
-                })
-                active_bot = False
-                daily_result["is_running"] = False
+                }, session.session_id)
+                session.stop()
                 break
             
-            # Update balance
-            balance = iq_connector.get_balance()
-            daily_result["current_balance"] = balance
-            
-            # Process each selected asset
-            for asset in current_config["assets"]:
-                try:
-                    if not iq_connector.check_asset_availability(asset, "digital"):
-                        logger.info(f"Asset {asset} not available, skipping")
-                        continue
-                    
-                    # Get candles data
-                    candles = iq_connector.get_candles(asset, current_config["candle_time"], 100)
-                    
-                    if not candles or len(candles) < 50:  # Need enough data for indicators
-                        logger.info(f"Not enough candle data for {asset}, skipping")
-                        continue
-                    
-                    # Analyze with strategy
-                    df = pd.DataFrame(candles)
-                    signal, direction, indicator_values = strategy.analyze(df)
-                    
-                    # Send analysis update to frontend
-                    await manager.broadcast_json({
-                        "type": "analysis",
-                        "asset": asset,
-                        "time": datetime.now().isoformat(),
-                        "indicators": indicator_values,
-                        "signal": signal,
-                        "direction": direction
-                    })
-                    
-                    # If we have a signal, execute trade
-                    if signal:
-                        logger.info(f"Signal detected for {asset}: {direction}")
-                        
-                        # Calculate entry amount using money management
-                        entry_amount = money_manager.calculate_entry_amount(
-                            operation_history, daily_result["profit_loss"])
-                        
-                        # Execute trade
-                        result = await execute_trade(asset, entry_amount, direction, 
-                                                   current_config["expiration_time"])
-                        
-                        # Update statistics
-                        update_stats(asset, entry_amount, direction, result)
-                        
-                        # Broadcast update
-                        await manager.broadcast_json({
-                            "type": "operation",
-                            "data": operation_history[-1] if operation_history else {},
-                            "daily_result": daily_result
-                        })
-                
-                except Exception as e:
-                    logger.error(f"Error processing asset {asset}: {str(e)}")
-            
-            # Broadcast current state
-            await manager.broadcast_json({
-                "type": "update",
-                "daily_result": daily_result,
-                "is_running": active_bot
-            })
-            
-            # Sleep before next cycle
-            await asyncio.sleep(30)  # Check every 30 seconds
+            # Wake up when a candle has closed (server time) and settled
+            candle_time = config["candle_time"]
+            settle_delay = config.get("settle_delay", 0)
+            if clock.needs_sync:
+                await session.run_blocking(clock.sync)
+            boundary = clock.last_close(candle_time, clock.now() - settle_delay)
+            if boundary == last_boundary:
+                # No new candle yet: nothing to analyze until the next one closes
+                await session.sleep(clock.seconds_until(boundary + candle_time + settle_delay))
+                continue
+            STAGE_SECONDS.labels("candle_close_lag").observe(clock.now() - boundary)
             
+            session.record_event("cycle", boundary=boundary, offset=clock.offset)
+            await trading_cycle(session, strategy, money_manager, analyzer, asset_strategies)
+            last_boundary = boundary
+        
         except Exception as e:
             logger.error(f"Error in trading loop: {str(e)}")
-            await asyncio.sleep(5)  # Wait a bit before retrying
+            ERRORS.labels("trading_loop").inc()
+            await session.sleep(5)  # Wait a bit before retrying
+    
+    session.record_event("stop", daily_result=dict(daily_result))
 
-async def execute_trade(asset, amount, direction, expiration):
+async def replay_session(session):
+    """Run the trading loop of a ReplaySession; its orders settle as the replay moves its clock"""
+    clock = session.connector.clock
+    session.settlement_tracker = SettlementTracker(
+        session.connector, functools.partial(on_trade_settled, session), poll_interval=None,
+        executor=session.executor, now=clock.time)
+    await trading_loop(session, session.params)
+
+async def trading_cycle(session, strategy, money_manager, analyzer=None, asset_strategies=None):
+    """
+    Run one pass over the session's assets (analyzed in worker processes when an analyzer is given)
+    
+    asset_strategies maps assets to strategies with their own parameters; those
+    assets are always analyzed in-process.
+    """
+    asset_strategies = asset_strategies or {}
+    CYCLES.inc()
+    cycle_start = time.perf_counter()
+    
+    # Update balance
+    with STAGE_SECONDS.labels("get_balance").time():
+        balance = await session.broker.get_balance()
+    session.daily_result["current_balance"] = balance
+    
+    # Process every selected asset concurrently; the cycle takes as long as the slowest one
+    assets = session.config["assets"]
+    if analyzer is not None:
+        own = [asset for asset in assets if asset in asset_strategies]
+        await asyncio.gather(
+            analyze_sharded(session, analyzer, money_manager, [asset for asset in assets if asset not in own]),
+            *(process_asset(session, asset, asset_strategies[asset], money_manager) for asset in own))
+    else:
+        await asyncio.gather(*(process_asset(session, asset, asset_strategies.get(asset, strategy), money_manager)
+                               for asset in assets))
+    STAGE_SECONDS.labels("cycle").observe(time.perf_counter() - cycle_start)
+    
+    # Broadcast current state
+    await manager.broadcast_json({
+        "type": "update",
+        "daily_result": session.daily_result,
+        "is_running": session.active
+    }, session.session_id)
+
+async def fetch_closed_candles(session, asset):
+    """Availability check and candle fetch; returns the closed candles, or None to skip the asset"""
+    broker = session.broker
+    with STAGE_SECONDS.labels("availability").time():
+        available = await broker.check_asset_availability(asset, "digital")
+    if not available:
+        logger.info(f"Asset {asset} not available, skipping")
+        return None
+    
+    # Get candles data
+    candle_time = session.config["candle_time"]
+    with STAGE_SECONDS.labels("get_candles").time():
+        candles = await broker.get_candles(asset, candle_time, 100)
+    
+    if not candles or len(candles) < 50:  # Need enough data for indicators
+        logger.info(f"Not enough candle data for {asset}, skipping")
+        return None
+    
+    now = session.connector.clock.now()
+    return [c for c in candles if c['timestamp'] + candle_time <= now]
+
+async def process_asset(session, asset, strategy, money_manager):
+    """Fetch, analyze and, on a signal, dispatch an order for a single asset"""
+    try:
+        candles = await fetch_closed_candles(session, asset)
+        if candles is None:
+            return
+        
+        # Analyze with strategy, feeding only candles closed since the last cycle
+        with STAGE_SECONDS.labels("analysis").time():
+            signal, direction, indicator_values = strategy.sync(
+                f"{asset}:{session.config['candle_time']}", candles)
+        
+        await handle_analysis(session, asset, signal, direction, indicator_values, money_manager)
+    
+    except Exception as e:
+        logger.error(f"Error processing asset {asset}: {str(e)}")
+        ERRORS.labels("process_asset").inc()
+
+async def analyze_sharded(session, analyzer, money_manager, assets=None):
+    """Fetch every asset concurrently, then analyze them all in one call to the worker processes"""
+    assets = session.config["assets"] if assets is None else assets
+    candle_time = session.config["candle_time"]
+    
+    async def fetch(asset):
+        try:
+            return await fetch_closed_candles(session, asset)
+        except Exception as e:
+            logger.error(f"Error processing asset {asset}: {str(e)}")
+            ERRORS.labels("process_asset").inc()
+    
+    fetched = await asyncio.gather(*(fetch(asset) for asset in assets))
+    
+    # Updating the rows and analyzing must not interleave with another session's cycle
+    async with analysis_lock:
+        keys = {}
+        fresh = set()
+        for asset, candles in zip(assets, fetched):
+            if candles is not None:
+                key = (session.session_id, asset, candle_time)
+                keys[key] = asset
+                if analyzer.update(key, candles):
+                    fresh.add(key)
+        # Free the rows of assets no longer selected
+        selected = {(session.session_id, asset, candle_time) for asset in assets}
+        for key in [key for key in analyzer.rows if key[0] == session.session_id and key not in selected]:
+            analyzer.remove(key)
+        with STAGE_SECONDS.labels("analysis").time():
+            try:
+                results = await analyzer.analyze_async(list(keys))
+            except Exception as e:
+                logger.error(f"Error in sharded analysis: {str(e)}")
+                ERRORS.labels("analysis").inc()
+                return
+    
+    async def handle(key, result):
+        signal, direction, indicator_values = result
+        # Like the streaming strategy, no new signal until another candle closes
+        if key not in fresh:
+            signal, direction = False, ""
+        try:
+            await handle_analysis(session, keys[key], signal, direction, indicator_values, money_manager)
+        except Exception as e:
+            logger.error(f"Error processing asset {keys[key]}: {str(e)}")
+            ERRORS.labels("process_asset").inc()
+    
+    await asyncio.gather(*(handle(key, result) for key, result in results.items()))
+
+async def handle_analysis(session, asset, signal, direction, indicator_values, money_manager):
+    """Broadcast an asset's analysis and, on a signal, dispatch an order"""
+    # Send analysis update to frontend
+    await manager.broadcast_json({
+        "type": "analysis",
+        "asset": asset,
+        "time": datetime.now().isoformat(),
+        "indicators": indicator_values,
+        "signal": signal,
+        "direction": direction
+    }, session.session_id)
+    
+    # If we have a signal, dispatch the trade without waiting for it to settle
+    if signal and session.active:
+        logger.info(f"Signal detected for {asset}: {direction}")
+        SIGNALS.labels(direction).inc()
+        log_event("signal", session_id=session.session_id, asset=asset, direction=direction,
+                  indicators=dict(indicator_values))
+        session.record_event("signal", asset=asset, direction=direction, indicators=dict(indicator_values))
+        
+        # Calculate entry amount using money management
+        entry_amount = money_manager.calculate_entry_amount(
+            session.history_store.recent(), session.daily_result["profit_loss"])
+        
+        # Place the order; its result arrives later through the settlement tracker
+        await execute_trade(session, asset, entry_amount, direction, session.config["expiration_time"])
+
+async def execute_trade(session, asset, amount, direction, expiration, record=True):
+    """Place a trade and hand it to the settlement tracker; returns the placement result"""
     logger.info(f"Executing trade: {asset} {direction} {amount}$ exp:{expiration}min")
     
-    # Execute the trade
-    result = iq_connector.execute_trade(asset, amount, direction, expiration, "digital")
+    # Place the order without waiting for it to settle
+    with STAGE_SECONDS.labels("order_placement").time():
+        order = await session.broker.place_trade(asset, amount, direction, expiration, "digital")
+    ORDERS.labels("placed" if order["success"] else "rejected").inc()
+    
+    log_event("order_placed" if order["success"] else "order_rejected",
+              session_id=session.session_id, record=record, **order)
+    session.record_event("order", asset=asset, amount=amount, direction=direction, expiration=expiration,
+                         record=record, success=order["success"])
     
+    if order["success"]:
+        order["record"] = record
+        session.settlement_tracker.track(order)
+    elif record and "profit_amount" in order:
+        # A rejected order counts as a loss
+        await record_operation(session, asset, amount, direction, order)
+    
+    return order
+
+async def on_trade_settled(session, order, result):
+    """Settlement event from the tracker: update statistics and notify the dashboard"""
     # Log trade result
     log_entry = {
         "time": datetime.now().isoformat(),
-        "asset": asset,
-        "direction": direction,
-        "amount": amount,
-        "expiration": expiration,
+        "asset": order["asset"],
+        "direction": order["direction"],
+        "amount": order["amount"],
+        "expiration": order["expiration"],
         "result": result
     }
     
     logger.info(f"Trade result: {log_entry}")
+    SETTLEMENT_SECONDS.observe(time.time() - order["placed_at"])
+    log_event("trade_settled", session_id=session.session_id, order_id=order.get("order_id"),
+              record=order.get("record", True), asset=order["asset"], direction=order["direction"],
+              amount=order["amount"], expiration=order["expiration"],
+              profit_amount=result.get("profit_amount"))
     
-    return result
+    if order.get("record", True):
+        await record_operation(session, order["asset"], order["amount"], order["direction"], result)
 
-def update_stats(asset, amount, direction, result):
-    global operation_history, daily_result
+async def record_operation(session, asset, amount, direction, result):
+    """Add a finished trade to the statistics and broadcast it"""
+    # Update statistics
+    operation = update_stats(session, asset, amount, direction, result)
     
-    # Create operation record
+    # Broadcast update
+    await manager.broadcast_json({
+        "type": "operation",
+        "data": operation,
+        "daily_result": session.daily_result
+    }, session.session_id)
+
+def update_stats(session, asset, amount, direction, result):
+    daily_result = session.daily_result
+    
+    # Create operation record (the id is assigned by the history store)
     operation = {
-        "id": len(operation_history) + 1,
         "time": datetime.now().isoformat(),
         "asset": asset,
         "direction": direction,
@@ -409,7 +1050,8 @@ def update_stats(asset, amount, direction, result):
     }
     
     # Add to history
-    operation_history.append(operation)
+    operation = session.history_store.append(operation)
+    session.stats.add(operation)
     
     # Update daily stats
     daily_result["total_operations"] += 1
@@ -426,6 +1068,18 @@ def update_stats(asset, amount, direction, result):
     daily_result["profit_loss"] += profit
     daily_result["max_amount"] = max(daily_result["max_amount"], amount)
     daily_result["min_amount"] = min(daily_result["min_amount"], amount)
+    
+    return operation
+
+@app.on_event("shutdown")
+async def close_sessions():
+    sessions.close_all()
+    connector_executor.shutdown(wait=False)
+    if sharded_analyzer is not None:
+        sharded_analyzer.close()
+    if candle_archive is not None:
+        candle_archive.close()
+    get_supervisor().shutdown()
 
 # Run the FastAPI app with Uvicorn when this script is executed directly
 if __name__ == "__main__":
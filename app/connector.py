@@ -1,7 +1,6 @@
 import logging
-from iqoptionapi.stable_api import IQ_Option
-import time
-import threading
+from meuRobo.api_factory import create_api
+from meuRobo.connection_supervisor import get_supervisor
 
 logger = logging.getLogger('robo-trader.connector')
 
@@ -9,10 +8,8 @@ class IQOptionConnector:
     def __init__(self, email, password):
         self.email = email
         self.password = password
-        self.api = IQ_Option(email, password)
+        self.api = create_api(email, password)
         self.is_connected = False
-        self._connection_monitor_thread = None
-        self._stop_monitor = False
 
     def connect(self):
         try:
@@ -38,54 +35,17 @@ class IQOptionConnector:
             return False
     
     def _start_connection_monitor(self):
-        """Start a thread to monitor the connection status"""
-        if self._connection_monitor_thread is None or not self._connection_monitor_thread.is_alive():
-            self._stop_monitor = False
-            self._connection_monitor_thread = threading.Thread(target=self._monitor_connection)
-            self._connection_monitor_thread.daemon = True
-            self._connection_monitor_thread.start()
-            logger.info("Connection monitoring started")
+        """Register with the shared connection supervisor"""
+        get_supervisor().watch(self)
     
-    def _monitor_connection(self):
-        """Monitor the connection and reconnect if needed"""
-        check_interval = 30  # seconds
-        while not self._stop_monitor:
-            if self.is_connected and not self.api.check_connect():
-                logger.warning("Connection lost! Attempting to reconnect...")
-                self._reconnect()
-            time.sleep(check_interval)
+    def check_connect(self):
+        return self.api.check_connect()
     
-    def _reconnect(self, max_attempts=5):
-        """Attempt to reconnect to IQ Option"""
-        self.is_connected = False
-        attempt = 0
-        
-        while attempt < max_attempts and not self.is_connected:
-            attempt += 1
-            logger.info(f"Reconnection attempt {attempt}/{max_attempts}...")
-            
-            try:
-                status, reason = self.api.connect()
-                if status:
-                    self.is_connected = True
-                    logger.info("Reconnected successfully!")
-                    self.api.change_balance('PRACTICE')
-                    return True
-                else:
-                    logger.error(f"Reconnection failed: {reason}")
-                    time.sleep(5)  # Wait before retrying
-            except Exception as e:
-                logger.error(f"Error during reconnection: {str(e)}")
-                time.sleep(5)  # Wait before retrying
-        
-        if not self.is_connected:
-            logger.error("Failed to reconnect after multiple attempts")
-            return False
+    def ping(self):
+        self.api.ping()
     
     def disconnect(self):
         """Properly disconnect and stop connection monitoring"""
-        self._stop_monitor = True
-        if self._connection_monitor_thread and self._connection_monitor_thread.is_alive():
-            self._connection_monitor_thread.join(timeout=1.0)
+        get_supervisor().unwatch(self)
         self.is_connected = False
         logger.info("Disconnected from IQ Option")
\ No newline at end of file
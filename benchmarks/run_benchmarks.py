@@ -0,0 +1,328 @@
+"""
+Benchmark suite for the trading bot.
+
+Measures the hot paths against the local fake broker and writes the results as
+JSON. With --compare, results are checked against a baseline file and the
+script exits with status 1 if any benchmark got slower than the tolerance.
+
+Usage (from the repository root):
+    python benchmarks/run_benchmarks.py --output bench_results.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --update-baseline --runs 5
+
+On noisy machines, --runs N repeats the suite. A baseline keeps each
+benchmark's median run (its typical speed); a comparison keeps the fastest
+run, so only a slowdown that no run escapes is flagged.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Always run against the local fake broker with a small, fixed latency
+os.environ["ROBO_TRADER_BROKER"] = "fake"
+os.environ.setdefault("ROBO_TRADER_FAKE_LATENCY", "0.002")
+os.environ.setdefault("ROBO_TRADER_FAKE_JITTER", "0.001")
+os.environ.setdefault("ROBO_TRADER_FAKE_SEED", "1")
+# Keep benchmark operations out of the real history database
+os.environ["ROBO_TRADER_HISTORY_DB"] = os.path.join(tempfile.mkdtemp(prefix="robo-bench-"), "history.db")
+
+import numpy as np
+import pandas as pd
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+
+def summarize(samples, unit_ops=1):
+    """Latency statistics (microseconds) for a list of per-call durations in seconds"""
+    samples = sorted(samples)
+    micro = [s * 1e6 / unit_ops for s in samples]
+    return {
+        "n": len(samples),
+        "mean_us": statistics.fmean(micro),
+        "p50_us": micro[len(micro) // 2],
+        "p95_us": micro[min(len(micro) - 1, int(len(micro) * 0.95))],
+        "ops_per_sec": unit_ops * len(samples) / sum(samples) if sum(samples) else float("inf"),
+    }
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def synthetic_candles(count, seed=0):
+    rng = np.random.default_rng(seed)
+    close = np.cumsum(rng.normal(0, 0.0003, count)) + 1.1
+    spread = np.abs(rng.normal(0, 0.0002, (2, count)))
+    return [
+        {"open": c, "high": c + h, "low": c - l, "close": c, "volume": 1, "timestamp": 60 * i}
+        for i, (c, h, l) in enumerate(zip(close, spread[0], spread[1]))
+    ]
+
+
+def bench_strategy(results, quick):
+    from meuRobo.strategy import StochasticStrategy, StreamingStochasticStrategy
+
+    repeat = 50 if quick else 500
+    strategy = StochasticStrategy()
+    candles = synthetic_candles(100)
+    df = pd.DataFrame(candles)
+    results["strategy_analyze_100_candles"] = summarize(timed(lambda: strategy.analyze(df), repeat))
+
+    streaming = StreamingStochasticStrategy()
+    stream_candles = synthetic_candles(repeat * 10 + 100, seed=1)
+    for candle in stream_candles[:100]:
+        streaming.update("EURUSD", candle)
+    feed = iter(stream_candles[100:])
+    results["strategy_stream_update"] = summarize(
+        timed(lambda: streaming.update("EURUSD", next(feed)), repeat * 10))
+
+    assets = [f"A{i}" for i in range(100)]
+    _, block = StochasticStrategy.build_ohlc_block({a: synthetic_candles(100, seed=i) for i, a in enumerate(assets)})
+    results["strategy_analyze_batch_100_assets"] = summarize(
+        timed(lambda: strategy.analyze_batch(assets, block), repeat // 5 or 1))
+
+
+def bench_trading_cycle(results, quick):
+    import app
+    from meuRobo.iq_option_connector import IQOptionConnector
+    from meuRobo.money_management import MoneyManager
+    from meuRobo.settlement_tracker import SettlementTracker
+    from meuRobo.strategy import StreamingStochasticStrategy
+
+    cycles = 3 if quick else 10
+
+    async def run(asset_count):
+        connector = IQOptionConnector("bench@example.com", "bench")
+        connector.api.assets = [f"ASSET{i}" for i in range(asset_count)]
+        connector.connect()
+        session = app.sessions.get_or_create(f"bench{asset_count}")
+        session.connector = connector
+        session.settlement_tracker = SettlementTracker(
+            connector, functools.partial(app.on_trade_settled, session), executor=session.executor)
+        session.config["assets"] = list(connector.api.assets)
+        session.active = True
+
+        strategy = StreamingStochasticStrategy()
+        money_manager = MoneyManager()
+
+        # First cycle seeds the candle buffers from history
+        start = time.perf_counter()
+        await app.trading_cycle(session, strategy, money_manager)
+        cold = time.perf_counter() - start
+
+        samples = []
+        for _ in range(cycles):
+            start = time.perf_counter()
+            await app.trading_cycle(session, strategy, money_manager)
+            samples.append(time.perf_counter() - start)
+
+        app.sessions.remove(session.session_id)
+        return cold, samples
+
+    for asset_count in (1, 10, 100):
+        cold, samples = asyncio.run(run(asset_count))
+        results[f"trading_cycle_{asset_count}_assets"] = summarize(samples)
+        results[f"trading_cycle_{asset_count}_assets_cold"] = summarize([cold])
+
+
+def bench_money_management(results, quick):
+    import app
+    from meuRobo.money_management import MoneyManager
+
+    history_size = 10000 if quick else 100000
+    outcome = {"success": True, "profit_amount": 1.7}
+
+    session = app.sessions.get_or_create("bench")
+    start = time.perf_counter()
+    for i in range(history_size):
+        outcome["profit_amount"] = 1.7 if i % 3 else -2
+        app.update_stats(session, "EURUSD", 2, "call", outcome)
+    results["update_stats"] = summarize([time.perf_counter() - start], unit_ops=history_size)
+
+    history = session.history_store.recent()
+    for strategy_name in ("flat", "martingale", "soros"):
+        manager = MoneyManager(strategy=strategy_name, stop_gain=float("inf"), stop_loss=float("inf"))
+        calls = 1000 if quick else 10000
+
+        def entry_amounts():
+            for _ in range(calls):
+                manager.calculate_entry_amount(history, 0)
+
+        # Sub-microsecond calls: several batches, so the p50 is not a single noisy sample
+        results[f"calculate_entry_amount_{strategy_name}"] = summarize(
+            timed(entry_amounts, 5 if quick else 20), unit_ops=calls)
+    app.sessions.remove(session.session_id)
+
+
+class BenchWebSocket:
+    """Minimal stand-in for a Starlette WebSocket: serializes like send_json"""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        self.sent += len(data)
+
+    async def send_bytes(self, data):
+        self.sent += len(data)
+
+    async def send_json(self, data, mode="text"):
+        self.sent += len(json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+    async def close(self, code=1000):
+        pass
+
+
+def bench_broadcast(results, quick):
+    import app
+
+    repeat = 20 if quick else 200
+    message = {
+        "type": "operation",
+        "data": {"id": 1, "time": "2024-01-01T00:00:00", "asset": "EURUSD", "direction": "call",
+                 "amount": 2, "result": 1.7, "status": "win"},
+        "daily_result": dict(app.new_daily_result(), min_amount=0),
+    }
+
+    async def run(client_count):
+        manager = app.ConnectionManager()
+        for _ in range(client_count):
+            await manager.connect(BenchWebSocket())
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await manager.broadcast_json(message)
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    async def run_update(client_count, protocol):
+        # Cycle update of one session where only the balance changes
+        manager = app.ConnectionManager()
+        for _ in range(client_count):
+            await manager.connect(BenchWebSocket(), "bench", protocol)
+        daily_result = dict(app.new_daily_result(), min_amount=0)
+        samples = []
+        for i in range(repeat):
+            daily_result["current_balance"] = 1000 + i
+            start = time.perf_counter()
+            await manager.broadcast_json({"type": "update", "daily_result": daily_result,
+                                          "is_running": True}, "bench")
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    for client_count in (1, 100, 1000):
+        results[f"broadcast_json_{client_count}_clients"] = summarize(asyncio.run(run(client_count)))
+    for protocol in ("full", "delta"):
+        results[f"broadcast_update_{protocol}_1000_clients"] = summarize(
+            asyncio.run(run_update(1000, protocol)))
+
+
+BENCHMARKS = {
+    "strategy": bench_strategy,
+    "trading_cycle": bench_trading_cycle,
+    "money_management": bench_money_management,
+    "broadcast": bench_broadcast,
+}
+
+
+def pick_run(runs, fastest):
+    """Per benchmark, the statistics of the run with the lowest (or the median) p50"""
+    picked = {}
+    for name in runs[0]:
+        ordered = sorted((run[name] for run in runs), key=lambda stats: stats["p50_us"])
+        picked[name] = ordered[0] if fastest else ordered[len(ordered) // 2]
+    return picked
+
+
+def compare(results, baseline, tolerance):
+    """Return the benchmarks whose p50 is slower than baseline * (1 + tolerance)"""
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if not reference:
+            continue
+        ratio = stats["p50_us"] / reference["p50_us"] if reference["p50_us"] else 1.0
+        status = "REGRESSION" if ratio > 1 + tolerance else "ok"
+        print(f"{name:45s} {reference['p50_us']:12.1f}us -> {stats['p50_us']:12.1f}us  x{ratio:5.2f}  {status}")
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the robo-trader benchmarks")
+    parser.add_argument("--only", choices=sorted(BENCHMARKS), action="append",
+                        help="Run only the given benchmark group (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="Fewer repetitions")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_PATH,
+                        help="Compare with a baseline file (default: benchmarks/baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown before flagging a regression (default: 0.25)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Write the results to benchmarks/baseline.json")
+    parser.add_argument("--runs", type=int, default=1,
+                        help="Run the suite this many times (baseline: median run, otherwise fastest run)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    runs = []
+    for _ in range(max(1, args.runs)):
+        results = {}
+        for name in args.only or BENCHMARKS:
+            BENCHMARKS[name](results, args.quick)
+        runs.append(results)
+    results = pick_run(runs, fastest=not args.update_baseline)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "quick": args.quick,
+            "runs": len(runs),
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            f.write(text + "\n")
+    if not args.output and not args.update_baseline:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
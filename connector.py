@@ -1,13 +1,15 @@
 import logging
-from iqoptionapi.stable_api import IQ_Option
+from meuRobo.api_factory import create_api
 from connection_manager import ConnectionManager
+from meuRobo.market_snapshot import OpenTimeSnapshot
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 class IQOptionConnector:
     def __init__(self, email, password):
-        self.api = IQ_Option(email, password)
+        self.api = create_api(email, password)
+        self.open_times = OpenTimeSnapshot(self.api)
         self.connection_manager = ConnectionManager(self)
         self.api.connect()
         self.api.change_balance("PRACTICE")  # Default to practice account
@@ -20,6 +22,7 @@ class IQOptionConnector:
             
             if connected:
                 logger.info("Connected successfully!")
+                self.open_times.start()
                 # Start connection monitoring after successful connection
                 self.connection_manager.start_monitoring()
                 return True
@@ -43,6 +46,7 @@ class IQOptionConnector:
         try:
             # Stop connection monitoring before disconnecting
             self.connection_manager.stop_monitoring()
+            self.open_times.stop()
             self.api.disconnect()
             logger.info("Disconnected from IQ Option")
         except Exception as e:
@@ -63,7 +67,7 @@ class IQOptionConnector:
         return self.api.get_balance()
 
     def get_open_assets(self):
-        return self.api.get_all_open_time()
+        return self.open_times.get()
 
     def place_order(self, asset, amount, direction, expiry, order_type="digital"):
         """
@@ -87,16 +91,10 @@ class IQOptionConnector:
                 logger.error("API not connected")
                 return False, "API not connected"
             
-            # Check if asset exists and is available
-            assets_list = self.api.get_all_open_time()
-            
             # For digital options
             if order_type == "digital":
-                is_available = False
-                for market_type in ["turbo", "binary"]:
-                    if asset in assets_list[market_type] and assets_list[market_type][asset]["open"]:
-                        is_available = True
-                        break
+                # Check if asset exists and is available
+                is_available = self.open_times.is_open(asset, "binary")
                         
                 if not is_available:
                     logger.error(f"Asset {asset} is not available for trading")
@@ -125,7 +123,7 @@ class IQOptionConnector:
                     
             # For binary options
             elif order_type == "binary":
-                if asset not in assets_list["turbo"] or not assets_list["turbo"][asset]["open"]:
+                if not self.open_times.is_open(asset, "turbo"):
                     logger.error(f"Asset {asset} is not available for binary trading")
                     return False, f"Asset {asset} is not available"
                 
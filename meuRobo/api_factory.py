@@ -0,0 +1,50 @@
+import logging
+import os
+
+logger = logging.getLogger("robo-trader.api_factory")
+
+# Environment variables selecting and configuring the broker API
+BROKER_ENV = "ROBO_TRADER_BROKER"  # 'iqoption' (default) or 'fake'
+FAKE_ENV = {
+    "latency": ("ROBO_TRADER_FAKE_LATENCY", float),  # seconds
+    "jitter": ("ROBO_TRADER_FAKE_JITTER", float),  # seconds
+    "failure_rate": ("ROBO_TRADER_FAKE_FAILURE_RATE", float),  # 0-1
+    "payout": ("ROBO_TRADER_FAKE_PAYOUT", float),
+    "seed": ("ROBO_TRADER_FAKE_SEED", int),
+    "balance": ("ROBO_TRADER_FAKE_BALANCE", float),
+}
+FAKE_DATA_ENV = "ROBO_TRADER_FAKE_DATA"  # .npz file with recorded prices
+
+
+def create_api(email, password, broker=None, **options):
+    """
+    Create the broker API object used by the connectors.
+
+    Args:
+        email: Account email
+        password: Account password
+        broker: 'iqoption' for iqoptionapi's IQ_Option, 'fake' for the local
+            FakeIQOption (default: the ROBO_TRADER_BROKER environment variable)
+        options: Extra FakeIQOption arguments, overriding the environment
+
+    Returns:
+        An IQ_Option compatible instance
+    """
+    broker = (broker or os.environ.get(BROKER_ENV, "iqoption")).lower()
+
+    if broker == "fake":
+        from meuRobo.fake_iqoption import FakeIQOption, RecordedPriceFeed
+
+        config = {}
+        for name, (variable, cast) in FAKE_ENV.items():
+            if os.environ.get(variable):
+                config[name] = cast(os.environ[variable])
+        if os.environ.get(FAKE_DATA_ENV):
+            config["price_feed"] = RecordedPriceFeed(os.environ[FAKE_DATA_ENV])
+        config.update(options)
+
+        logger.info(f"Using local fake IQ Option API ({config})")
+        return FakeIQOption(email, password, **config)
+
+    from iqoptionapi.stable_api import IQ_Option
+    return IQ_Option(email, password)
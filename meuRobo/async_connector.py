@@ -0,0 +1,120 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor
+from typing import Any, Dict, Optional
+
+from meuRobo.metrics import CONNECTOR_COALESCED, CONNECTOR_TIMEOUTS
+
+logger = logging.getLogger("robo-trader.async_connector")
+
+# Read-only calls: identical concurrent calls can share one upstream request.
+# Orders are never coalesced, two identical orders are two trades.
+COALESCED_METHODS = frozenset({
+    "get_balance", "check_asset_availability", "get_available_assets",
+    "get_candles", "fetch_candles", "check_trade_result",
+})
+
+DEFAULT_TIMEOUT = 15.0  # seconds
+METHOD_TIMEOUTS = {
+    "connect": 60.0,
+    # An order can still be accepted after a caller stops waiting, and would then
+    # never reach the settlement tracker: wait for the broker's answer
+    "place_trade": None,
+    "execute_trade": None,  # Waits for the trade to expire
+}
+
+
+class AsyncConnector:
+    """
+    asyncio facade of an IQOptionConnector.
+
+    Every method of the connector is available as a coroutine that runs the
+    blocking call on the given executor, with a per-call timeout. Identical
+    in-flight read-only calls (same method and arguments) share a single call
+    to the connector. A caller that times out or is cancelled stops waiting;
+    the call itself is cancelled only if it has not started and no other
+    caller is waiting for it (a running call cannot be interrupted).
+    """
+
+    def __init__(self, connector, executor: Optional[Executor] = None, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                 timeouts: Optional[Dict[str, Optional[float]]] = None):
+        """
+        Initialize the facade
+
+        Args:
+            connector: IQOptionConnector (or any object with blocking methods)
+            executor: Executor running the calls (None for the loop's default executor)
+            timeout: Default timeout in seconds (None for no timeout)
+            timeouts: Per-method timeouts overriding the default
+        """
+        self.connector = connector
+        self.executor = executor
+        self.timeout = timeout
+        self.timeouts = dict(METHOD_TIMEOUTS, **(timeouts or {}))
+        self._in_flight: Dict[tuple, asyncio.Future] = {}
+        self._waiters: Dict[tuple, int] = {}
+
+    async def call(self, method: str, *args, timeout: Optional[float] = ..., **kwargs) -> Any:
+        """
+        Run connector.<method>(*args, **kwargs) on the executor.
+
+        Args:
+            method: Connector method name
+            timeout: Seconds to wait (default: the method's timeout; None waits forever)
+
+        Raises:
+            asyncio.TimeoutError: The call did not finish in time
+        """
+        if timeout is ...:
+            timeout = self.timeouts.get(method, self.timeout)
+        func = functools.partial(getattr(self.connector, method), *args, **kwargs)
+
+        key = None
+        if method in COALESCED_METHODS:
+            key = (method, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                key = None
+
+        if key is None:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, func)
+            return await self._wait(method, future, timeout)
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, func)
+            self._in_flight[key] = future
+            future.add_done_callback(functools.partial(self._finished, key))
+        else:
+            CONNECTOR_COALESCED.labels(method).inc()
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await self._wait(method, asyncio.shield(future), timeout)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                # Nobody wants the result any more: drop it if it has not started
+                if not future.done():
+                    future.cancel()
+
+    async def _wait(self, method: str, future, timeout: Optional[float]):
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            CONNECTOR_TIMEOUTS.labels(method).inc()
+            logger.warning(f"Connector call {method} timed out after {timeout}s")
+            raise
+
+    def _finished(self, key: tuple, future: asyncio.Future):
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.connector, name)
+        if not callable(attribute):
+            return attribute
+        return functools.partial(self.call, name)
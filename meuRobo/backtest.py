@@ -0,0 +1,213 @@
+import heapq
+import logging
+import math
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from meuRobo.money_management import MoneyManager
+from meuRobo.strategy import StochasticStrategy
+
+logger = logging.getLogger("robo-trader.backtest")
+
+
+class Backtester:
+    """
+    Replays historical OHLC arrays through StochasticStrategy and MoneyManager.
+
+    Signals and trade outcomes for the whole history are computed in one
+    vectorized pass with the same rules analyze() applies live. Only the
+    trades themselves are walked in order, because stake sizing (martingale,
+    soros, stop gain/loss) depends on the trades settled before each entry.
+
+    A trade opens at the close of the signal candle and settles at the close
+    of the candle that ends `expiration` minutes later. Like the live loop,
+    several positions can be open at once and the money manager only sees
+    trades that have already settled.
+    """
+
+    def __init__(self, strategy: StochasticStrategy, money_manager: MoneyManager,
+                payout: Union[float, Callable[[np.ndarray, np.ndarray], np.ndarray]] = 0.8,
+                expiration: int = 5, candle_time: int = 60, session_length: Optional[int] = 86400):
+        """
+        Initialize the backtester
+
+        Args:
+            strategy: Strategy providing the signal rules
+            money_manager: Money manager providing stake sizing and stops
+            payout: Profit per unit staked on a win. Either a constant or a callable
+                (timestamps, directions) -> payout array evaluated for every trade
+            expiration: Expiration time in minutes
+            candle_time: Candle timeframe in seconds
+            session_length: Seconds after which profit/loss, stops and the money
+                manager history reset (one trading day by default, None for never)
+        """
+        self.strategy = strategy
+        self.money_manager = money_manager
+        self.payout = payout
+        self.expiration = expiration
+        self.candle_time = candle_time
+        self.session_length = session_length
+
+    def run(self, ohlc: Any, timestamps: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Backtest one asset.
+
+        Args:
+            ohlc: 1-D structured array or mapping with 'high', 'low' and 'close'
+                arrays (and optionally 'timestamp')
+            timestamps: Candle open times in seconds (default: ohlc['timestamp'],
+                or consecutive candles starting at 0)
+
+        Returns:
+            Dictionary with the list of trades, the equity curve (cumulative
+            profit/loss after each settled trade), its timestamps and the stats
+        """
+        high = np.asarray(ohlc['high'], dtype=np.float64)
+        low = np.asarray(ohlc['low'], dtype=np.float64)
+        close = np.asarray(ohlc['close'], dtype=np.float64)
+        n = len(close)
+
+        if timestamps is None:
+            try:
+                timestamps = np.asarray(ohlc['timestamp'], dtype=np.int64)
+            except (KeyError, ValueError, IndexError):
+                timestamps = np.arange(n, dtype=np.int64) * self.candle_time
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+
+        # Vectorized signals and outcomes over the whole history
+        signals, _ = self.strategy.signal_arrays(high, low, close)
+        return self.run_signals(signals, close, timestamps)
+
+    def run_signals(self, signals: np.ndarray, close: np.ndarray, timestamps: np.ndarray) -> Dict[str, Any]:
+        """
+        Backtest precomputed entry signals (1 CALL, -1 PUT, 0 none per candle).
+
+        Lets callers that evaluate many parameter sets share the indicator
+        computations (see meuRobo.optimizer); run() uses the strategy's signals.
+        """
+        n = len(close)
+        hold = max(1, math.ceil(self.expiration * 60 / self.candle_time))
+        entries = np.flatnonzero(signals[:n - hold]) if n > hold else np.array([], dtype=np.int64)
+        exits = entries + hold
+        directions = signals[entries].astype(np.int64)
+        moves = (close[exits] - close[entries]) * directions
+        outcomes = np.sign(moves).astype(np.int64)  # 1 win, -1 loss, 0 draw
+
+        if callable(self.payout):
+            payouts = np.asarray(self.payout(timestamps[entries], directions), dtype=np.float64)
+        else:
+            payouts = np.full(len(entries), float(self.payout))
+
+        trades = self._simulate(entries, exits, directions, outcomes, payouts, timestamps)
+        return self._report(trades)
+
+    def _session(self, timestamp: int) -> int:
+        if not self.session_length:
+            return 0
+        return int(timestamp // self.session_length)
+
+    def _simulate(self, entries: np.ndarray, exits: np.ndarray, directions: np.ndarray,
+                  outcomes: np.ndarray, payouts: np.ndarray, timestamps: np.ndarray) -> List[Dict[str, Any]]:
+        """Size and settle the candidate trades in time order"""
+        manager = self.money_manager
+        settled: List[Dict[str, Any]] = []
+        history: List[Dict[str, Any]] = []
+        pending = []  # heap of (exit index, sequence, trade)
+        profit_loss = 0.0
+        session = None
+        stopped = False
+
+        def settle_until(index):
+            nonlocal profit_loss
+            while pending and pending[0][0] <= index:
+                _, _, trade = heapq.heappop(pending)
+                profit_loss += trade["result"]
+                trade["session_profit_loss"] = profit_loss
+                settled.append(trade)
+                history.append(trade)
+
+        # Silence the per-trade money management logs while replaying
+        previous_level = logging.getLogger("robo-trader.money_management").level
+        logging.getLogger("robo-trader.money_management").setLevel(logging.ERROR)
+        try:
+            for i in range(len(entries)):
+                entry = int(entries[i])
+                settle_until(entry)
+
+                trade_session = self._session(timestamps[entry])
+                if trade_session != session:
+                    # New session: settle what is left of the previous one, then reset
+                    settle_until(len(timestamps))
+                    session = trade_session
+                    profit_loss = 0.0
+                    history = []
+                    stopped = False
+
+                if stopped or manager.should_stop(profit_loss):
+                    stopped = True
+                    continue
+
+                amount = manager.calculate_entry_amount(history, profit_loss)
+                if amount <= 0:
+                    continue
+
+                outcome = int(outcomes[i])
+                if outcome > 0:
+                    result = amount * float(payouts[i])
+                elif outcome < 0:
+                    result = -amount
+                else:
+                    result = 0.0
+
+                trade = {
+                    "entry_time": int(timestamps[entry]),
+                    "exit_time": int(timestamps[int(exits[i])]) + self.candle_time,
+                    "direction": "call" if directions[i] > 0 else "put",
+                    "amount": amount,
+                    "result": result,
+                    "status": "win" if result > 0 else ("draw" if outcome == 0 else "loss"),
+                    "session": session,
+                }
+                heapq.heappush(pending, (int(exits[i]), i, trade))
+
+            settle_until(len(timestamps))
+        finally:
+            logging.getLogger("robo-trader.money_management").setLevel(previous_level)
+
+        return settled
+
+    def _report(self, trades: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the equity curve and summary statistics"""
+        results = np.array([trade["result"] for trade in trades], dtype=np.float64)
+        amounts = np.array([trade["amount"] for trade in trades], dtype=np.float64)
+        equity = np.cumsum(results)
+        drawdown = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:] - equity if len(equity) else equity
+
+        wins = int(np.count_nonzero(results > 0))
+        losses = int(np.count_nonzero(results < 0))
+        gross_profit = float(results[results > 0].sum())
+        gross_loss = float(-results[results < 0].sum())
+
+        stats = {
+            "total_operations": len(trades),
+            "wins": wins,
+            "losses": losses,
+            "draws": len(trades) - wins - losses,
+            "win_rate": (wins / len(trades)) * 100 if trades else 0,
+            "profit_loss": float(equity[-1]) if len(equity) else 0.0,
+            "max_profit": float(results.max()) if len(results) else 0.0,
+            "max_loss": float(results.min()) if len(results) else 0.0,
+            "max_amount": float(amounts.max()) if len(amounts) else 0.0,
+            "min_amount": float(amounts.min()) if len(amounts) else 0.0,
+            "max_drawdown": float(drawdown.max()) if len(drawdown) else 0.0,
+            "profit_factor": gross_profit / gross_loss if gross_loss else float('inf') if gross_profit else 0.0,
+            "sessions": len({trade["session"] for trade in trades}),
+        }
+
+        return {
+            "trades": trades,
+            "equity_curve": equity,
+            "equity_times": np.array([trade["exit_time"] for trade in trades], dtype=np.int64),
+            "stats": stats,
+        }
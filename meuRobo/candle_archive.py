@@ -0,0 +1,341 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from meuRobo.candle_store import CANDLE_DTYPE
+
+logger = logging.getLogger("robo-trader.candle_archive")
+
+# Timestamp column markers of slots without a candle
+UNKNOWN = 0  # Never fetched
+NO_DATA = -1  # Fetched, the broker has no candle for it (market closed)
+
+MAX_CANDLES_PER_REQUEST = 1000  # iqoptionapi get_candles limit
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class _Series:
+    """
+    Dense on-disk candles of one asset/timeframe.
+
+    Slot i holds the candle opening at base + i * timeframe, one fixed-width
+    file per column. Files only grow at the end; history older than base is
+    added by rewriting the series with an earlier base (a one-off copy).
+    """
+
+    def __init__(self, path: str, timeframe: int):
+        self.path = path
+        self.timeframe = timeframe
+        self.lock = threading.Lock()
+        self.base: Optional[int] = None
+        self.columns: Dict[str, np.memmap] = {}
+
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.base = int(json.load(f)["base"])
+            self._open()
+
+    @property
+    def slots(self) -> int:
+        return len(self.columns['timestamp']) if self.columns else 0
+
+    @property
+    def end(self) -> Optional[int]:
+        """Open time of the slot after the last one"""
+        return None if self.base is None else self.base + self.slots * self.timeframe
+
+    def _column_path(self, name: str, path: Optional[str] = None) -> str:
+        return os.path.join(path or self.path, f"{name}.{CANDLE_DTYPE[name].str.lstrip('<>|=')}")
+
+    def _open(self):
+        self.columns = {}
+        sizes = [os.path.getsize(self._column_path(name)) // CANDLE_DTYPE[name].itemsize
+                 for name in CANDLE_DTYPE.names]
+        slots = min(sizes)  # Columns may differ after an interrupted grow
+        for name in CANDLE_DTYPE.names:
+            if slots == 0:
+                self.columns[name] = np.zeros(0, dtype=CANDLE_DTYPE[name])
+            else:
+                self.columns[name] = np.memmap(self._column_path(name), dtype=CANDLE_DTYPE[name],
+                                               mode="r+", shape=(slots,))
+
+    def _write_meta(self, path: str, base: int):
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"base": base, "timeframe": self.timeframe, "columns": list(CANDLE_DTYPE.names)}, f)
+
+    def cover(self, start: int, end: int):
+        """Make sure slots exist for every candle opening in [start, end)"""
+        if self.base is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.base = start
+            self._write_meta(self.path, start)
+            for name in CANDLE_DTYPE.names:
+                open(self._column_path(name), "ab").close()
+            self._open()
+
+        if start < self.base:
+            self._rebase(start)
+
+        missing = (end - self.end) // self.timeframe
+        if missing > 0:
+            self.flush()
+            # Append zeros (UNKNOWN slots) to every column
+            for name in CANDLE_DTYPE.names:
+                with open(self._column_path(name), "ab") as f:
+                    f.truncate(os.path.getsize(self._column_path(name)) + missing * CANDLE_DTYPE[name].itemsize)
+            self._open()
+
+    def _rebase(self, base: int):
+        """Rewrite the series starting at an earlier base"""
+        shift = (self.base - base) // self.timeframe
+        logger.info(f"Extending {self.path} back by {shift} candles")
+        self.flush()
+        staging = self.path + ".rebase"
+        os.makedirs(staging, exist_ok=True)
+        for name in CANDLE_DTYPE.names:
+            with open(self._column_path(name, staging), "wb") as out:
+                out.truncate(shift * CANDLE_DTYPE[name].itemsize)
+                out.seek(0, os.SEEK_END)
+                out.write(np.asarray(self.columns[name]).tobytes())
+        self._write_meta(staging, base)
+        for name in CANDLE_DTYPE.names:
+            os.replace(self._column_path(name, staging), self._column_path(name))
+        os.replace(os.path.join(staging, "meta.json"), os.path.join(self.path, "meta.json"))
+        os.rmdir(staging)
+        self.base = base
+        self._open()
+
+    def index(self, timestamp: int) -> int:
+        return (timestamp - self.base) // self.timeframe
+
+    def write(self, candles: List[Dict[str, Any]]) -> int:
+        """Store candles falling inside the covered slots; returns how many were stored"""
+        stored = 0
+        timestamps = self.columns['timestamp']
+        for candle in candles:
+            i = self.index(int(candle['timestamp']))
+            if 0 <= i < self.slots:
+                for name in ('open', 'high', 'low', 'close', 'volume'):
+                    self.columns[name][i] = candle.get(name, 0)
+                # Written last: a set timestamp marks a complete candle
+                timestamps[i] = candle['timestamp']
+                stored += 1
+        return stored
+
+    def flush(self):
+        for column in self.columns.values():
+            if isinstance(column, np.memmap):
+                column.flush()
+
+
+class CandleArchive:
+    """
+    Columnar on-disk candle history per asset/timeframe, read through numpy.memmap.
+
+    Candles are stored in dense fixed-width column files under
+    <root>/<asset>/<timeframe>/. A range request only downloads the segments
+    that were never fetched, merges them in place and returns zero-copy
+    views of the memory-mapped columns, so months of history load without
+    parsing or network calls once they are cached. Only closed candles are
+    archived. One archive can serve several connectors: each call may
+    pass the fetch_history of the connector it runs for.
+    """
+
+    def __init__(self, root: str, fetch_history: Optional[Callable[..., List[Dict[str, Any]]]] = None,
+                 chunk_size: int = MAX_CANDLES_PER_REQUEST, close_margin: float = 5.0):
+        """
+        Initialize the archive
+
+        Args:
+            root: Directory holding the archive
+            fetch_history: Callable (asset, timeframe, count, end_time) returning
+                processed candles and raising when the request fails, e.g.
+                IQOptionConnector.download_candles (None: offline)
+            chunk_size: Candles requested per API call
+            close_margin: Seconds after its close before a candle is archived
+                (covers the offset between the local and the server clock)
+        """
+        self.root = root
+        self.fetch_history = fetch_history
+        self.chunk_size = chunk_size
+        self.close_margin = close_margin
+        self.series: Dict[Tuple[str, int], _Series] = {}
+        self._guard = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _series(self, asset: str, timeframe: int) -> _Series:
+        key = (asset, timeframe)
+        with self._guard:
+            series = self.series.get(key)
+            if series is None:
+                path = os.path.join(self.root, _SAFE_NAME.sub("_", asset), str(timeframe))
+                series = self.series[key] = _Series(path, timeframe)
+            return series
+
+    def _slot_range(self, timeframe: int, start: float, end: Optional[float]) -> Tuple[int, int]:
+        """Aligned [first, stop) open times of the closed candles opening in [start, end]"""
+        last_closed = int((time.time() - self.close_margin) // timeframe) * timeframe - timeframe
+        end = last_closed if end is None else min(int(end), last_closed)
+        first = int(start // timeframe) * timeframe
+        stop = int(end // timeframe) * timeframe + timeframe
+        return first, max(stop, first)
+
+    def missing_segments(self, asset: str, timeframe: int, start: float,
+                         end: Optional[float] = None) -> List[Tuple[int, int]]:
+        """Open times [first, last] of each run of never-fetched candles in the range"""
+        first, stop = self._slot_range(timeframe, start, end)
+        series = self._series(asset, timeframe)
+        with series.lock:
+            return self._missing(series, first, stop)
+
+    def _missing(self, series: _Series, first: int, stop: int) -> List[Tuple[int, int]]:
+        if series.base is None:
+            return [(first, stop - series.timeframe)] if stop > first else []
+
+        segments = []
+        # Slots outside the covered range are unknown
+        if first < series.base:
+            segments.append((first, min(series.base, stop) - series.timeframe))
+        lo = max(first, series.base)
+        hi = min(stop, series.end)
+        if hi > lo:
+            unknown = series.columns['timestamp'][series.index(lo):series.index(hi)] == UNKNOWN
+            if unknown.any():
+                # Boundaries of the runs of True
+                edges = np.flatnonzero(np.diff(np.concatenate(([0], unknown.view(np.int8), [0]))))
+                for run_start, run_stop in zip(edges[::2], edges[1::2]):
+                    segments.append((lo + int(run_start) * series.timeframe,
+                                     lo + (int(run_stop) - 1) * series.timeframe))
+        if stop > max(series.end, first):
+            segments.append((max(series.end, first), stop - series.timeframe))
+        return segments
+
+    def fill(self, asset: str, timeframe: int, start: float, end: Optional[float] = None,
+             fetch_history: Optional[Callable[..., List[Dict[str, Any]]]] = None) -> int:
+        """
+        Download the never-fetched candles of a range.
+
+        Slots are marked as having no candle only when the broker answered
+        without them; a failed request leaves them to be fetched again.
+
+        Args:
+            fetch_history: Overrides the archive's fetch_history for this call
+
+        Returns:
+            Number of candles stored
+        """
+        fetch_history = fetch_history or self.fetch_history
+        first, stop = self._slot_range(timeframe, start, end)
+        series = self._series(asset, timeframe)
+        stored = 0
+        with series.lock:
+            segments = self._missing(series, first, stop)
+            if not segments or fetch_history is None:
+                return 0
+            series.cover(first, stop)
+            timestamps = series.columns['timestamp']
+            for segment_first, segment_last in segments:
+                # Newest chunk first, as the API counts candles back from end_time
+                chunk_end = segment_last
+                while chunk_end >= segment_first:
+                    count = min(self.chunk_size, (chunk_end - segment_first) // timeframe + 1)
+                    try:
+                        candles = fetch_history(asset, timeframe, count, chunk_end)
+                    except Exception as e:
+                        # Only an answer proves a slot empty: the rest stays unknown for the next fill
+                        logger.error(f"Error downloading {asset} {timeframe}s candles: {str(e)}")
+                        series.flush()
+                        return stored
+                    stored += series.write(candles)
+                    chunk_first = chunk_end - (count - 1) * timeframe
+                    if len(candles) < count:
+                        # History exhausted: nothing before the oldest candle returned
+                        oldest = min((int(c['timestamp']) for c in candles), default=chunk_end + timeframe)
+                        chunk_first = segment_first if oldest > chunk_first else chunk_first
+                    # Slots the broker returned nothing for have no candle
+                    lo, hi = series.index(chunk_first), series.index(chunk_end) + 1
+                    empty = timestamps[lo:hi] == UNKNOWN
+                    timestamps[lo:hi][empty] = NO_DATA
+                    chunk_end = chunk_first - timeframe
+            series.flush()
+        logger.info(f"Archived {stored} {asset} {timeframe}s candles")
+        return stored
+
+    def view(self, asset: str, timeframe: int, start: float, end: Optional[float] = None,
+             fetch: bool = True, fetch_history: Optional[Callable[..., List[Dict[str, Any]]]] = None
+             ) -> Dict[str, np.ndarray]:
+        """
+        Zero-copy column views of every slot in the range.
+
+        Slots without a candle have a timestamp of 0 (never fetched) or -1
+        (no candle). Views stay valid after later writes to the archive.
+        With fetch=False only what is already archived is returned.
+        """
+        if fetch:
+            self.fill(asset, timeframe, start, end, fetch_history)
+        first, stop = self._slot_range(timeframe, start, end)
+        series = self._series(asset, timeframe)
+        with series.lock:
+            if series.base is None:
+                return {name: np.zeros(0, dtype=CANDLE_DTYPE[name]) for name in CANDLE_DTYPE.names}
+            lo = max(series.index(first), 0)
+            hi = min(max(series.index(stop), lo), series.slots)
+            return {name: series.columns[name][lo:hi] for name in CANDLE_DTYPE.names}
+
+    def load(self, asset: str, timeframe: int, start: float, end: Optional[float] = None,
+             fetch: bool = True, fetch_history: Optional[Callable[..., List[Dict[str, Any]]]] = None
+             ) -> Dict[str, np.ndarray]:
+        """
+        Candles of a range as column arrays (the format Backtester.run accepts).
+
+        Without gaps in the range the arrays are zero-copy views; otherwise
+        the slots without a candle are dropped.
+        """
+        columns = self.view(asset, timeframe, start, end, fetch, fetch_history)
+        valid = columns['timestamp'] > 0
+        if valid.all():
+            return columns
+        return {name: column[valid] for name, column in columns.items()}
+
+    def candles(self, asset: str, timeframe: int, count: int, end_time: Optional[float] = None,
+                fetch: bool = True, fetch_history: Optional[Callable[..., List[Dict[str, Any]]]] = None
+                ) -> List[Dict[str, Any]]:
+        """
+        The last count closed candles up to end_time as dictionaries.
+
+        Same format as IQOptionConnector.fetch_candles(); gaps (market closed)
+        are not counted.
+        """
+        end_time = time.time() if end_time is None else end_time
+        span = count * timeframe
+        for _ in range(4):
+            columns = self.load(asset, timeframe, end_time - span, end_time, fetch, fetch_history)
+            if len(columns['timestamp']) >= count:
+                break
+            span *= 2  # Gaps in the range: look further back
+        columns = {name: column[-count:] for name, column in columns.items()}
+        return [
+            {
+                'open': float(columns['open'][i]),
+                'high': float(columns['high'][i]),
+                'low': float(columns['low'][i]),
+                'close': float(columns['close'][i]),
+                'volume': float(columns['volume'][i]),
+                'timestamp': int(columns['timestamp'][i])
+            }
+            for i in range(len(columns['timestamp']))
+        ]
+
+    def close(self):
+        with self._guard:
+            for series in self.series.values():
+                with series.lock:
+                    series.flush()
+            self.series.clear()
@@ -0,0 +1,66 @@
+import logging
+import math
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger("robo-trader.candle_clock")
+
+
+class CandleClock:
+    """
+    Broker server time and candle boundaries.
+
+    Candles open and close on multiples of their timeframe in server time, so
+    the offset between the server clock and the local clock is measured (and
+    re-measured every resync_interval seconds) and applied to time.time().
+    """
+
+    def __init__(self, get_server_timestamp: Optional[Callable[[], float]] = None,
+                 resync_interval: float = 300.0):
+        """
+        Args:
+            get_server_timestamp: Blocking call returning the server time in epoch
+                seconds (e.g. IQ_Option.get_server_timestamp); None to use the local clock
+            resync_interval: Seconds between offset measurements
+        """
+        self.get_server_timestamp = get_server_timestamp
+        self.resync_interval = resync_interval
+        self.offset = 0.0
+        self.synced_at: Optional[float] = None
+
+    def sync(self) -> float:
+        """Measure the server clock offset (blocking); returns the offset in seconds"""
+        if self.get_server_timestamp is None:
+            self.synced_at = time.monotonic()
+            return self.offset
+        try:
+            before = time.time()
+            server_time = float(self.get_server_timestamp())
+            after = time.time()
+        except Exception as e:
+            logger.warning(f"Could not read the server time: {str(e)}")
+            return self.offset
+
+        if server_time > 0:
+            # The server read the clock somewhere between the two local readings
+            self.offset = server_time - (before + after) / 2
+            self.synced_at = time.monotonic()
+            logger.debug(f"Server clock offset: {self.offset:+.3f}s")
+        return self.offset
+
+    @property
+    def needs_sync(self) -> bool:
+        return self.synced_at is None or time.monotonic() - self.synced_at >= self.resync_interval
+
+    def now(self) -> float:
+        """Current server time"""
+        return time.time() + self.offset
+
+    def last_close(self, candle_time: int, now: Optional[float] = None) -> int:
+        """Server timestamp at which the most recent candle closed"""
+        now = self.now() if now is None else now
+        return int(math.floor(now / candle_time) * candle_time)
+
+    def seconds_until(self, server_timestamp: float) -> float:
+        """Seconds from now until the given server time (negative if past)"""
+        return server_timestamp - self.now()
@@ -0,0 +1,244 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("robo-trader.candle_store")
+
+# Layout of one candle in the ring buffers
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+])
+
+
+class CandleRingBuffer:
+    """
+    Fixed-size ring buffer of candles backed by a NumPy structured array.
+
+    Every candle is written twice (at i and i + capacity), so the most recent
+    candles are always a contiguous slice and latest() returns a view without
+    copying.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Args:
+            capacity: Maximum number of candles kept
+        """
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=CANDLE_DTYPE)
+        self._head = 0  # Next write position
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Timestamp of the most recent candle"""
+        if self.size == 0:
+            return None
+        return int(self._data[self._head + self.capacity - 1]['timestamp'])
+
+    def _write(self, index: int, row: tuple):
+        self._data[index] = row
+        self._data[index + self.capacity] = row
+
+    def upsert(self, candle: Dict[str, Any]) -> bool:
+        """
+        Append a newer candle or update one already in the buffer.
+
+        Args:
+            candle: Candle dictionary with timestamp, open, high, low, close, volume
+
+        Returns:
+            True if the buffer changed
+        """
+        timestamp = int(candle['timestamp'])
+        row = (timestamp, candle['open'], candle['high'], candle['low'],
+               candle['close'], candle.get('volume', 0))
+        last_timestamp = self.last_timestamp
+
+        if last_timestamp is None or timestamp > last_timestamp:
+            self._write(self._head, row)
+            self._head = (self._head + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+            return True
+
+        # Update in place (usually the forming candle, at most a few steps back)
+        for offset in range(self.size):
+            index = (self._head - 1 - offset) % self.capacity
+            existing = self._data[index]['timestamp']
+            if existing == timestamp:
+                self._write(index, row)
+                return True
+            if existing < timestamp:
+                break
+        return False
+
+    def latest(self, count: Optional[int] = None) -> np.ndarray:
+        """Read-only view of the last count candles in chronological order"""
+        count = self.size if count is None else min(count, self.size)
+        end = self._head + self.capacity
+        view = self._data[end - count:end]
+        view.flags.writeable = False
+        return view
+
+
+class CandleStore:
+    """
+    Per-asset/timeframe candle buffers kept current from the realtime stream.
+
+    Each (asset, timeframe) buffer is seeded once from history and then
+    updated from api.start_candles_stream()/get_realtime_candles(), which
+    only read the websocket-fed local state. When the stream has a hole
+    (after a reconnect, for example) the missing candles are backfilled from
+    history. In steady state reading candles makes no network calls.
+    """
+
+    def __init__(self, api, fetch_history: Callable[..., List[Dict[str, Any]]],
+                capacity: int = 300, stream_size: int = 10):
+        """
+        Initialize the store
+
+        Args:
+            api: IQ_Option instance providing the realtime candle stream
+            fetch_history: Callable (asset, timeframe, count, end_time) returning
+                processed candles, e.g. IQOptionConnector.fetch_candles
+            capacity: Candles kept per asset/timeframe
+            stream_size: Number of candles kept by the realtime subscription
+        """
+        self.api = api
+        self.fetch_history = fetch_history
+        self.capacity = capacity
+        self.stream_size = stream_size
+        self.buffers: Dict[Tuple[str, int], CandleRingBuffer] = {}
+        self._locks: Dict[Tuple[str, int], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._subscribed_at: Dict[Tuple[str, int], float] = {}
+
+    def _lock(self, key: Tuple[str, int]) -> threading.Lock:
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def get_candles(self, asset: str, timeframe: int, count: int) -> List[Dict[str, Any]]:
+        """
+        Get the last count candles (including the forming one) as dictionaries.
+
+        Same format as IQOptionConnector.get_candles().
+        """
+        candles = self.get_array(asset, timeframe, count)
+        # tolist() converts the whole view to Python scalars at once (fields in
+        # CANDLE_DTYPE order), much cheaper than indexing every field of every row
+        return [
+            {
+                'open': open_,
+                'high': high,
+                'low': low,
+                'close': close,
+                'volume': volume,
+                'timestamp': timestamp
+            }
+            for timestamp, open_, high, low, close, volume in candles.tolist()
+        ]
+
+    def get_array(self, asset: str, timeframe: int, count: int) -> np.ndarray:
+        """Get the last count candles as a read-only structured array view"""
+        key = (asset, timeframe)
+
+        with self._lock(key):
+            buffer = self.buffers.get(key)
+            if buffer is None:
+                buffer = self._seed(asset, timeframe)
+            else:
+                self._update(asset, timeframe, buffer)
+            return buffer.latest(count)
+
+    def _subscribe(self, asset: str, timeframe: int):
+        self.api.start_candles_stream(asset, timeframe, self.stream_size)
+        self._subscribed_at[(asset, timeframe)] = time.time()
+        logger.info(f"Subscribed to {asset} {timeframe}s candle stream")
+
+    def _seed(self, asset: str, timeframe: int) -> CandleRingBuffer:
+        """Create a buffer from history and start the realtime subscription"""
+        buffer = CandleRingBuffer(self.capacity)
+        self._subscribe(asset, timeframe)
+
+        for candle in self.fetch_history(asset, timeframe, self.capacity, time.time()):
+            buffer.upsert(candle)
+
+        self.buffers[(asset, timeframe)] = buffer
+        self._update(asset, timeframe, buffer)
+        logger.debug(f"Seeded {asset} {timeframe}s buffer with {len(buffer)} candles")
+        return buffer
+
+    def _backfill(self, asset: str, timeframe: int, buffer: CandleRingBuffer, end_time: float):
+        """Fetch the candles missing between the buffer and end_time"""
+        last_timestamp = buffer.last_timestamp
+        missing = int((end_time - last_timestamp) // timeframe) + 1
+        missing = min(max(missing, 1), self.capacity)
+        logger.info(f"Backfilling {missing} candles for {asset} {timeframe}s")
+
+        for candle in self.fetch_history(asset, timeframe, missing, end_time):
+            buffer.upsert(candle)
+
+    def _update(self, asset: str, timeframe: int, buffer: CandleRingBuffer):
+        """Merge the realtime stream into the buffer"""
+        key = (asset, timeframe)
+        now = time.time()
+        current_start = int(now // timeframe) * timeframe
+
+        realtime = self.api.get_realtime_candles(asset, timeframe) or {}
+        newest = max(realtime) if realtime else None
+
+        if newest is None or newest < current_start - timeframe:
+            # The stream stopped updating (e.g. after a reconnect): resubscribe
+            # at most once per candle and backfill from history meanwhile
+            if now - self._subscribed_at.get(key, 0) >= timeframe:
+                self._subscribe(asset, timeframe)
+                if buffer.last_timestamp is None or buffer.last_timestamp < current_start:
+                    self._backfill(asset, timeframe, buffer, now)
+
+        for timestamp in sorted(realtime):
+            candle = realtime[timestamp]
+            last_timestamp = buffer.last_timestamp
+            if last_timestamp is not None and timestamp > last_timestamp + timeframe:
+                self._backfill(asset, timeframe, buffer, timestamp - 1)
+
+            buffer.upsert({
+                'open': candle['open'],
+                'high': candle['max'],
+                'low': candle['min'],
+                'close': candle['close'],
+                'volume': candle.get('volume', 0),
+                'timestamp': candle['from']
+            })
+
+    def resubscribe_all(self):
+        """Restore every realtime subscription (e.g. after a reconnect)"""
+        for asset, timeframe in list(self.buffers):
+            try:
+                self._subscribe(asset, timeframe)
+            except Exception as e:
+                logger.error(f"Error resubscribing {asset} {timeframe}s candles: {str(e)}")
+
+    def close(self, asset: Optional[str] = None):
+        """Stop the realtime subscriptions and drop the buffers of one or every asset"""
+        for key in list(self.buffers):
+            if asset is not None and key[0] != asset:
+                continue
+            try:
+                self.api.stop_candles_stream(*key)
+            except Exception as e:
+                logger.warning(f"Error stopping {key[0]} {key[1]}s candle stream: {str(e)}")
+            self.buffers.pop(key, None)
+            self._subscribed_at.pop(key, None)
@@ -0,0 +1,249 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger("robo-trader.connection_supervisor")
+
+
+class _Watch:
+    __slots__ = ("connector", "name", "connected", "reconnecting", "pinging", "attempts", "last_heartbeat")
+
+    def __init__(self, connector, name: str):
+        self.connector = connector
+        self.name = name
+        self.connected = True
+        self.reconnecting = False
+        self.pinging = False
+        self.attempts = 0
+        self.last_heartbeat = time.time()
+
+
+class ConnectionSupervisor:
+    """
+    Keeps any number of broker connections alive from a single scheduler thread.
+
+    A lost connection is detected from a close event (connection_lost(), or
+    the listener registered with the connector's set_disconnect_listener())
+    or, as a fallback, by a sweep of check_connect() every check_interval
+    seconds; check_connect() only reads local state. Reconnection attempts
+    are scheduled with exponential backoff and jitter; after a successful
+    connect() the connector's restore_session() (if any) restores the
+    selected balance and subscriptions. Blocking calls run on small worker
+    pools, reconnections apart from heartbeats so they never queue behind
+    pings, and a connection is not pinged again while its last ping is
+    pending.
+    """
+
+    def __init__(self, check_interval: float = 1.0, heartbeat_interval: float = 30.0,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, max_retries: Optional[int] = None,
+                 max_workers: int = 4):
+        """
+        Initialize the supervisor
+
+        Args:
+            check_interval: Seconds between check_connect() sweeps
+            heartbeat_interval: Seconds between pings of each connection
+            backoff_base: Delay before the first reconnection attempt
+            backoff_max: Maximum delay between attempts
+            max_retries: Attempts before giving up on a connection (None: never give up)
+            max_workers: Threads running connect() calls, and as many running ping() calls
+        """
+        self.check_interval = check_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retries = max_retries
+        self.max_workers = max_workers
+
+        self._watches: Dict[int, _Watch] = {}
+        self._schedule = []  # Heap of (due time, sequence, watch, action)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._heartbeat_executor = None
+        self._pending: Set[Future] = set()  # Reconnects and heartbeats submitted and not finished
+        self._stopping = False
+
+    # Registration
+
+    def watch(self, connector, name: Optional[str] = None):
+        """Start supervising a connected connector"""
+        key = id(connector)
+        listener = getattr(connector, "set_disconnect_listener", None)
+        with self._condition:
+            if key in self._watches:
+                return
+            watch = self._watches[key] = _Watch(connector, name or getattr(connector, "email", str(key)))
+            self._push(time.time() + self._heartbeat_offset(), watch, "heartbeat")
+            self._start()
+        if listener is not None:
+            listener(lambda: self.connection_lost(connector))
+        logger.info(f"Supervising connection {watch.name}")
+
+    def unwatch(self, connector):
+        """Stop supervising a connector (pending actions are discarded)"""
+        with self._condition:
+            watch = self._watches.pop(id(connector), None)
+        if watch is not None:
+            logger.info(f"Stopped supervising connection {watch.name}")
+
+    def connection_lost(self, connector):
+        """Close event: reconnect now instead of at the next sweep"""
+        with self._condition:
+            watch = self._watches.get(id(connector))
+            if watch is not None and watch.connected:
+                self._mark_lost(watch)
+                self._condition.notify()
+
+    def status(self) -> Dict[str, Dict[str, object]]:
+        with self._condition:
+            return {watch.name: {"connected": watch.connected, "attempts": watch.attempts,
+                                 "last_heartbeat": watch.last_heartbeat}
+                    for watch in self._watches.values()}
+
+    def shutdown(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        # Drop the work not started yet (shutdown(cancel_futures=True) needs Python 3.9)
+        for future in list(self._pending):
+            future.cancel()
+        for executor in (self._executor, self._heartbeat_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._executor = self._heartbeat_executor = None
+
+    # Scheduling (called with the condition held)
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="connection-supervisor")
+                self._heartbeat_executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="heartbeat")
+            self._thread = threading.Thread(target=self._run, name="connection-supervisor", daemon=True)
+            self._thread.start()
+
+    def _push(self, due: float, watch: _Watch, action: str):
+        heapq.heappush(self._schedule, (due, next(self._sequence), watch, action))
+
+    def _heartbeat_offset(self) -> float:
+        # Spread the pings of many connections over the interval
+        return self.heartbeat_interval * random.uniform(0.5, 1.0)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempts)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _mark_lost(self, watch: _Watch):
+        watch.connected = False
+        logger.warning(f"Connection {watch.name} lost, reconnecting")
+        if not watch.reconnecting:
+            watch.reconnecting = True
+            self._push(time.time(), watch, "reconnect")
+
+    # Scheduler thread
+
+    def _run(self):
+        next_sweep = time.time()
+        with self._condition:
+            while not self._stopping and self._watches:
+                now = time.time()
+                if now >= next_sweep:
+                    self._sweep()
+                    next_sweep = now + self.check_interval
+
+                while self._schedule and self._schedule[0][0] <= now:
+                    _, _, watch, action = heapq.heappop(self._schedule)
+                    # Actions of connectors unwatched meanwhile are dropped
+                    if self._watches.get(id(watch.connector)) is watch:
+                        self._dispatch(watch, action)
+
+                due = min(next_sweep, self._schedule[0][0]) if self._schedule else next_sweep
+                self._condition.wait(max(due - time.time(), 0))
+
+    def _sweep(self):
+        for watch in list(self._watches.values()):
+            if watch.connected and not watch.reconnecting:
+                try:
+                    connected = watch.connector.check_connect()
+                except Exception:
+                    connected = False
+                if not connected:
+                    self._mark_lost(watch)
+
+    def _dispatch(self, watch: _Watch, action: str):
+        if action == "reconnect":
+            self._track(self._executor.submit(self._reconnect, watch))
+        elif action == "heartbeat":
+            if watch.connected and not watch.pinging:
+                watch.pinging = True
+                self._track(self._heartbeat_executor.submit(self._heartbeat, watch))
+            self._push(time.time() + self.heartbeat_interval, watch, "heartbeat")
+
+    def _track(self, future: Future):
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+
+    # Worker threads
+
+    def _heartbeat(self, watch: _Watch):
+        try:
+            watch.connector.ping()
+            watch.last_heartbeat = time.time()
+        except Exception as e:
+            logger.warning(f"Heartbeat of {watch.name} failed: {str(e)}")
+        finally:
+            watch.pinging = False
+
+    def _reconnect(self, watch: _Watch):
+        attempt = watch.attempts + 1
+        logger.info(f"Reconnecting {watch.name} (attempt {attempt})")
+        try:
+            success = watch.connector.connect()
+            if success:
+                restore = getattr(watch.connector, "restore_session", None)
+                if restore is not None:
+                    restore()
+        except Exception as e:
+            logger.error(f"Error reconnecting {watch.name}: {str(e)}")
+            success = False
+
+        with self._condition:
+            if self._watches.get(id(watch.connector)) is not watch:
+                return  # Unwatched meanwhile
+            if success:
+                logger.info(f"Connection {watch.name} restored after {attempt} attempt(s)")
+                watch.connected = True
+                watch.reconnecting = False
+                watch.attempts = 0
+            elif self.max_retries is not None and attempt >= self.max_retries:
+                logger.error(f"Giving up on connection {watch.name} after {attempt} attempts")
+                del self._watches[id(watch.connector)]
+            else:
+                watch.attempts = attempt
+                delay = self._backoff(attempt)
+                logger.info(f"Next reconnection attempt of {watch.name} in {delay:.1f}s")
+                self._push(time.time() + delay, watch, "reconnect")
+            self._condition.notify()
+
+
+_supervisor: Optional[ConnectionSupervisor] = None
+_supervisor_lock = threading.Lock()
+
+
+def get_supervisor() -> ConnectionSupervisor:
+    """The process-wide supervisor shared by every connector"""
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            _supervisor = ConnectionSupervisor()
+        return _supervisor
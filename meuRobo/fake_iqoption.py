@@ -0,0 +1,317 @@
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("robo-trader.fake_api")
+
+DEFAULT_ASSETS = ["EURUSD", "GBPUSD", "USDJPY", "AUDUSD", "EURJPY",
+                  "EURUSD-OTC", "GBPUSD-OTC", "USDJPY-OTC", "EURGBP-OTC", "AUDCAD-OTC"]
+
+
+class SyntheticPriceFeed:
+    """
+    Deterministic per-second prices for any asset and any point in time.
+
+    Prices are a sum of slow and fast waves plus hashed noise, so any interval
+    can be generated on demand and candles of different timeframes agree.
+    """
+
+    def __init__(self, seed: int = 0, volatility: float = 0.0005):
+        self.seed = seed
+        self.volatility = volatility
+        self._params: Dict[str, Tuple[float, np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def _asset_params(self, asset: str):
+        if asset not in self._params:
+            rng = np.random.default_rng([self.seed, sum(ord(c) * 31 ** i for i, c in enumerate(asset)) % 2 ** 32])
+            base = float(rng.uniform(0.5, 150))
+            periods = np.array([3600 * 6, 3600, 900, 240, 60], dtype=np.float64) * rng.uniform(0.8, 1.2, 5)
+            amplitudes = self.volatility * np.array([8, 4, 2, 1, 0.5]) * rng.uniform(0.5, 1.5, 5)
+            phases = rng.uniform(0, 2 * np.pi, 5)
+            self._params[asset] = (base, periods, amplitudes, phases)
+        return self._params[asset]
+
+    def ticks(self, asset: str, start: int, end: int) -> np.ndarray:
+        """Prices for every second in [start, end)"""
+        base, periods, amplitudes, phases = self._asset_params(asset)
+        t = np.arange(start, end, dtype=np.float64)
+        waves = (amplitudes[:, None] * np.sin(2 * np.pi * t[None, :] / periods[:, None] + phases[:, None])).sum(axis=0)
+
+        # Stateless noise: hash of (seed, second)
+        h = (t.astype(np.uint64) * np.uint64(2654435761) + np.uint64(self.seed * 97 + 13)) % np.uint64(2 ** 32)
+        noise = (h.astype(np.float64) / 2 ** 32 - 0.5) * self.volatility
+        return base * (1 + waves + noise)
+
+
+class RecordedPriceFeed:
+    """
+    Replays recorded prices, looping over the recording.
+
+    The file is an .npz archive with, for each asset, an array named after it
+    holding rows of (timestamp, price). The recording is shifted so that it
+    starts at the moment the feed is created.
+    """
+
+    def __init__(self, path: str):
+        archive = np.load(path)
+        self.series = {asset: np.asarray(archive[asset], dtype=np.float64) for asset in archive.files}
+        self.started_at = int(time.time())
+
+    @property
+    def assets(self) -> List[str]:
+        return list(self.series)
+
+    def ticks(self, asset: str, start: int, end: int) -> np.ndarray:
+        """Prices for every second in [start, end)"""
+        data = self.series[asset]
+        first, last = data[0, 0], data[-1, 0]
+        span = max(last - first, 1)
+        t = (np.arange(start, end, dtype=np.float64) - self.started_at) % span + first
+        return np.interp(t, data[:, 0], data[:, 1])
+
+
+class FakeIQOption:
+    """
+    Local stand-in for iqoptionapi.stable_api.IQ_Option.
+
+    Implements the subset of the API used by the connectors (connection,
+    balances, open times, candles, realtime candle stream, digital and binary
+    orders) on top of a synthetic or recorded price feed. Each network call
+    can be delayed (latency + jitter) and made to fail at a configurable rate.
+    """
+
+    def __init__(self, email: str, password: str, latency: float = 0.05, jitter: float = 0.02,
+                failure_rate: float = 0.0, payout: float = 0.85, seed: Optional[int] = None,
+                assets: Optional[List[str]] = None, price_feed=None, balance: float = 10000.0):
+        """
+        Initialize the fake API
+
+        Args:
+            email: Account email
+            password: Account password ('invalid' simulates wrong credentials)
+            latency: Base delay of every network call in seconds
+            jitter: Maximum random delay added to the latency in seconds
+            failure_rate: Probability (0-1) that a call fails
+            payout: Profit per unit staked on a winning order
+            seed: Seed for the price feed and the injected randomness
+            assets: Assets to list as open (default: feed assets or DEFAULT_ASSETS)
+            price_feed: SyntheticPriceFeed or RecordedPriceFeed
+            balance: Initial balance of both accounts
+        """
+        self.email = email
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.payout = payout
+        self.price_feed = price_feed or SyntheticPriceFeed(seed=seed or 0)
+        self.assets = assets or getattr(self.price_feed, "assets", None) or list(DEFAULT_ASSETS)
+        self.closed_assets = set()
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._order_ids = itertools.count(1000)
+        self._connected = False
+        self.on_disconnect = None  # Called when the connection drops, like a websocket close
+        self._balances = {"PRACTICE": balance, "REAL": balance}
+        self._balance_type = "PRACTICE"
+        self._orders: Dict[int, Dict[str, Any]] = {}
+        self._streams: Dict[Tuple[str, int], int] = {}
+        self.calls: Dict[str, int] = {}
+
+    # Fault injection
+
+    def _network(self, name: str):
+        """Simulate a round trip; raises when a failure is injected"""
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise ConnectionError(f"Injected failure in {name}")
+
+    def drop_connection(self):
+        """Simulate the websocket being closed by the server"""
+        self._connected = False
+        if self.on_disconnect is not None:
+            self.on_disconnect()
+
+    # Connection
+
+    def connect(self):
+        try:
+            self._network("connect")
+        except ConnectionError as e:
+            return False, json.dumps({"message": str(e)})
+        if self.password == "invalid":
+            return False, '{"code":"invalid_credentials","message":"You entered the wrong credentials. Please ensure that your login/password is correct."}'
+        self._connected = True
+        return True, None
+
+    def check_connect(self):
+        return self._connected
+
+    def disconnect(self):
+        self._connected = False
+
+    def ping(self):
+        self._network("ping")
+
+    def get_server_timestamp(self):
+        return time.time()
+
+    # Account
+
+    def change_balance(self, balance_type):
+        self._balance_type = balance_type.upper()
+
+    def get_balance(self):
+        self._network("get_balance")
+        return round(self._balances[self._balance_type], 2)
+
+    # Market data
+
+    def get_all_open_time(self):
+        self._network("get_all_open_time")
+        markets = {}
+        for market in ("digital", "turbo", "binary"):
+            markets[market] = {asset: {"open": asset not in self.closed_assets} for asset in self.assets}
+        return markets
+
+    def price(self, asset: str, timestamp: Optional[float] = None) -> float:
+        """Current (or historical) price of an asset"""
+        second = int(timestamp if timestamp is not None else time.time())
+        return float(self.price_feed.ticks(asset, second, second + 1)[0])
+
+    def _candles(self, asset: str, interval: int, count: int, endtime: float) -> List[Dict[str, Any]]:
+        now = time.time()
+        last_from = int(min(endtime, now) // interval) * interval
+        first_from = last_from - (count - 1) * interval
+        end = min(last_from + interval, int(now) + 1)
+        prices = self.price_feed.ticks(asset, first_from, end)
+
+        # Pad the forming candle so every candle has `interval` ticks
+        padded = np.full(count * interval, prices[-1])
+        padded[:len(prices)] = prices
+        rows = padded.reshape(count, interval)
+        forming = len(prices) - (count - 1) * interval
+
+        candles = []
+        for i, row in enumerate(rows):
+            if i == count - 1:
+                row = row[:max(forming, 1)]
+            start = first_from + i * interval
+            candles.append({
+                "id": start // interval,
+                "from": start,
+                "to": start + interval,
+                "open": float(row[0]),
+                "close": float(row[-1]),
+                "min": float(row.min()),
+                "max": float(row.max()),
+                "volume": len(row),
+            })
+        return candles
+
+    def get_candles(self, asset, interval, count, endtime):
+        self._network("get_candles")
+        return self._candles(asset, int(interval), int(count), endtime)
+
+    def start_candles_stream(self, asset, size, maxdict):
+        self._network("start_candles_stream")
+        self._streams[(asset, int(size))] = int(maxdict)
+
+    def stop_candles_stream(self, asset, size):
+        self._streams.pop((asset, int(size)), None)
+
+    def get_realtime_candles(self, asset, size):
+        # Local state in the real API: no round trip
+        maxdict = self._streams.get((asset, int(size)))
+        if maxdict is None or not self._connected:
+            return {}
+        return {candle["from"]: candle for candle in self._candles(asset, int(size), maxdict, time.time())}
+
+    # Orders
+
+    def _open_order(self, asset, amount, action, duration_seconds, option_type):
+        if not self._connected:
+            return False, "Not connected"
+        if asset in self.closed_assets or asset not in self.assets:
+            return False, f"Asset {asset} is closed"
+        if amount > self._balances[self._balance_type]:
+            return False, "Insufficient funds"
+
+        now = time.time()
+        order_id = next(self._order_ids)
+        self._balances[self._balance_type] -= amount
+        self._orders[order_id] = {
+            "asset": asset,
+            "amount": amount,
+            "direction": action.lower(),
+            "open_price": self.price(asset, now),
+            "expires_at": now + duration_seconds,
+            "option_type": option_type,
+            "profit": None,
+        }
+        return True, order_id
+
+    def buy_digital_spot_v2(self, asset, amount, action, duration):
+        try:
+            self._network("buy_digital_spot_v2")
+        except ConnectionError as e:
+            return False, str(e)
+        return self._open_order(asset, amount, action, duration * 60, "digital")
+
+    def buy_digital_spot(self, asset, amount, action, duration):
+        return self.buy_digital_spot_v2(asset, amount, action, duration)
+
+    def buy(self, amount, asset, action, duration):
+        try:
+            self._network("buy")
+        except ConnectionError as e:
+            return False, str(e)
+        return self._open_order(asset, amount, action, duration * 60, "binary")
+
+    def _settle(self, order_id) -> Optional[float]:
+        order = self._orders.get(order_id)
+        if order is None:
+            return None
+        if order["profit"] is None:
+            if time.time() < order["expires_at"]:
+                return None
+            close_price = self.price(order["asset"], order["expires_at"])
+            move = close_price - order["open_price"]
+            if order["direction"] == "put":
+                move = -move
+            if move > 0:
+                order["profit"] = order["amount"] * self.payout
+            elif move < 0:
+                order["profit"] = -order["amount"]
+            else:
+                order["profit"] = 0.0
+            self._balances[self._balance_type] += order["amount"] + order["profit"]
+        return order["profit"]
+
+    def check_win_digital_v2(self, order_id):
+        # Results are pushed over the websocket in the real API: no round trip
+        profit = self._settle(order_id)
+        if profit is None:
+            return False, None
+        return True, profit
+
+    def check_win_v4(self, order_id):
+        order = self._orders.get(order_id)
+        if order is None:
+            return None, None
+        time.sleep(max(0.0, order["expires_at"] - time.time()))
+        profit = self._settle(order_id)
+        outcome = "win" if profit > 0 else ("equal" if profit == 0 else "loose")
+        return outcome, profit
@@ -0,0 +1,231 @@
+import logging
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("robo-trader.history")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    time TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    direction TEXT,
+    amount REAL,
+    result REAL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS operations_ts ON operations (ts);
+CREATE INDEX IF NOT EXISTS operations_asset_ts ON operations (asset, ts);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = ("id", "time", "asset", "direction", "amount", "result", "status")
+
+
+class OperationHistoryStore:
+    """
+    Durable, append-only journal of settled operations backed by SQLite (WAL).
+
+    Appends are buffered and committed in batches, either when batch_size
+    operations are pending or every flush_interval seconds from a background
+    thread. Only the last tail_size operations are kept in memory (what the
+    money manager needs), so memory stays flat however long the bot runs.
+
+    Clearing the history does not delete rows: it records the last cleared id
+    and every read only sees operations after it.
+    """
+
+    def __init__(self, path: str = "operation_history.db", batch_size: int = 50,
+                flush_interval: float = 1.0, tail_size: int = 100):
+        """
+        Initialize the store
+
+        Args:
+            path: SQLite database file
+            batch_size: Pending operations that trigger an immediate commit
+            flush_interval: Maximum seconds an operation waits before being committed
+            tail_size: Number of recent operations kept in memory
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self._pending: List[tuple] = []
+        self.cleared_through = int(self._get_meta("cleared_through", "0"))
+        self.last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM operations").fetchone()[0]
+
+        rows = self._conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM operations WHERE id > ? ORDER BY id DESC LIMIT ?",
+            (self.cleared_through, tail_size)).fetchall()
+        self._tail = deque((self._row_to_operation(row) for row in reversed(rows)), maxlen=tail_size)
+        self._count = self._conn.execute(
+            "SELECT COUNT(*) FROM operations WHERE id > ?", (self.cleared_through,)).fetchone()[0]
+
+        self._stop_event = threading.Event()
+        self._flush_thread = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flush_thread.start()
+
+        logger.info(f"Operation history opened at {path} ({self._count} operations)")
+
+    def __len__(self):
+        return self._count
+
+    def _get_meta(self, key: str, default: str) -> str:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    @staticmethod
+    def _row_to_operation(row) -> Dict[str, Any]:
+        return dict(zip(COLUMNS, row))
+
+    @staticmethod
+    def _to_timestamp(value) -> float:
+        if isinstance(value, (int, float)):
+            return float(value)
+        return datetime.fromisoformat(value).timestamp()
+
+    def append(self, operation: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add an operation to the journal.
+
+        Args:
+            operation: Operation record (time, asset, direction, amount, result, status);
+                its id is assigned by the store
+
+        Returns:
+            The stored operation, including its id
+        """
+        with self._lock:
+            self.last_id += 1
+            operation = dict(operation, id=self.last_id)
+            self._pending.append((
+                operation["id"], self._to_timestamp(operation["time"]), operation["time"],
+                operation["asset"], operation.get("direction"), operation.get("amount"),
+                operation.get("result"), operation.get("status")))
+            self._tail.append(operation)
+            self._count += 1
+
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+        return operation
+
+    def flush(self):
+        """Commit the pending operations"""
+        with self._lock:
+            if not self._pending:
+                return
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO operations (id, ts, time, asset, direction, amount, result, status) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._pending)
+                self._pending = []
+            except sqlite3.Error as e:
+                logger.error(f"Error writing operation history: {str(e)}")
+
+    def _flush_periodically(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Flush and close the database"""
+        self._stop_event.set()
+        self._flush_thread.join(timeout=2.0)
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    def recent(self, count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent operations in chronological order (at most tail_size)"""
+        with self._lock:
+            operations = list(self._tail)
+        return operations if count is None else operations[-count:]
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        """Most recent operation"""
+        with self._lock:
+            return self._tail[-1] if self._tail else None
+
+    def clear(self):
+        """Hide every operation recorded so far"""
+        with self._lock:
+            self.flush()
+            self.cleared_through = self.last_id
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('cleared_through', ?)",
+                                   (str(self.cleared_through),))
+            self._tail.clear()
+            self._count = 0
+
+    @property
+    def version(self) -> str:
+        """Changes whenever operations are appended or cleared (used as ETag)"""
+        return f"{self.cleared_through}-{self.last_id}"
+
+    def query(self, limit: int = 50, cursor: Optional[int] = None, start=None, end=None,
+              asset: Optional[str] = None, order: str = "desc") -> Dict[str, Any]:
+        """
+        Read one page of the journal.
+
+        Args:
+            limit: Maximum number of operations returned
+            cursor: Continue after this operation id (from a previous next_cursor)
+            start: Only operations at or after this time (ISO string or epoch seconds)
+            end: Only operations before this time (ISO string or epoch seconds)
+            asset: Only operations on this asset
+            order: 'desc' (newest first) or 'asc'
+
+        Returns:
+            Dictionary with the operations and the next_cursor (None on the last page)
+        """
+        descending = order != "asc"
+        conditions = ["id > ?"]
+        params: List[Any] = [self.cleared_through]
+
+        if cursor is not None:
+            conditions.append("id < ?" if descending else "id > ?")
+            params.append(cursor)
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(self._to_timestamp(start))
+        if end is not None:
+            conditions.append("ts < ?")
+            params.append(self._to_timestamp(end))
+        if asset:
+            conditions.append("asset = ?")
+            params.append(asset)
+
+        sql = (f"SELECT {', '.join(COLUMNS)} FROM operations WHERE {' AND '.join(conditions)} "
+               f"ORDER BY id {'DESC' if descending else 'ASC'} LIMIT ?")
+        params.append(limit + 1)
+
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(sql, params).fetchall()
+
+        operations = [self._row_to_operation(row) for row in rows[:limit]]
+        next_cursor = operations[-1]["id"] if len(rows) > limit else None
+        return {"history": operations, "next_cursor": next_cursor}
+
+    def iter_operations(self, start=None, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Every operation since start, in chronological order, read page by page"""
+        cursor = None
+        while True:
+            page = self.query(limit=page_size, cursor=cursor, start=start, order="asc")
+            yield from page["history"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
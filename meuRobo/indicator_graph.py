@@ -0,0 +1,221 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+
+SOURCES = ("open", "high", "low", "close", "volume")
+
+
+class Node:
+    """
+    One indicator series: an operation, its input nodes and its parameters.
+
+    Nodes are immutable and compare by value, so two strategies declaring
+    sma(CLOSE, 20) declare the same node and the graph computes it once.
+    """
+
+    __slots__ = ("op", "inputs", "params", "_key")
+
+    def __init__(self, op: str, inputs: Tuple["Node", ...] = (), params: Tuple[Any, ...] = ()):
+        self.op = op
+        self.inputs = tuple(inputs)
+        self.params = tuple(params)
+        self._key = (op, tuple(node._key for node in self.inputs), self.params)
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and self._key == other._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __repr__(self):
+        arguments = [repr(node) for node in self.inputs] + [repr(param) for param in self.params]
+        return f"{self.op}({', '.join(arguments)})"
+
+
+def source(name: str) -> Node:
+    if name not in SOURCES:
+        raise ValueError(f"Unknown candle field: {name}")
+    return Node("source", params=(name,))
+
+
+OPEN = source("open")
+HIGH = source("high")
+LOW = source("low")
+CLOSE = source("close")
+VOLUME = source("volume")
+
+
+# Declarations
+
+def rolling_max(node: Node, window: int) -> Node:
+    return Node("rolling_max", (node,), (int(window),))
+
+
+def rolling_min(node: Node, window: int) -> Node:
+    return Node("rolling_min", (node,), (int(window),))
+
+
+def sma(node: Node, window: int) -> Node:
+    return Node("sma", (node,), (int(window),))
+
+
+def ema(node: Node, span: int) -> Node:
+    """Exponential moving average, alpha = 2 / (span + 1), seeded with the first value"""
+    return Node("ema", (node,), (int(span),))
+
+
+def stochastic_k(k_period: int, slowing: int = 1, high: Node = HIGH, low: Node = LOW, close: Node = CLOSE) -> Node:
+    """%K over k_period candles, smoothed over slowing candles"""
+    raw = Node("stochastic", (close, rolling_max(high, k_period), rolling_min(low, k_period)))
+    return sma(raw, slowing) if slowing > 1 else raw
+
+
+def stochastic_d(k_period: int, slowing: int, d_period: int, **sources: Node) -> Node:
+    return sma(stochastic_k(k_period, slowing, **sources), d_period)
+
+
+def above(left: Node, right: Node) -> Node:
+    """Boolean series, True where left > right"""
+    return Node("above", (left, right))
+
+
+# Operations along the last axis (candles); NaN where a window is not full yet
+
+def _rolling_reduce(values: np.ndarray, window: int, func) -> np.ndarray:
+    """
+    Apply func over a trailing window along the last axis.
+
+    The first window-1 positions are NaN, like pandas' rolling(window).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(values.shape, np.nan)
+    if window < 1 or values.shape[-1] < window:
+        return result
+    windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=-1)
+    result[..., window - 1:] = func(windows, axis=-1)
+    return result
+
+
+def _ema(values: np.ndarray, span: int) -> np.ndarray:
+    alpha = 2.0 / (span + 1)
+    result = np.array(values, dtype=np.float64)
+    for i in range(1, result.shape[-1]):
+        previous = result[..., i - 1]
+        current = result[..., i]
+        # A NaN before the first value keeps the seed at the first valid value
+        result[..., i] = np.where(np.isnan(previous), current, previous + alpha * (current - previous))
+    return result
+
+
+def _stochastic(close: np.ndarray, highest_high: np.ndarray, lowest_low: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * ((close - lowest_low) / (highest_high - lowest_low))
+
+
+OPERATIONS: Dict[str, Callable[..., np.ndarray]] = {
+    "rolling_max": lambda values, window: _rolling_reduce(values, window, np.max),
+    "rolling_min": lambda values, window: _rolling_reduce(values, window, np.min),
+    "sma": lambda values, window: _rolling_reduce(values, window, np.mean),
+    "ema": _ema,
+    "stochastic": _stochastic,
+    "above": lambda left, right: left > right,
+}
+
+
+class IndicatorGraph:
+    """
+    Indicator values over one set of candles.
+
+    Every requested node is computed once, after its inputs, and kept for
+    the next request; arrays are shared read-only between all readers. Any
+    number of strategies can evaluate their declarations on the same graph:
+    the cost grows with the number of distinct nodes, not of strategies.
+    """
+
+    def __init__(self, candles: Mapping[str, Any]):
+        """
+        Args:
+            candles: Structured array or mapping of candle fields ('high',
+                'low', 'close', ...), 1-D or 2-D (rows x candles)
+        """
+        self.candles = candles
+        self.values: Dict[Node, np.ndarray] = {}
+        self.computed = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    def __getitem__(self, node: Node) -> np.ndarray:
+        with self._lock:
+            return self._evaluate(node)
+
+    def evaluate(self, nodes: Mapping[str, Node]) -> Dict[str, np.ndarray]:
+        """Values of named declarations, e.g. a strategy's indicators"""
+        with self._lock:
+            return {name: self._evaluate(node) for name, node in nodes.items()}
+
+    def _evaluate(self, node: Node) -> np.ndarray:
+        value = self.values.get(node)
+        if value is not None:
+            self.reused += 1
+            return value
+
+        if node.op == "source":
+            # A read-only view: no copy when the field already is float64
+            value = np.asarray(self.candles[node.params[0]], dtype=np.float64).view()
+        else:
+            inputs = [self._evaluate(child) for child in node.inputs]
+            value = OPERATIONS[node.op](*inputs, *node.params)
+        value.flags.writeable = False
+        self.values[node] = value
+        self.computed += 1
+        return value
+
+
+class IndicatorEngine:
+    """
+    Indicator graphs of the latest candles of each asset.
+
+    graph() returns the same IndicatorGraph for as long as the last candle
+    of a key does not change, so the strategies analyzing an asset share
+    its indicators, and each node is computed once per asset per new candle.
+    """
+
+    def __init__(self, max_keys: int = 1024):
+        self.max_keys = max_keys
+        self.graphs: "OrderedDict[Hashable, Tuple[Any, IndicatorGraph]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def graph(self, key: Hashable, candles: Mapping[str, Any], stamp: Optional[Any] = None) -> IndicatorGraph:
+        """
+        Args:
+            key: Series identifier, e.g. (asset, timeframe)
+            candles: Candle arrays (see IndicatorGraph)
+            stamp: Identifies the candles (default: the last timestamp)
+        """
+        if stamp is None:
+            stamp = np.asarray(candles['timestamp'])[..., -1].tolist()
+        with self._lock:
+            entry = self.graphs.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.graphs.move_to_end(key)
+                return entry[1]
+            graph = IndicatorGraph(candles)
+            self.graphs[key] = (stamp, graph)
+            self.graphs.move_to_end(key)
+            while len(self.graphs) > self.max_keys:
+                self.graphs.popitem(last=False)
+            return graph
+
+    def evaluate(self, key: Hashable, candles: Mapping[str, Any], nodes: Mapping[str, Node],
+                 stamp: Optional[Any] = None) -> Dict[str, np.ndarray]:
+        return self.graph(key, candles, stamp).evaluate(nodes)
+
+    def discard(self, keys: Optional[Iterable[Hashable]] = None):
+        """Drop the graphs of some keys (default: all)"""
+        with self._lock:
+            if keys is None:
+                self.graphs.clear()
+            for key in keys or ():
+                self.graphs.pop(key, None)
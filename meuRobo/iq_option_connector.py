@@ -1,20 +1,45 @@
-from iqoptionapi.stable_api import IQ_Option
 import time
 import logging
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import json
 
+from meuRobo.api_factory import create_api
+from meuRobo.candle_archive import MAX_CANDLES_PER_REQUEST
+from meuRobo.candle_clock import CandleClock
+from meuRobo.candle_store import CANDLE_DTYPE, CandleStore
+from meuRobo.market_snapshot import OpenTimeSnapshot
+from meuRobo.metrics import InstrumentedAPI, RECONNECTS
+
 logger = logging.getLogger("robo-trader.connector")
 
 class IQOptionConnector:
-    def __init__(self, email, password):
-        """Initialize the IQ Option connector"""
+    def __init__(self, email, password, open_time_ttl=30, candle_stream=True, candle_buffer_size=300,
+                 candle_archive=None):
+        """Initialize the IQ Option connector
+        
+        Args:
+            email: Account email
+            password: Account password
+            open_time_ttl: Seconds the market open-time snapshot stays fresh
+            candle_stream: Serve get_candles() from realtime-fed ring buffers
+            candle_buffer_size: Candles kept per asset/timeframe by the candle store
+            candle_archive: CandleArchive serving the closed candles of history requests
+        """
         self.email = email
         self.password = password
-        self.api = IQ_Option(email, password)
+        # Every API call is timed (see meuRobo.metrics)
+        self.api = InstrumentedAPI(create_api(email, password))
         self.account_type = "PRACTICE"  # Default to practice account
         self.last_error = None
+        self.connected_once = False
+        self.open_times = OpenTimeSnapshot(self.api, ttl=open_time_ttl)
+        self.clock = CandleClock(self.api.get_server_timestamp)
+        self._disconnect_listener = None
+        self.candle_archive = candle_archive
+        self.candle_store = (CandleStore(self.api, self.fetch_history, capacity=candle_buffer_size)
+                             if candle_stream else None)
         
     def connect(self):
         """Connect to IQ Option platform"""
@@ -25,6 +50,12 @@ class IQOptionConnector:
             
             if check:
                 logger.info("Connected successfully!")
+                if self.connected_once:
+                    RECONNECTS.inc()
+                self.connected_once = True
+                self._install_close_hook()
+                self.clock.sync()
+                self.open_times.start()
                 return True
             else:
                 # Parse the error message
@@ -58,6 +89,61 @@ class IQOptionConnector:
             self.last_error = error_msg
             return False
     
+    def check_connect(self):
+        """Whether the websocket is connected (reads local state only)"""
+        try:
+            return bool(self.api.check_connect())
+        except Exception:
+            return False
+    
+    def ping(self):
+        """Send a heartbeat to the broker"""
+        self.api.ping()
+    
+    def restore_session(self):
+        """Restore the selected balance and the candle subscriptions after a reconnect"""
+        self.api.change_balance(self.account_type)
+        if self.candle_store is not None:
+            self.candle_store.resubscribe_all()
+        try:
+            self.open_times.refresh()
+        except Exception:
+            pass  # Already logged; the snapshot refreshes itself later
+        logger.info(f"Session restored ({self.account_type} account)")
+    
+    def set_disconnect_listener(self, callback):
+        """Call callback() as soon as the broker websocket closes"""
+        self._disconnect_listener = callback
+        self._install_close_hook()
+    
+    def _notify_disconnect(self, *args):
+        if self._disconnect_listener is not None:
+            self._disconnect_listener()
+    
+    def _install_close_hook(self):
+        """Hook the websocket close event of the API (a new socket is created on every connect)"""
+        if self._disconnect_listener is None:
+            return
+        if hasattr(self.api, "on_disconnect"):
+            # Local fake API
+            self.api.on_disconnect = self._notify_disconnect
+            return
+        try:
+            # iqoptionapi: websocket.WebSocketApp of the underlying IQOptionAPI
+            wss = self.api.api.websocket_client.wss
+        except AttributeError:
+            return  # Only the supervisor's check_connect() sweep detects the drop
+        original = wss.on_close
+        
+        def on_close(*args):
+            try:
+                if original is not None:
+                    original(*args)
+            finally:
+                self._notify_disconnect()
+        
+        wss.on_close = on_close
+    
     def get_last_error(self):
         """Return the last error message"""
         return self.last_error or "Unknown error"
@@ -80,44 +166,22 @@ class IQOptionConnector:
         
     def check_asset_availability(self, asset, option_type):
         """Check if asset is available for trading"""
-        all_assets = self.api.get_all_open_time()
-        
-        if option_type == "digital":
-            if asset in all_assets['digital']:
-                return all_assets['digital'][asset]['open']
-            else:
-                return False
-        elif option_type == "binary":
-            if asset in all_assets['turbo'] or asset in all_assets['binary']:
-                return (all_assets['turbo'].get(asset, {}).get('open', False) or 
-                        all_assets['binary'].get(asset, {}).get('open', False))
-            else:
-                return False
-        else:
+        if option_type not in ("digital", "binary"):
             logger.error(f"Invalid option type: {option_type}")
             return False
+        return self.open_times.is_open(asset, option_type)
             
     def get_available_assets(self, option_type):
         """Get list of available assets for trading"""
-        all_assets = self.api.get_all_open_time()
-        available_assets = []
-        
-        if option_type == "digital":
-            for asset in all_assets['digital']:
-                if all_assets['digital'][asset]['open']:
-                    available_assets.append(asset)
-        elif option_type == "binary":
-            for asset in all_assets['turbo']:
-                if all_assets['turbo'][asset]['open']:
-                    available_assets.append(asset)
-            for asset in all_assets['binary']:
-                if all_assets['binary'][asset]['open'] and asset not in available_assets:
-                    available_assets.append(asset)
-        
-        return available_assets
+        if option_type not in ("digital", "binary"):
+            return []
+        return self.open_times.open_assets(option_type)
         
     def get_candles(self, asset, timeframe, count):
-        """Get historical candles for an asset
+        """Get the latest candles for an asset
+        
+        Served from the realtime candle store when it is enabled, so steady-state
+        reads make no network calls.
         
         Args:
             asset: Asset symbol (e.g., "EURUSD")
@@ -127,36 +191,126 @@ class IQOptionConnector:
         Returns:
             List of candle dictionaries with open, close, high, low values
         """
+        if self.candle_store is None or count > self.candle_store.capacity:
+            return self.fetch_candles(asset, timeframe, count)
+        
         try:
-            logger.debug(f"Getting {count} candles for {asset} with timeframe {timeframe}s")
+            return self.candle_store.get_candles(asset, timeframe, count)
+        except Exception as e:
+            logger.error(f"Error reading candle stream for {asset}: {str(e)}")
+            return self.fetch_candles(asset, timeframe, count)
+    
+    def fetch_candles(self, asset, timeframe, count, end_time=None):
+        """Download historical candles for an asset
+        
+        Args:
+            asset: Asset symbol (e.g., "EURUSD")
+            timeframe: Candle timeframe in seconds (e.g., 60 for 1 minute)
+            count: Number of candles to retrieve
+            end_time: Timestamp of the last candle (default: now)
             
-            # Get candles from IQ Option API
-            candles = self.api.get_candles(asset, timeframe, count, time.time())
+        Returns:
+            List of candle dictionaries with open, close, high, low values
+            (empty on errors)
+        """
+        try:
+            candles = self.download_candles(asset, timeframe, count, end_time)
             
-            if not candles or len(candles) == 0:
+            if not candles:
                 logger.warning(f"No candles returned for {asset}")
-                return []
-                
-            # Process candles into a standard format
-            processed_candles = []
-            for candle in candles:
-                processed_candles.append({
-                    'open': candle['open'],
-                    'high': candle['max'],
-                    'low': candle['min'],
-                    'close': candle['close'],
-                    'volume': candle['volume'],
-                    'timestamp': candle['from']
-                })
-                
-            return processed_candles
+            return candles
             
         except Exception as e:
             logger.error(f"Error retrieving candles for {asset}: {str(e)}")
             return []
+    
+    def download_candles(self, asset, timeframe, count, end_time=None):
+        """Download historical candles like fetch_candles(), raising on errors
+        
+        An empty list means the broker answered without candles (e.g. the
+        market was closed), never that the request failed.
+        
+        Raises:
+            ConnectionError: The API returned no answer
+        """
+        logger.debug(f"Getting {count} candles for {asset} with timeframe {timeframe}s")
+        
+        # Get candles from IQ Option API
+        candles = self.api.get_candles(asset, timeframe, count, end_time or self.clock.now())
+        if candles is None:
+            raise ConnectionError(f"No answer to the candle request for {asset}")
+        
+        # Process candles into a standard format
+        return [
+            {
+                'open': candle['open'],
+                'high': candle['max'],
+                'low': candle['min'],
+                'close': candle['close'],
+                'volume': candle['volume'],
+                'timestamp': candle['from']
+            }
+            for candle in candles
+        ]
             
-    def execute_trade(self, asset, amount, direction, expiration, option_type="digital"):
-        """Execute a trade on IQ Option
+    def fetch_history(self, asset, timeframe, count, end_time=None):
+        """Download candles like fetch_candles(), through the candle archive when there is one
+        
+        Closed candles already in the archive are read from disk; only the
+        missing ones are downloaded. The candle still forming is not included.
+        """
+        if self.candle_archive is None:
+            return self.fetch_candles(asset, timeframe, count, end_time)
+        
+        try:
+            return self.candle_archive.candles(asset, timeframe, count, end_time,
+                                              fetch_history=self.download_candles)
+        except Exception as e:
+            logger.error(f"Error reading candle archive for {asset}: {str(e)}")
+            return self.fetch_candles(asset, timeframe, count, end_time)
+    
+    def get_history(self, asset, timeframe, start, end=None):
+        """Closed candles of a time range as column arrays (e.g. for Backtester.run)
+        
+        Args:
+            asset: Asset symbol (e.g., "EURUSD")
+            timeframe: Candle timeframe in seconds
+            start: Timestamp of the first candle
+            end: Timestamp of the last candle (default: the last closed candle)
+            
+        Returns:
+            Dictionary of numpy arrays (timestamp, open, high, low, close, volume);
+            zero-copy views of the archive when it holds the whole range
+        """
+        if self.candle_archive is None:
+            # Open time of the last candle closed by server time
+            last = int(self.clock.now() // timeframe) * timeframe - timeframe
+            last = last if end is None else min(int(end // timeframe) * timeframe, last)
+            
+            # Newest chunk first, as the API counts candles back from end_time
+            chunks = []
+            chunk_end = last
+            while chunk_end >= start:
+                count = min(MAX_CANDLES_PER_REQUEST, int((chunk_end - start) // timeframe) + 1)
+                candles = self.fetch_candles(asset, timeframe, count, chunk_end)
+                if not candles:
+                    break
+                chunks.append([c for c in candles if start <= c['timestamp'] <= chunk_end])
+                # Gaps (market closed) make the oldest candle older than count candles back
+                oldest = min(c['timestamp'] for c in candles)
+                if oldest > chunk_end:
+                    break
+                chunk_end = oldest - timeframe
+            
+            candles = [c for chunk in reversed(chunks) for c in chunk]
+            array = np.array([tuple(c[name] for name in CANDLE_DTYPE.names) for c in candles],
+                             dtype=CANDLE_DTYPE)
+            return {name: array[name] for name in CANDLE_DTYPE.names}
+        
+        return self.candle_archive.load(asset, timeframe, start, end, fetch_history=self.download_candles)
+            
+    def place_trade(self, asset, amount, direction, expiration, option_type="digital"):
+        """Place an order on IQ Option without waiting for its result
         
         Args:
             asset: Asset to trade
@@ -166,7 +320,9 @@ class IQOptionConnector:
             option_type: 'digital' or 'binary'
             
         Returns:
-            Dictionary with trade result information
+            Dictionary with the order information. On success it contains the
+            order_id and the time the order expires; on failure, the error and
+            a profit_amount of -amount.
         """
         try:
             # Validate inputs
@@ -198,15 +354,64 @@ class IQOptionConnector:
                 
             logger.info(f"Trade executed with ID: {order_id}")
             
+            placed_at = time.time()
+            return {
+                "success": True,
+                "order_id": order_id,
+                "asset": asset,
+                "amount": amount,
+                "direction": direction,
+                "expiration": expiration,
+                "option_type": option_type,
+                "placed_at": placed_at,
+                "expires_at": placed_at + expiration * 60
+            }
+                
+        except Exception as e:
+            logger.error(f"Error executing trade: {str(e)}")
+            return {"success": False, "error": str(e), "profit_amount": -amount}
+    
+    def check_trade_result(self, order_id, option_type="digital"):
+        """Check whether an order has settled
+        
+        Returns:
+            Tuple with (settled, profit). Profit is None while the order is open.
+        """
+        if option_type == "digital":
+            return self.api.check_win_digital_v2(order_id)
+        
+        # check_win_v4 blocks until the option closes, so callers should only
+        # ask for binary results once the order has expired
+        return self.api.check_win_v4(order_id)
+    
+    def execute_trade(self, asset, amount, direction, expiration, option_type="digital"):
+        """Execute a trade on IQ Option and wait for its result
+        
+        Blocks until the order settles. Use place_trade() together with a
+        SettlementTracker to trade without blocking.
+        
+        Args:
+            asset: Asset to trade
+            amount: Trade amount
+            direction: 'call' or 'put'
+            expiration: Expiration time in minutes
+            option_type: 'digital' or 'binary'
+            
+        Returns:
+            Dictionary with trade result information
+        """
+        order = self.place_trade(asset, amount, direction, expiration, option_type)
+        if not order["success"]:
+            return order
+        
+        order_id = order["order_id"]
+        try:
             # Wait for the result
             waiting_time = 0
             max_wait = expiration * 60 + 30  # Wait expiration time plus a buffer
             
             while waiting_time < max_wait:
-                if option_type == "digital":
-                    status, result = self.api.check_win_digital_v2(order_id)
-                else:
-                    status, result = self.api.check_win_v4(order_id)
+                status, result = self.check_trade_result(order_id, option_type)
                     
                 if status:
                     profit = result
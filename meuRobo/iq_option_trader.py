@@ -1,4 +1,4 @@
-from iqoptionapi.stable_api import IQ_Option
+from meuRobo.api_factory import create_api
 import time
 import sys
 import getpass
@@ -17,7 +17,7 @@ def connect_to_iqoption(email=None, password=None):
         password = getpass.getpass("Password: ")
     
     # Initialize API
-    api = IQ_Option(email, password)
+    api = create_api(email, password)
     
     # Connect
     check, reason = api.connect()
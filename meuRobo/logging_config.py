@@ -0,0 +1,193 @@
+import atexit
+import contextlib
+import contextvars
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+from datetime import datetime
+from typing import Optional
+
+EVENTS_LOGGER = "robo-trader.events"
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Environment variables overriding the defaults of setup_logging()
+LOG_ENV = {
+    "path": ("ROBO_TRADER_LOG_FILE", str),
+    "level": ("ROBO_TRADER_LOG_LEVEL", str),
+    "max_bytes": ("ROBO_TRADER_LOG_MAX_BYTES", int),
+    "backup_count": ("ROBO_TRADER_LOG_BACKUPS", int),
+    "when": ("ROBO_TRADER_LOG_ROTATE_WHEN", str),  # e.g. 'midnight' for daily rotation
+    "events_path": ("ROBO_TRADER_EVENT_LOG", str),  # JSON lines event log
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_events_enabled = False
+# Cleared by paused_events() for the tasks of a replayed session
+_events_logged = contextvars.ContextVar("robo_trader_events_logged", default=True)
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for a queue consumed in the same process.
+
+    The stock prepare() formats every record in the calling thread; here only
+    the message arguments are merged, and formatting (including tracebacks)
+    is left to the listener thread.
+    """
+
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class _GzipRotator:
+    """Compress rotated log files (runs in the listener thread)"""
+
+    @staticmethod
+    def namer(name: str) -> str:
+        return name + ".gz"
+
+    @staticmethod
+    def rotator(source: str, dest: str):
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: time, event and the event fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": record.created,
+            "time": datetime.fromtimestamp(record.created).isoformat(),
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "event_fields", {}))
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+def _only_events(record):
+    return record.name == EVENTS_LOGGER
+
+
+def _no_events(record):
+    return record.name != EVENTS_LOGGER
+
+
+def setup_logging(path: str = "trading_bot.log", level: str = "INFO", max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 5, when: Optional[str] = None, events_path: Optional[str] = None,
+                  console: bool = True) -> logging.Logger:
+    """
+    Route all logging through a queue drained by a background listener thread.
+
+    Logging calls only enqueue the record; formatting, console output, file
+    writes, rotation and compression happen in the listener thread. Arguments
+    can be overridden with the ROBO_TRADER_LOG_* environment variables.
+
+    Args:
+        path: Log file
+        level: Root log level
+        max_bytes: Rotate the log file when it reaches this size (size rotation)
+        backup_count: Number of compressed rotated files kept
+        when: Rotate by time instead of size ('midnight', 'H', ... as in TimedRotatingFileHandler)
+        events_path: JSON lines file for the structured trade/event log (None to disable)
+        console: Also log to stdout
+
+    Returns:
+        The application logger
+    """
+    global _listener, _events_enabled
+
+    settings = {"path": path, "level": level, "max_bytes": max_bytes, "backup_count": backup_count,
+                "when": when, "events_path": events_path}
+    for name, (variable, cast) in LOG_ENV.items():
+        if os.environ.get(variable):
+            settings[name] = cast(os.environ[variable])
+
+    stop_logging()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+
+    if settings["when"]:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            settings["path"], when=settings["when"], backupCount=settings["backup_count"], encoding="utf-8")
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            settings["path"], maxBytes=settings["max_bytes"], backupCount=settings["backup_count"], encoding="utf-8")
+    file_handler.namer = _GzipRotator.namer
+    file_handler.rotator = _GzipRotator.rotator
+    handlers.append(file_handler)
+
+    if console:
+        handlers.append(logging.StreamHandler(sys.stdout))
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        handler.addFilter(_no_events)
+
+    _events_enabled = bool(settings["events_path"])
+    if _events_enabled:
+        events_handler = logging.handlers.RotatingFileHandler(
+            settings["events_path"], maxBytes=settings["max_bytes"], backupCount=settings["backup_count"],
+            encoding="utf-8")
+        events_handler.namer = _GzipRotator.namer
+        events_handler.rotator = _GzipRotator.rotator
+        events_handler.setFormatter(JsonLinesFormatter())
+        events_handler.addFilter(_only_events)
+        handlers.append(events_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [_InProcessQueueHandler(log_queue)]
+    root.setLevel(settings["level"])
+
+    # Events always pass through the queue, independent of the root level
+    events_logger = logging.getLogger(EVENTS_LOGGER)
+    events_logger.setLevel(logging.INFO)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    return logging.getLogger("robo-trader")
+
+
+def stop_logging():
+    """Flush the queue and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def log_event(event: str, **fields):
+    """
+    Write a structured event (trade placed, settled, ...) to the JSON lines log.
+
+    Does nothing when the event log is disabled or paused.
+    """
+    if _events_enabled and _events_logged.get():
+        logging.getLogger(EVENTS_LOGGER).info(event, extra={"event_fields": fields})
+
+
+@contextlib.contextmanager
+def paused_events():
+    """Drop the events of the current task and of the tasks it starts"""
+    token = _events_logged.set(False)
+    try:
+        yield
+    finally:
+        _events_logged.reset(token)
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+
+from meuRobo.metrics import OPEN_TIME_AGE, OPEN_TIME_REFRESH_FAILURES, OPEN_TIME_STALE_READS
+
+logger = logging.getLogger("robo-trader.market_snapshot")
+
+# Markets of get_all_open_time() consulted for each option type
+OPTION_MARKETS = {
+    "digital": ("digital",),
+    "binary": ("turbo", "binary"),
+    "turbo": ("turbo",),
+}
+
+# Snapshots refreshed at least once and not stopped, for the age gauge
+_in_use: "weakref.WeakSet[OpenTimeSnapshot]" = weakref.WeakSet()
+
+
+def _oldest_age() -> float:
+    ages = [snapshot.age() for snapshot in list(_in_use)]
+    return max(ages) if ages else float('nan')
+
+
+OPEN_TIME_AGE.set_function(_oldest_age)
+
+
+class OpenTimeSnapshot:
+    """
+    Shared, TTL-cached snapshot of api.get_all_open_time().
+
+    get_all_open_time() is one of the most expensive iqoptionapi calls, so the
+    connectors read market state from this snapshot instead. Lookups are O(1)
+    per asset. The snapshot is refreshed lazily once it is older than the TTL,
+    or periodically by a background thread started with start().
+    """
+
+    def __init__(self, api, ttl: float = 30.0, refresh_interval: Optional[float] = None):
+        """
+        Initialize the snapshot
+
+        Args:
+            api: IQ_Option instance
+            ttl: Seconds after which the snapshot is considered stale
+            refresh_interval: Seconds between background refreshes (default: ttl / 2)
+        """
+        self.api = api
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval or ttl / 2
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresh_thread = None
+
+        self._raw: Optional[Dict[str, Any]] = None
+        self._open: Dict[str, Dict[str, bool]] = {}
+        self._open_assets: Dict[str, List[str]] = {}
+        self._updated_at = 0.0
+
+        # Metrics
+        self.refresh_count = 0
+        self.refresh_failures = 0
+        self.last_refresh_duration = 0.0
+        self.last_error = None
+        self.reads = 0
+        self.stale_reads = 0
+
+    def start(self):
+        """Start refreshing the snapshot in the background."""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(target=self._refresh_periodically, daemon=True)
+        self._refresh_thread.start()
+        logger.info(f"Open-time snapshot refresh started (every {self.refresh_interval}s, TTL {self.ttl}s)")
+
+    def stop(self):
+        """Stop the background refresh."""
+        self._stop_event.set()
+        _in_use.discard(self)
+        if self._refresh_thread:
+            self._refresh_thread.join(timeout=2.0)
+            self._refresh_thread = None
+
+    def _refresh_periodically(self):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                pass  # Already logged and counted by refresh()
+            self._stop_event.wait(self.refresh_interval)
+
+    def refresh(self) -> Dict[str, Any]:
+        """Fetch a new snapshot from the API. Concurrent callers share one request."""
+        requested_at = time.time()
+
+        with self._refresh_lock:
+            # Another thread refreshed while we were waiting for the lock
+            if self._updated_at >= requested_at:
+                return self._raw
+
+            started = time.time()
+            try:
+                raw = self.api.get_all_open_time()
+            except Exception as e:
+                self.refresh_failures += 1
+                OPEN_TIME_REFRESH_FAILURES.inc()
+                self.last_error = str(e)
+                logger.error(f"Error refreshing open-time snapshot: {str(e)}")
+                raise
+
+            open_by_market = {
+                market: {asset: bool(info.get('open', False)) for asset, info in assets.items()}
+                for market, assets in raw.items()
+                if isinstance(assets, dict)
+            }
+
+            open_assets = {}
+            for option_type, markets in OPTION_MARKETS.items():
+                assets = []
+                seen = set()
+                for market in markets:
+                    for asset, is_open in open_by_market.get(market, {}).items():
+                        if is_open and asset not in seen:
+                            seen.add(asset)
+                            assets.append(asset)
+                open_assets[option_type] = assets
+
+            with self._lock:
+                self._raw = raw
+                self._open = open_by_market
+                self._open_assets = open_assets
+                self._updated_at = time.time()
+
+            self.refresh_count += 1
+            _in_use.add(self)
+            self.last_refresh_duration = self._updated_at - started
+            logger.debug(f"Open-time snapshot refreshed in {self.last_refresh_duration:.3f}s")
+            return raw
+
+    def _ensure_fresh(self):
+        """Refresh synchronously if the snapshot is missing or older than the TTL"""
+        self.reads += 1
+        if self._raw is None:
+            self.refresh()
+        elif self.age() > self.ttl:
+            self.stale_reads += 1
+            OPEN_TIME_STALE_READS.inc()
+            try:
+                self.refresh()
+            except Exception:
+                logger.warning(f"Using open-time snapshot {self.age():.0f}s old")
+
+    def age(self) -> float:
+        """Seconds since the last successful refresh (inf if never refreshed)"""
+        if self._raw is None:
+            return float('inf')
+        return time.time() - self._updated_at
+
+    def get(self) -> Dict[str, Any]:
+        """Return the raw get_all_open_time() structure"""
+        self._ensure_fresh()
+        return self._raw
+
+    def is_open(self, asset: str, option_type: str) -> bool:
+        """Check if an asset is open for an option type ('digital', 'binary' or 'turbo')"""
+        markets = OPTION_MARKETS.get(option_type)
+        if markets is None:
+            logger.error(f"Invalid option type: {option_type}")
+            return False
+
+        self._ensure_fresh()
+        with self._lock:
+            return any(self._open.get(market, {}).get(asset, False) for market in markets)
+
+    def open_assets(self, option_type: str) -> List[str]:
+        """List the assets open for an option type"""
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._open_assets.get(option_type, []))
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Staleness and refresh metrics of this snapshot
+
+        The stale reads, refresh failures and the age of the oldest snapshot
+        in use are also exported by the /metrics endpoint.
+        """
+        return {
+            "age_seconds": self.age(),
+            "ttl_seconds": self.ttl,
+            "is_stale": self.age() > self.ttl,
+            "refresh_count": self.refresh_count,
+            "refresh_failures": self.refresh_failures,
+            "last_refresh_duration": self.last_refresh_duration,
+            "last_error": self.last_error,
+            "reads": self.reads,
+            "stale_reads": self.stale_reads,
+        }
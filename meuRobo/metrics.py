@@ -0,0 +1,331 @@
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Latency buckets in seconds (upper bounds), from 100us to 2 minutes
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+# Cleared by paused_metrics() for the tasks of a replayed session
+_observing = contextvars.ContextVar("robo_trader_metrics_observing", default=True)
+
+
+@contextlib.contextmanager
+def paused_metrics():
+    """Ignore the observations of the current task and of the tasks it starts"""
+    token = _observing.set(False)
+    try:
+        yield
+    finally:
+        _observing.reset(token)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; observe() is a bisect and two additions"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        if not _observing.get():
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> _Timer:
+        """Context manager observing the duration of its block"""
+        return _Timer(self)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate of the q-quantile, interpolated within its bucket"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if total == 0:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if not _observing.get():
+            return
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """Value that goes up and down; set by the caller or read from a function when rendered"""
+
+    def __init__(self):
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self._value = float(value)
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from function every time the gauge is rendered"""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        return float(self._function()) if self._function is not None else self._value
+
+
+class _Family:
+    """A named metric with one child per combination of label values"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), **options):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.options = options
+        self.children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self.labels()  # Unlabeled metrics are exposed from the start
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Child metric for the given label values"""
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self.children.setdefault(values, self._new_child())
+        return child
+
+
+class HistogramFamily(_Family):
+    kind = "histogram"
+
+    def _new_child(self):
+        return Histogram(**self.options)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def render(self):
+        for values, child in list(self.children.items()):
+            cumulative = 0
+            for bound, count in zip(child.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {child.sum}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class CounterFamily(_Family):
+    kind = "counter"
+
+    def _new_child(self):
+        return Counter()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def render(self):
+        for values, child in list(self.children.items()):
+            yield f"{self.name}_total{_format_labels(self.labelnames, values)} {child.value}"
+
+
+class GaugeFamily(_Family):
+    kind = "gauge"
+
+    def _new_child(self):
+        return Gauge()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self.labels().set_function(function)
+
+    def render(self):
+        for values, child in list(self.children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {child.value}"
+
+
+class MetricsRegistry:
+    """Collection of metric families rendered in the Prometheus text format"""
+
+    def __init__(self, prefix: str = "robo_trader"):
+        self.prefix = prefix
+        self.families: Dict[str, _Family] = {}
+
+    def _register(self, family: _Family) -> _Family:
+        return self.families.setdefault(family.name, family)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> HistogramFamily:
+        return self._register(HistogramFamily(f"{self.prefix}_{name}", documentation, labelnames, buckets=buckets))
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> CounterFamily:
+        return self._register(CounterFamily(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> GaugeFamily:
+        return self._register(GaugeFamily(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for family in self.families.values():
+            name = family.name + ("_total" if family.kind == "counter" else "")
+            lines.append(f"# HELP {name} {family.documentation}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """Counter values and histogram p50/p95/p99 keyed by metric and labels"""
+        result: Dict[str, Dict[str, object]] = {}
+        for family in self.families.values():
+            entries = result.setdefault(family.name, {})
+            for values, child in list(family.children.items()):
+                key = ",".join(f"{n}={v}" for n, v in zip(family.labelnames, values))
+                entries[key] = child.snapshot() if isinstance(child, Histogram) else child.value
+        return result
+
+
+REGISTRY = MetricsRegistry()
+
+API_CALL_SECONDS = REGISTRY.histogram(
+    "api_call_seconds", "Latency of IQ Option API calls made by the connector", ("method",))
+API_ERRORS = REGISTRY.counter(
+    "api_errors", "IQ Option API calls that raised an exception", ("method",))
+STAGE_SECONDS = REGISTRY.histogram(
+    "stage_seconds", "Latency of each trading loop stage", ("stage",))
+SETTLEMENT_SECONDS = REGISTRY.histogram(
+    "settlement_seconds", "Time from order placement to settlement",
+    buckets=(30.0, 60.0, 120.0, 180.0, 300.0, 600.0, 900.0, 1800.0, 3600.0))
+CYCLES = REGISTRY.counter("cycles", "Trading cycles run")
+SIGNALS = REGISTRY.counter("signals", "Trading signals detected", ("direction",))
+ORDERS = REGISTRY.counter("orders", "Orders placed", ("status",))
+ERRORS = REGISTRY.counter("errors", "Errors in the trading loop", ("stage",))
+RECONNECTS = REGISTRY.counter("reconnects", "Reconnections to the broker")
+CONNECTOR_COALESCED = REGISTRY.counter(
+    "connector_coalesced", "Connector calls served by an identical call already in flight", ("method",))
+CONNECTOR_TIMEOUTS = REGISTRY.counter(
+    "connector_timeouts", "Connector calls abandoned after their timeout", ("method",))
+OPEN_TIME_AGE = REGISTRY.gauge(
+    "open_time_snapshot_age_seconds", "Age of the oldest market open-time snapshot in use (NaN: none)")
+OPEN_TIME_STALE_READS = REGISTRY.counter(
+    "open_time_stale_reads", "Open-time snapshot reads that found it older than its TTL")
+OPEN_TIME_REFRESH_FAILURES = REGISTRY.counter(
+    "open_time_refresh_failures", "Failed refreshes of the open-time snapshot")
+
+
+class InstrumentedAPI:
+    """
+    Proxy timing every method call of an IQ_Option compatible object.
+
+    Attribute access and non-callables pass straight through; wrapped
+    methods are cached so the proxy costs one dict lookup per call plus the
+    histogram update.
+    """
+
+    def __init__(self, api):
+        object.__setattr__(self, "_api", api)
+        object.__setattr__(self, "_wrapped", {})
+
+    def __getattr__(self, name):
+        wrapped = self._wrapped.get(name)
+        if wrapped is not None:
+            return wrapped
+
+        attribute = getattr(self._api, name)
+        if not callable(attribute):
+            return attribute
+
+        histogram = API_CALL_SECONDS.labels(name)
+        errors = API_ERRORS.labels(name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        self._wrapped[name] = timed
+        return timed
+
+    def __setattr__(self, name, value):
+        setattr(self._api, name, value)
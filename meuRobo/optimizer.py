@@ -0,0 +1,338 @@
+import itertools
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from meuRobo.backtest import Backtester
+from meuRobo.indicator_graph import IndicatorEngine
+from meuRobo.money_management import MoneyManager
+from meuRobo.sharded_analysis import STRATEGY_PARAMS
+from meuRobo.strategy import StochasticStrategy
+
+logger = logging.getLogger("robo-trader.optimizer")
+
+# Parameters of the live loop when no optimized set is available
+DEFAULT_PARAMS = {"k_period": 14, "d_period": 3, "slowing": 3,
+                  "upper_threshold": 90, "lower_threshold": 10, "sma_period": 20}
+
+# Default search space. The live loop analyzes the last 50 closed candles at
+# least, so every combination fits in that window. %D does not take part in
+# the entry rules: candidates that only differ in d_period trade the same.
+PARAM_SPACE = {
+    "k_period": [5, 9, 14, 21],
+    "d_period": [3],
+    "slowing": [1, 3, 5],
+    "upper_threshold": [70, 80, 90],
+    "lower_threshold": [10, 20, 30],
+    "sma_period": [10, 20, 30, 50],
+}
+
+OBJECTIVES = ("profit_loss", "profit_factor", "win_rate")
+REPORTED_STATS = ("total_operations", "wins", "losses", "win_rate", "profit_loss", "max_drawdown", "profit_factor")
+
+
+def _typed(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Complete parameter set: periods are candle counts, thresholds may be fractional"""
+    return {name: (float(params[name]) if name.endswith("_threshold") else int(params[name]))
+            if name in params else DEFAULT_PARAMS[name]
+            for name in STRATEGY_PARAMS}
+
+
+def grid_candidates(space: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Every combination of the space (thresholds that do not leave a neutral band are skipped)"""
+    names = list(STRATEGY_PARAMS)
+    values = [space.get(name, [DEFAULT_PARAMS[name]]) for name in names]
+    candidates = (_typed(dict(zip(names, combination))) for combination in itertools.product(*values))
+    return [params for params in candidates if params["lower_threshold"] < params["upper_threshold"]]
+
+
+def random_candidates(space: Dict[str, Sequence[Any]], samples: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """samples distinct combinations drawn uniformly from the space"""
+    candidates = grid_candidates(space)
+    if samples >= len(candidates):
+        return candidates
+    return random.Random(seed).sample(candidates, samples)
+
+
+# Worker process state: the price series and their indicator graphs. Indicators
+# run over the whole series: they are causal, and a backtest window starting
+# later sees warmed-up values like the live loop does.
+_series: Dict[str, Dict[str, np.ndarray]] = {}
+_indicators = IndicatorEngine()
+
+
+def _init_worker(series: Dict[str, Dict[str, np.ndarray]], quiet: bool = True):
+    global _series
+    _series = series
+    _indicators.discard()
+    if quiet:
+        # One log line per candidate strategy would drown the log
+        logging.getLogger("robo-trader.strategy").setLevel(logging.WARNING)
+
+
+def _score(stats: Dict[str, Any], objective: str, min_trades: int) -> float:
+    if stats["total_operations"] < min_trades:
+        return -math.inf
+    value = stats[objective]
+    return value if math.isfinite(value) else 1e9  # Infinite profit factor: no losses
+
+
+def _summary(stats: Dict[str, Any]) -> Dict[str, Any]:
+    # Keep the report valid JSON (an infinite profit factor becomes null)
+    return {name: (stats[name] if not isinstance(stats[name], float) or math.isfinite(stats[name]) else None)
+            for name in REPORTED_STATS}
+
+
+def _evaluate_group(asset: str, candidates: List[Dict[str, Any]], windows: List[Tuple[int, int]],
+                    settings: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+    """
+    Backtest candidates on every window of one asset (runs in a worker).
+
+    Returns:
+        For every candidate, the stats of each window
+    """
+    series = _series[asset]
+    graph = _indicators.graph(asset, series)
+
+    money_manager = MoneyManager(**settings["money_management"])
+    results = []
+    for params in candidates:
+        strategy = StochasticStrategy(**params)
+        backtester = Backtester(strategy, money_manager, payout=settings["payout"],
+                                expiration=settings["expiration"], candle_time=settings["candle_time"])
+        signals, _ = strategy.evaluate(graph)
+        results.append([
+            backtester.run_signals(signals[start:stop], series['close'][start:stop],
+                                   series['timestamp'][start:stop])["stats"]
+            for start, stop in windows
+        ])
+    return results
+
+
+def walk_forward_windows(n: int, folds: int, train_fraction: float = 0.5) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """
+    Rolling walk-forward split of n candles.
+
+    The first train_fraction of the history is the first training window;
+    the rest is cut into folds test windows, each preceded by a training
+    window of the same length.
+
+    Returns:
+        List of ((train_start, train_stop), (test_start, test_stop)) index ranges
+    """
+    train = int(n * train_fraction)
+    test = (n - train) // folds if folds > 0 else 0
+    if train <= 0 or test <= 0:
+        return []
+    return [((i * test, train + i * test), (train + i * test, train + (i + 1) * test)) for i in range(folds)]
+
+
+class ParameterOptimizer:
+    """
+    Grid or random search of StochasticStrategy parameters per asset.
+
+    Candidates are backtested in a process pool. Each task holds the
+    candidates of one asset sharing k_period and slowing, and every worker
+    keeps the indicator graph of each asset (see meuRobo.indicator_graph):
+    the rolling extremes and %K are computed once for all their threshold
+    and SMA combinations, and each SMA trend once per worker, so another
+    candidate only costs the entry rules and the backtest.
+
+    With walk-forward validation, each fold picks the best candidate on its
+    training window and reports how that candidate did on the following,
+    unseen test window. The parameters to trade are the best candidate on
+    the most recent training-window-long span of history.
+    """
+
+    def __init__(self, money_management: Optional[Dict[str, Any]] = None, payout: float = 0.8,
+                 expiration: int = 5, candle_time: int = 60, objective: str = "profit_loss",
+                 min_trades: int = 10, workers: Optional[int] = None):
+        """
+        Initialize the optimizer
+
+        Args:
+            money_management: MoneyManager arguments (default: flat stakes)
+            payout: Profit per unit staked on a win
+            expiration: Expiration time in minutes
+            candle_time: Candle timeframe in seconds
+            objective: Stat maximized: 'profit_loss', 'profit_factor' or 'win_rate'
+            min_trades: Candidates with fewer trades in a window score -inf there
+            workers: Number of worker processes (default: CPU count; 0 runs in-process)
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}")
+        self.settings = {
+            "money_management": money_management or {},
+            "payout": payout,
+            "expiration": expiration,
+            "candle_time": candle_time,
+        }
+        self.objective = objective
+        self.min_trades = min_trades
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+
+    def optimize(self, series: Dict[str, Any], candidates: List[Dict[str, Any]], folds: int = 0,
+                 train_fraction: float = 0.5) -> Dict[str, Any]:
+        """
+        Find the best parameters of every asset.
+
+        Args:
+            series: Asset -> mapping with 'high', 'low', 'close' and 'timestamp'
+                arrays (e.g. CandleArchive.load() or IQOptionConnector.get_history())
+            candidates: Parameter sets, see grid_candidates() and random_candidates()
+            folds: Walk-forward folds (0 for none)
+            train_fraction: Share of the history in each training window
+
+        Returns:
+            Dictionary with the best parameters per asset ('assets'), the best
+            set over all assets ('default') and the search settings
+        """
+        if not candidates:
+            raise ValueError("No candidate parameters")
+        started = time.perf_counter()
+        arrays = {asset: {name: np.asarray(ohlc[name]) for name in ('high', 'low', 'close', 'timestamp')}
+                  for asset, ohlc in series.items()}
+
+        windows: Dict[str, List[Tuple[int, int]]] = {}
+        splits: Dict[str, List[Tuple[Tuple[int, int], Tuple[int, int]]]] = {}
+        for asset, ohlc in arrays.items():
+            n = len(ohlc['close'])
+            splits[asset] = walk_forward_windows(n, folds, train_fraction) if folds else []
+            # Window 0 is the span the final parameters are chosen on
+            final = (n - int(n * train_fraction), n) if splits[asset] else (0, n)
+            windows[asset] = [final] + [window for split in splits[asset] for window in split]
+
+        stats = self._evaluate(arrays, candidates, windows)
+
+        assets = {}
+        totals = np.zeros(len(candidates))
+        for asset, asset_stats in stats.items():
+            scores = np.array([_score(windows_stats[0], self.objective, self.min_trades)
+                               for windows_stats in asset_stats])
+            totals += np.where(np.isfinite(scores), scores, 0)
+            best = int(np.argmax(scores))
+            result = {
+                "params": candidates[best],
+                "score": float(scores[best]) if np.isfinite(scores[best]) else None,
+                "stats": _summary(asset_stats[best][0]),
+                "candles": len(arrays[asset]['close']),
+            }
+            if splits[asset]:
+                result["walk_forward"] = self._walk_forward(arrays[asset]['timestamp'], candidates,
+                                                            asset_stats, splits[asset])
+            assets[asset] = result
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Optimized {len(candidates)} candidates over {len(arrays)} assets in {elapsed:.1f}s")
+        return {
+            "generated_at": time.time(),
+            "objective": self.objective,
+            "candidates": len(candidates),
+            "folds": folds,
+            "settings": self.settings,
+            "default": candidates[int(np.argmax(totals))],
+            "assets": assets,
+        }
+
+    def _evaluate(self, arrays: Dict[str, Dict[str, np.ndarray]], candidates: List[Dict[str, Any]],
+                  windows: Dict[str, List[Tuple[int, int]]]) -> Dict[str, List[List[Dict[str, Any]]]]:
+        """Stats of every candidate on every window, per asset"""
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for index, params in enumerate(candidates):
+            groups.setdefault((params["k_period"], params["slowing"]), []).append(index)
+        tasks = [(asset, indexes) for asset in arrays for indexes in groups.values()]
+
+        stats = {asset: [None] * len(candidates) for asset in arrays}
+        if self.workers == 0:
+            _init_worker(arrays, quiet=False)
+            strategy_logger = logging.getLogger("robo-trader.strategy")
+            previous_level = strategy_logger.level
+            strategy_logger.setLevel(logging.WARNING)
+            try:
+                outputs = [_evaluate_group(asset, [candidates[i] for i in indexes], windows[asset], self.settings)
+                           for asset, indexes in tasks]
+            finally:
+                strategy_logger.setLevel(previous_level)
+                _init_worker({}, quiet=False)
+        else:
+            # Spawned workers: forking a process that runs threads is unsafe
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks)),
+                                     mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(arrays,)) as pool:
+                futures = [pool.submit(_evaluate_group, asset, [candidates[i] for i in indexes],
+                                       windows[asset], self.settings)
+                           for asset, indexes in tasks]
+                outputs = [future.result() for future in futures]
+
+        for (asset, indexes), output in zip(tasks, outputs):
+            for index, windows_stats in zip(indexes, output):
+                stats[asset][index] = windows_stats
+        return stats
+
+    def _walk_forward(self, timestamps: np.ndarray, candidates: List[Dict[str, Any]],
+                      asset_stats: List[List[Dict[str, Any]]],
+                      splits: List[Tuple[Tuple[int, int], Tuple[int, int]]]) -> Dict[str, Any]:
+        """Out-of-sample results of choosing the best training candidate in each fold"""
+        folds = []
+        for fold, ((train_start, train_stop), (test_start, test_stop)) in enumerate(splits):
+            # Windows 1 + 2i and 2 + 2i are the training and test windows of fold i
+            scores = np.array([_score(windows_stats[1 + 2 * fold], self.objective, self.min_trades)
+                               for windows_stats in asset_stats])
+            best = int(np.argmax(scores))
+            folds.append({
+                "train": [int(timestamps[train_start]), int(timestamps[train_stop - 1])],
+                "test": [int(timestamps[test_start]), int(timestamps[test_stop - 1])],
+                "params": candidates[best],
+                "train_stats": _summary(asset_stats[best][1 + 2 * fold]),
+                "test_stats": _summary(asset_stats[best][2 + 2 * fold]),
+            })
+
+        tests = [fold["test_stats"] for fold in folds]
+        operations = sum(test["total_operations"] for test in tests)
+        wins = sum(test["wins"] for test in tests)
+        return {
+            "folds": folds,
+            "out_of_sample": {
+                "total_operations": operations,
+                "win_rate": (wins / operations) * 100 if operations else 0,
+                "profit_loss": sum(test["profit_loss"] for test in tests),
+            },
+        }
+
+
+def save_params(path: str, result: Dict[str, Any]):
+    """Write an optimize() result atomically (the live loop may be reading it)"""
+    staging = f"{path}.tmp"
+    with open(staging, "w") as f:
+        json.dump(result, f, indent=2)
+    os.replace(staging, path)
+
+
+def load_params(path: str) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Strategy parameters written by save_params().
+
+    Returns:
+        (default parameters, asset -> parameters). DEFAULT_PARAMS and no
+        per-asset sets when the file is missing or invalid.
+    """
+    try:
+        with open(path) as f:
+            result = json.load(f)
+        default = _typed(result.get("default") or DEFAULT_PARAMS)
+        assets = {asset: _typed(entry["params"]) for asset, entry in result.get("assets", {}).items()
+                  if entry.get("score") is not None}
+        return default, assets
+    except FileNotFoundError:
+        return dict(DEFAULT_PARAMS), {}
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        logger.error(f"Invalid strategy parameters file {path}: {str(e)}")
+        return dict(DEFAULT_PARAMS), {}
@@ -0,0 +1,171 @@
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from meuRobo.money_management import MoneyManager
+
+logger = logging.getLogger("robo-trader.risk_simulator")
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+class RiskSimulator:
+    """
+    Monte Carlo simulation of trading sessions under a MoneyManager.
+
+    Sessions are simulated side by side as NumPy arrays: every step draws one
+    outcome per session and applies the calculate_entry_amount rules (flat,
+    martingale and soros with the 10x base amount cap) and the stop gain/loss
+    to all sessions at once. Only the steps are looped in Python.
+
+    Like MoneyManager, each entry is sized from the previous settled trade,
+    i.e. trades are assumed to settle one after another.
+    """
+
+    def __init__(self, money_manager: MoneyManager):
+        """
+        Args:
+            money_manager: Money manager whose strategy, base amount and stops are simulated
+        """
+        self.money_manager = money_manager
+
+    def run(self, win_probability: float, payout: float = 0.8, sessions: int = 100000,
+            trades_per_session: int = 100, draw_probability: float = 0.0,
+            bankroll: Optional[float] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Simulate sessions.
+
+        Args:
+            win_probability: Probability that a trade wins
+            payout: Profit per unit staked on a win
+            sessions: Number of simulated sessions
+            trades_per_session: Maximum trades per session (sessions end earlier on a stop)
+            draw_probability: Probability that a trade ends in a draw (stake returned)
+            bankroll: Starting balance; a session is ruined when it cannot pay the next
+                stake (None for an unlimited balance)
+            seed: Random seed
+
+        Returns:
+            Dictionary with the session profit/loss distribution, stop and ruin
+            probabilities, the peak stake distribution and trade counts
+        """
+        if not 0 <= win_probability <= 1 or not 0 <= draw_probability <= 1 - win_probability:
+            raise ValueError("Invalid win/draw probabilities")
+
+        manager = self.money_manager
+        base = float(manager.base_amount)
+        cap = base * 10
+        rng = np.random.default_rng(seed)
+
+        # Final values per session
+        profit_loss = np.zeros(sessions)
+        peak_stake = np.zeros(sessions)
+        max_drawdown = np.zeros(sessions)
+        trades = np.zeros(sessions, dtype=np.int64)
+        ruined = np.zeros(sessions, dtype=bool)
+
+        # State of the sessions still trading (compacted as sessions stop)
+        index = np.arange(sessions)
+        pl = np.zeros(sessions)
+        last_amount = np.zeros(sessions)
+        last_result = np.zeros(sessions)
+        stake = np.zeros(sessions)
+        peak = np.zeros(sessions)
+        drawdown = np.zeros(sessions)
+
+        def retire(done):
+            nonlocal index, pl, last_amount, last_result, stake, peak, drawdown
+            profit_loss[index[done]] = pl[done]
+            peak_stake[index[done]] = stake[done]
+            max_drawdown[index[done]] = drawdown[done]
+            trades[index[done]] = step
+            keep = ~done
+            index, pl, last_amount, last_result, stake, peak, drawdown = (
+                index[keep], pl[keep], last_amount[keep], last_result[keep],
+                stake[keep], peak[keep], drawdown[keep])
+
+        step = 0
+        for step in range(trades_per_session):
+            # Stop gain/loss (calculate_entry_amount returns 0)
+            done = (pl >= manager.stop_gain) | (pl <= -manager.stop_loss)
+            if done.any():
+                retire(done)
+            if len(index) == 0:
+                break
+
+            # Entry amount of every session
+            if manager.strategy == "martingale" and step > 0:
+                amount = np.where(last_result < 0, np.minimum(last_amount * 2, cap), base)
+            elif manager.strategy == "soros" and step > 0:
+                amount = np.where(last_result > 0, np.minimum(last_amount + last_result, cap), base)
+            else:
+                amount = np.full(len(index), base)
+
+            if bankroll is not None:
+                broke = bankroll + pl < amount
+                if broke.any():
+                    ruined[index[broke]] = True
+                    retire(broke)
+                    amount = amount[~broke]
+                    if len(index) == 0:
+                        break
+
+            # Outcomes: win, draw, or loss
+            draws = rng.random(len(index))
+            result = np.where(draws < win_probability, amount * payout,
+                              np.where(draws < win_probability + draw_probability, 0.0, -amount))
+
+            pl += result
+            last_amount = amount
+            last_result = result
+            np.maximum(stake, amount, out=stake)
+            np.maximum(peak, pl, out=peak)
+            np.maximum(drawdown, peak - pl, out=drawdown)
+        else:
+            step = trades_per_session
+
+        retire(np.ones(len(index), dtype=bool))
+
+        hit_gain = profit_loss >= manager.stop_gain
+        hit_loss = profit_loss <= -manager.stop_loss
+        if bankroll is not None:
+            ruined |= bankroll + profit_loss <= 0
+
+        return {
+            "sessions": sessions,
+            "strategy": manager.strategy,
+            "base_amount": base,
+            "stop_gain": manager.stop_gain,
+            "stop_loss": manager.stop_loss,
+            "win_probability": win_probability,
+            "draw_probability": draw_probability,
+            "payout": payout,
+            "break_even_win_rate": 1 / (1 + payout),
+            "profit_loss": self._distribution(profit_loss),
+            "histogram": self._histogram(profit_loss),
+            "stop_gain_probability": float(hit_gain.mean()),
+            "stop_loss_probability": float(hit_loss.mean()),
+            "no_stop_probability": float((~hit_gain & ~hit_loss).mean()),
+            "ruin_probability": float(ruined.mean()) if bankroll is not None else None,
+            "peak_stake": self._distribution(peak_stake),
+            "max_drawdown": self._distribution(max_drawdown),
+            "trades": self._distribution(trades.astype(np.float64)),
+        }
+
+    @staticmethod
+    def _distribution(values: np.ndarray) -> Dict[str, float]:
+        percentiles = np.percentile(values, PERCENTILES)
+        summary = {
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+        }
+        summary.update({f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)})
+        return summary
+
+    @staticmethod
+    def _histogram(values: np.ndarray, bins: int = 40) -> Dict[str, list]:
+        counts, edges = np.histogram(values, bins=bins)
+        return {"counts": counts.tolist(), "edges": edges.tolist()}
@@ -0,0 +1,274 @@
+import asyncio
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional
+
+from meuRobo.async_connector import AsyncConnector
+from meuRobo.connection_supervisor import get_supervisor
+from meuRobo.history_store import OperationHistoryStore
+from meuRobo.trade_stats import StatsAggregator
+
+logger = logging.getLogger("robo-trader.sessions")
+
+DEFAULT_SESSION = "default"
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+DEFAULT_CONFIG = {
+    "assets": [],
+    "account_type": "PRACTICE",
+    "candle_time": 60,  # seconds
+    "settle_delay": 1.0,  # seconds after a candle closes before it is analyzed
+    "expiration_time": 5,  # minutes
+    "money_management": "flat",
+    "entry_amount": 2,
+    "stop_gain": 50,
+    "stop_loss": 30,
+}
+
+
+def new_daily_result() -> Dict[str, Any]:
+    return {
+        "total_operations": 0,
+        "wins": 0,
+        "losses": 0,
+        "win_rate": 0,
+        "profit_loss": 0,
+        "max_profit": 0,
+        "max_loss": 0,
+        "max_amount": 0,
+        "min_amount": float('inf'),
+        "current_balance": 0,
+        "is_running": False
+    }
+
+
+class FairExecutor:
+    """
+    Thread pool shared by many sessions, served round-robin.
+
+    Calls are queued per key (session) and dispatched one key at a time, so a
+    session watching a hundred assets cannot starve one watching a few: when
+    every worker is busy, the next free worker goes to the next session in
+    turn.
+    """
+
+    def __init__(self, max_workers: int = 8, thread_name_prefix: str = "iq-connector"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.max_in_flight = max_workers
+        self._queues: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, fn, *args, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) on behalf of key"""
+        future = Future()
+        with self._lock:
+            self._queues.setdefault(key, deque()).append((future, fn, args, kwargs))
+        self._dispatch()
+        return future
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if self._in_flight >= self.max_in_flight or not self._queues:
+                    return
+                key, queue = next(iter(self._queues.items()))
+                item = queue.popleft()
+                if queue:
+                    self._queues.move_to_end(key)
+                else:
+                    del self._queues[key]
+                if not item[0].set_running_or_notify_cancel():
+                    continue
+                self._in_flight += 1
+            self._executor.submit(self._run, item)
+
+    def _run(self, item):
+        future, fn, args, kwargs = item
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._dispatch()
+
+    def executor_for(self, key: Hashable) -> Executor:
+        """concurrent.futures.Executor submitting on behalf of key"""
+        return _KeyedExecutor(self, key)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+class _KeyedExecutor(Executor):
+    def __init__(self, pool: FairExecutor, key: Hashable):
+        self.pool = pool
+        self.key = key
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        return self.pool.submit(self.key, fn, *args, **kwargs)
+
+
+class TradingSession:
+    """
+    State of one account: connector, configuration, statistics, history and
+    trading task. Blocking connector calls go through the shared FairExecutor
+    under the session's key, via the session's AsyncConnector (broker).
+    """
+
+    def __init__(self, session_id: str, pool: FairExecutor, history_path: str):
+        self.session_id = session_id
+        self.connector = None
+        self._broker: Optional[AsyncConnector] = None
+        self.settlement_tracker = None
+        self.recorder = None  # SessionRecorder of the connector's responses, when recording
+        self.config = dict(DEFAULT_CONFIG, assets=[])
+        self.daily_result = new_daily_result()
+        self.active = False
+        self.task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.executor = pool.executor_for(session_id)
+        self.history_store = OperationHistoryStore(history_path)
+        self.stats = StatsAggregator()
+        # Seed the statistics with the days they keep
+        self.stats.load(self.history_store.iter_operations(start=time.time() - self.stats.days_kept * 86400))
+
+    @property
+    def logged_in(self) -> bool:
+        return self.connector is not None
+
+    @property
+    def broker(self) -> Optional[AsyncConnector]:
+        """asyncio facade of the connector, running its calls on the shared pool"""
+        if self.connector is None:
+            return None
+        if self._broker is None or self._broker.connector is not self.connector:
+            self._broker = AsyncConnector(self.connector, self.executor)
+        return self._broker
+    
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking connector call on the shared pool without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+
+    async def sleep(self, seconds: float):
+        """Sleep in the trading loop; returns early when the session is stopped"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), max(seconds, 0))
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def record_event(self, name: str, **data):
+        """Add a trading loop event to the session recording (no-op when not recording)"""
+        if self.recorder is not None:
+            self.recorder.record_event(name, **data)
+
+    def stop(self):
+        """Stop trading; the loop wakes up and exits"""
+        self.active = False
+        self.daily_result["is_running"] = False
+        self._wakeup.set()
+
+    def logout(self):
+        """Stop trading, the settlement tracker and the connector's background work"""
+        self.stop()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.settlement_tracker is not None:
+            self.settlement_tracker.stop()
+            self.settlement_tracker = None
+        if self.connector is not None:
+            get_supervisor().unwatch(self.connector)
+            try:
+                self.connector.open_times.stop()
+                if self.connector.candle_store is not None:
+                    self.connector.candle_store.close()
+            except Exception as e:
+                logger.warning(f"Error closing session {self.session_id}: {str(e)}")
+            self.connector = None
+            self._broker = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def close(self):
+        self.logout()
+        self.history_store.close()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "logged_in": self.logged_in,
+            "email": self.connector.email if self.connector else None,
+            "account_type": self.config["account_type"],
+            "assets": self.config["assets"],
+            "is_running": self.active,
+            "current_balance": self.daily_result["current_balance"],
+            "profit_loss": self.daily_result["profit_loss"],
+            "total_operations": self.daily_result["total_operations"],
+        }
+
+
+class SessionManager:
+    """Registry of trading sessions sharing one worker pool"""
+
+    def __init__(self, pool: FairExecutor, history_path: str = "operation_history.db"):
+        """
+        Args:
+            pool: Worker pool shared by every session
+            history_path: History database of the default session; other sessions
+                use the same name with '-<session_id>' before the extension
+        """
+        self.pool = pool
+        self.history_path = history_path
+        self.sessions: Dict[str, TradingSession] = {}
+
+    def history_path_for(self, session_id: str) -> str:
+        if session_id == DEFAULT_SESSION:
+            return self.history_path
+        root, extension = os.path.splitext(self.history_path)
+        return f"{root}-{session_id}{extension}"
+
+    def get(self, session_id: str) -> Optional[TradingSession]:
+        return self.sessions.get(session_id)
+
+    def get_or_create(self, session_id: str) -> TradingSession:
+        if not SESSION_ID_PATTERN.match(session_id):
+            raise ValueError("Session ID must be 1-64 letters, digits, '_' or '-'")
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = TradingSession(session_id, self.pool, self.history_path_for(session_id))
+            self.sessions[session_id] = session
+            logger.info(f"Created session {session_id}")
+        return session
+
+    def remove(self, session_id: str) -> bool:
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        logger.info(f"Removed session {session_id}")
+        return True
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [session.summary() for session in self.sessions.values()]
+
+    def close_all(self):
+        for session_id in list(self.sessions):
+            self.remove(session_id)
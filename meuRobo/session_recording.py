@@ -0,0 +1,547 @@
+import asyncio
+import bisect
+import gzip
+import logging
+import marshal
+import math
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from meuRobo.candle_clock import CandleClock
+from meuRobo.session_manager import FairExecutor, TradingSession
+
+logger = logging.getLogger("robo-trader.session_recording")
+
+MAGIC = b"RTREC"
+VERSION = 1
+_LENGTH = struct.Struct("<I")
+
+# Connector methods whose responses are recorded: everything the trading
+# loop, the settlement tracker and the login ask the broker. Connection
+# management (connect, ping, check_connect) and optimizer history are not.
+RECORDED_METHODS = frozenset({
+    "select_account", "get_balance", "check_asset_availability", "get_available_assets",
+    "get_candles", "place_trade", "check_trade_result",
+})
+
+# Methods returning overlapping lists from one call to the next (the candle
+# window slides by one candle): recorded as a delta of the previous response
+DELTA_METHODS = frozenset({"get_candles"})
+
+# Events of the trading loop delimiting the cycles of a run
+BOUNDARY_EVENTS = ("start", "cycle", "stop")
+
+
+class ReplayMismatch(Exception):
+    """The replay asked the broker something the recording has no answer to"""
+
+
+class RecordedError(Exception):
+    """An exception raised by the recorded connector call, raised again on replay"""
+
+
+def _plain(value: Any) -> Any:
+    # marshal only takes built-in types
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_plain(item) for item in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+def _finite(value: Any) -> Any:
+    # Infinity/NaN are not valid JSON
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def _call_key(method: str, args: tuple, kwargs: Dict[str, Any]) -> tuple:
+    return method, tuple(args), tuple(sorted(kwargs.items()))
+
+
+def _delta(previous: Optional[list], result: Any) -> Optional[tuple]:
+    """(start, shared, tail) such that result == previous[start:start + shared] + tail, or None"""
+    if not previous or not isinstance(result, list) or not result:
+        return None
+    try:
+        start = previous.index(result[0])
+    except ValueError:
+        return None
+    shared = 0
+    limit = min(len(previous) - start, len(result))
+    while shared < limit and previous[start + shared] == result[shared]:
+        shared += 1
+    return start, shared, result[shared:]
+
+
+class SessionRecorder:
+    """
+    Writes the responses a connector receives, and the trading loop's events, to a file.
+
+    The file is a header (MAGIC and VERSION) followed by a gzip stream of
+    records, each a 4-byte little-endian length and a marshal-serialized
+    tuple:
+
+        ("meta", time, data)
+        ("call", time, method, args, kwargs, result)
+        ("delta", time, method, args, kwargs, (start, shared, tail))
+        ("error", time, method, args, kwargs, message)
+        ("event", time, name, data)
+
+    A delta is a result of DELTA_METHODS as a slice of the previous result
+    of the same call plus the new items. Times are local epoch seconds at
+    which the call returned or the event happened. The stream is flushed on
+    every event and at least every flush_interval seconds, so a crashed
+    process leaves a readable file.
+    """
+
+    def __init__(self, path: str, meta: Optional[Dict[str, Any]] = None, flush_interval: float = 5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + bytes([VERSION]))
+        self._stream = gzip.GzipFile(fileobj=self._file, mode="wb", mtime=0)
+        self._flushed_at = time.monotonic()
+        self._previous: Dict[tuple, list] = {}  # Last result of each call of DELTA_METHODS
+        self._write(("meta", time.time(), dict(meta or {}, version=VERSION)), flush=True)
+        logger.info(f"Recording session to {path}")
+
+    def record_call(self, method: str, args: tuple, kwargs: Dict[str, Any], result: Any):
+        recorded_at = time.time()
+        if method not in DELTA_METHODS:
+            self._write(("call", recorded_at, method, args, kwargs, result))
+            return
+        result = _plain(result)
+        key = _call_key(method, args, kwargs)
+        # The delta must follow its base in the file
+        with self._lock:
+            delta = _delta(self._previous.get(key), result)
+            self._previous[key] = result
+            if delta is None:
+                self._write(("call", recorded_at, method, args, kwargs, result))
+            else:
+                self._write(("delta", recorded_at, method, args, kwargs, delta))
+
+    def record_error(self, method: str, args: tuple, kwargs: Dict[str, Any], error: Exception):
+        self._write(("error", time.time(), method, args, kwargs, f"{type(error).__name__}: {str(error)}"))
+
+    def record_event(self, name: str, **data):
+        self._write(("event", time.time(), name, data), flush=True)
+
+    def _write(self, record: tuple, flush: bool = False):
+        try:
+            data = marshal.dumps(_plain(record))
+        except ValueError as e:
+            # Recording must never break trading
+            logger.warning(f"Could not record {record[0]} {record[2]}: {str(e)}")
+            return
+        with self._lock:
+            if self._stream is None:
+                return
+            self._stream.write(_LENGTH.pack(len(data)))
+            self._stream.write(data)
+            if flush or time.monotonic() - self._flushed_at >= self.flush_interval:
+                self._stream.flush()
+                self._file.flush()
+                self._flushed_at = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._stream is None:
+                return
+            self._stream.close()
+            self._file.close()
+            self._stream = None
+        logger.info(f"Recording {self.path} closed")
+
+
+def read_records(path: str) -> Iterator[tuple]:
+    """
+    Records of a recording in file order, deltas expanded into calls.
+
+    A truncated file ends at its last complete record.
+    """
+    previous: Dict[tuple, list] = {}
+    with open(path, "rb") as file:
+        header = file.read(len(MAGIC) + 1)
+        if len(header) <= len(MAGIC) or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a session recording")
+        if header[len(MAGIC)] != VERSION:
+            raise ValueError(f"Unsupported session recording version {header[len(MAGIC)]}")
+
+        with gzip.GzipFile(fileobj=file, mode="rb") as stream:
+            while True:
+                try:
+                    length = stream.read(_LENGTH.size)
+                    if len(length) < _LENGTH.size:
+                        return
+                    data = stream.read(_LENGTH.unpack(length)[0])
+                except (EOFError, zlib.error, OSError):
+                    logger.warning(f"Recording {path} is truncated")
+                    return
+                if len(data) < _LENGTH.unpack(length)[0]:
+                    logger.warning(f"Recording {path} is truncated")
+                    return
+                record = marshal.loads(data)
+                if record[0] == "delta":
+                    key = _call_key(*record[2:5])
+                    start, shared, tail = record[5]
+                    record = ("call",) + record[1:5] + (previous[key][start:start + shared] + tail,)
+                if record[0] == "call" and record[2] in DELTA_METHODS:
+                    previous[_call_key(*record[2:5])] = record[5]
+                yield record
+
+
+class RecordingConnector:
+    """
+    Proxy of an IQOptionConnector recording the responses of RECORDED_METHODS.
+
+    Everything else (clock, open_times, candle_store, connection management)
+    passes straight through. Pending order results are not recorded: on
+    replay, an order is pending until its recorded result.
+    """
+
+    def __init__(self, connector, recorder: SessionRecorder):
+        object.__setattr__(self, "connector", connector)
+        object.__setattr__(self, "recorder", recorder)
+        object.__setattr__(self, "_wrapped", {})
+
+    def __getattr__(self, name):
+        wrapped = self._wrapped.get(name)
+        if wrapped is not None:
+            return wrapped
+
+        attribute = getattr(self.connector, name)
+        if name not in RECORDED_METHODS or not callable(attribute):
+            return attribute
+        recorder = self.recorder
+        settles = name == "check_trade_result"
+
+        def recorded(*args, **kwargs):
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as e:
+                if not settles:
+                    recorder.record_error(name, args, kwargs, e)
+                raise
+            if not settles or result[0]:
+                recorder.record_call(name, args, kwargs, result)
+            return result
+
+        self._wrapped[name] = recorded
+        return recorded
+
+    def __setattr__(self, name, value):
+        setattr(self.connector, name, value)
+
+
+class SessionRecording:
+    """A recording loaded in memory, indexed for replay"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.meta: Dict[str, Any] = {}
+        self.events: List[Tuple[float, str, Dict[str, Any]]] = []
+        self.orders: List[list] = []  # [time, args, kwargs, response, consumed]
+        self.settlements: Dict[Any, Tuple[float, Any]] = {}  # order_id -> first settled result
+        self._responses: Dict[tuple, Tuple[List[float], List[tuple]]] = defaultdict(lambda: ([], []))
+
+        calls = []
+        for record in read_records(path):
+            kind, recorded_at = record[0], record[1]
+            if kind == "meta":
+                self.meta.update(record[2])
+            elif kind == "event":
+                self.events.append((recorded_at, record[2], record[3]))
+            else:
+                calls.append(record)
+
+        self.events.sort(key=lambda event: event[0])
+        for kind, recorded_at, method, args, kwargs, value in sorted(calls, key=lambda record: record[1]):
+            if method == "place_trade":
+                self.orders.append([recorded_at, args, kwargs, (kind, value), False])
+            elif method == "check_trade_result":
+                self.settlements.setdefault(args[0], (recorded_at, value))
+            else:
+                times, responses = self._responses[_call_key(method, args, kwargs)]
+                times.append(recorded_at)
+                responses.append((kind, value))
+        self.settlement_times = sorted(recorded_at for recorded_at, _ in self.settlements.values())
+
+    def runs(self) -> List[List[Tuple[float, str, Dict[str, Any]]]]:
+        """Events of each trading loop run, from its 'start' event to the next one"""
+        runs = []
+        for event in self.events:
+            if event[1] == "start":
+                runs.append([])
+            if runs:
+                runs[-1].append(event)
+        return runs
+
+    def response(self, method: str, args: tuple, kwargs: Dict[str, Any], start: float, end: float):
+        """Last ("call" | "error", value) recorded for the call in [start, end), or None"""
+        times, responses = self._responses.get(_call_key(method, args, kwargs), ((), ()))
+        index = bisect.bisect_left(times, end) - 1
+        if index >= 0 and times[index] >= start:
+            return responses[index]
+        return None
+
+    def take_order(self, args: tuple, kwargs: Dict[str, Any], start: float, end: float):
+        """First unused order acknowledgement recorded in [start, end) for the same order, or None"""
+        for order in self.orders:
+            recorded_at, recorded_args, recorded_kwargs, response, consumed = order
+            if recorded_at >= end:
+                break
+            if (not consumed and recorded_at >= start and
+                    _call_key("", recorded_args, recorded_kwargs) == _call_key("", args, kwargs)):
+                order[4] = True
+                return response
+        return None
+
+
+class ReplayClock(CandleClock):
+    """CandleClock on the recorded time, moved forward by the replay"""
+
+    def __init__(self, start: float, offset: float = 0.0):
+        super().__init__()
+        self.current = start
+        self.offset = offset
+
+    def sync(self) -> float:
+        return self.offset
+
+    @property
+    def needs_sync(self) -> bool:
+        return False
+
+    def time(self) -> float:
+        """Recorded local time, in place of time.time()"""
+        return self.current
+
+    def now(self) -> float:
+        return self.current + self.offset
+
+
+class ReplayConnector:
+    """
+    Connector answering from a recording.
+
+    Queries get the last response recorded for the same call during the
+    current cycle (between the cycle's event and the next one), and raise
+    ReplayMismatch without one. An order gets the acknowledgement of the same
+    order recorded during the cycle (or is rejected), and settles when the
+    clock reaches the time its result was recorded.
+    """
+
+    def __init__(self, recording: SessionRecording, clock: ReplayClock, boundaries: List[float]):
+        self.recording = recording
+        self.clock = clock
+        self.boundaries = boundaries
+        self.email = recording.meta.get("session_id")
+        self.candle_store = None
+        self.missing: List[str] = []
+
+    def _window(self) -> Tuple[float, float]:
+        index = bisect.bisect_right(self.boundaries, self.clock.time())
+        start = self.boundaries[index - 1] if index > 0 else -math.inf
+        end = self.boundaries[index] if index < len(self.boundaries) else math.inf
+        return start, end
+
+    def _missing(self, method: str, args: tuple) -> str:
+        message = f"No recorded response to {method}{args}"
+        self.missing.append(message)
+        logger.warning(message)
+        return message
+
+    def _respond(self, method: str, *args, **kwargs):
+        response = self.recording.response(method, args, kwargs, *self._window())
+        if response is None:
+            raise ReplayMismatch(self._missing(method, args))
+        kind, value = response
+        if kind == "error":
+            raise RecordedError(value)
+        return value
+
+    def __getattr__(self, name):
+        if name not in RECORDED_METHODS:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._respond(name, *args, **kwargs)
+
+    def check_connect(self):
+        return True
+
+    def ping(self):
+        pass
+
+    def get_last_error(self):
+        return "Replayed session"
+
+    def place_trade(self, *args, **kwargs):
+        response = self.recording.take_order(args, kwargs, *self._window())
+        if response is None:
+            # Rejected, without counting as a loss: the order shows up in the report
+            return {"success": False, "error": self._missing("place_trade", args)}
+        kind, value = response
+        if kind == "error":
+            raise RecordedError(value)
+        return dict(value)
+
+    def check_trade_result(self, order_id, option_type="digital"):
+        settlement = self.recording.settlements.get(order_id)
+        if settlement is None or settlement[0] > self.clock.time():
+            return False, None
+        return settlement[1]
+
+
+class ReplaySession(TradingSession):
+    """
+    Trading session replaying one run of a recording.
+
+    The run's start event restores the configuration, strategy parameters,
+    daily result and recent history. Time only moves when the trading loop
+    sleeps: to the next recorded cycle, settling on the way every order whose
+    result was recorded, at the time it was recorded. With a speed the replay
+    waits the recorded time divided by it, otherwise it runs as fast as
+    possible.
+    """
+
+    def __init__(self, recording: SessionRecording, pool: FairExecutor, run: int = 0,
+                 speed: Optional[float] = None):
+        runs = recording.runs()
+        if not 0 <= run < len(runs):
+            raise ValueError(f"The recording has {len(runs)} trading run(s)")
+        self.run = runs[run]
+        self.speed = speed
+        self.events: List[Tuple[float, str, Dict[str, Any]]] = []
+        self._directory = tempfile.mkdtemp(prefix="robo-replay-")
+        super().__init__(f"replay-{os.getpid()}-{id(self)}", pool, os.path.join(self._directory, "history.db"))
+
+        start = self.run[0][2]
+        self.config = dict(start["config"])
+        self.daily_result = dict(start["daily_result"])
+        self.params = start["params"]
+        for operation in start["history"]:
+            self.history_store.append(operation)
+
+        boundaries = [event for event in self.run if event[1] in BOUNDARY_EVENTS]
+        # The loop runs its first cycle as soon as it starts
+        first = next((event for event in boundaries if event[1] == "cycle"), boundaries[0])
+        self.clock = ReplayClock(first[0], first[2].get("offset", 0.0))
+        self.connector = ReplayConnector(recording, self.clock, [event[0] for event in boundaries])
+        self.recording = recording
+        self._wakeups = [event for event in boundaries if event[0] > first[0]]
+        self.active = True
+        self.daily_result["is_running"] = True
+
+    def record_event(self, name: str, **data):
+        self.events.append((self.clock.time(), name, _plain(data)))
+
+    async def sleep(self, seconds: float):
+        """Move the clock to the next recorded cycle (or the end of the run)"""
+        if not self.active:
+            return
+        if self._wakeups:
+            wakeup_at, name, data = self._wakeups.pop(0)
+        else:
+            wakeup_at, name, data = max(self.clock.time(), self.run[-1][0]), "stop", {}
+
+        # Orders settle at the times their results were recorded, in that order
+        times = self.recording.settlement_times
+        index = bisect.bisect_right(times, self.clock.time())
+        while index < len(times) and times[index] < wakeup_at:
+            await self._advance(times[index])
+            index = bisect.bisect_right(times, times[index])
+        await self._advance(wakeup_at)
+        self.clock.offset = data.get("offset", self.clock.offset)
+
+        if name == "stop":
+            self.stop()
+
+    async def _advance(self, to: float):
+        if self.speed:
+            await asyncio.sleep(max(to - self.clock.time(), 0) / self.speed)
+        self.clock.current = max(self.clock.current, to)
+        if self.settlement_tracker is not None and self.settlement_tracker.open_orders:
+            await self.settlement_tracker.poll()
+
+    def report(self) -> Dict[str, Any]:
+        """Signals, orders and final daily result of the replay against the recording"""
+        signals = _compare(self.run, self.events, "signal", ("asset", "direction"))
+        # Test entries are placed by hand, not by the loop
+        orders = _compare(self.run, self.events, "order", ("asset", "amount", "direction", "expiration", "success"),
+                          lambda data: data.get("record", True))
+
+        recorded_stop = next((data for _, name, data in self.run if name == "stop"), None)
+        replayed_stop = next((data for _, name, data in self.events if name == "stop"), None)
+        result_changes = {}
+        if recorded_stop is not None and replayed_stop is not None:
+            recorded, replayed = recorded_stop["daily_result"], replayed_stop["daily_result"]
+            result_changes = {key: [recorded.get(key), replayed.get(key)]
+                              for key in sorted(set(recorded) | set(replayed))
+                              if recorded.get(key) != replayed.get(key)}
+
+        return _finite({
+            "recording": self.recording.path,
+            "cycles": {"recorded": sum(name == "cycle" for _, name, _ in self.run),
+                       "replayed": sum(name == "cycle" for _, name, _ in self.events)},
+            "signals": signals,
+            "orders": orders,
+            "daily_result": replayed_stop["daily_result"] if replayed_stop is not None else self.daily_result,
+            "daily_result_changes": result_changes,
+            "missing_responses": self.connector.missing,
+            "identical": (not signals["missing"] and not signals["unexpected"] and not orders["missing"]
+                          and not orders["unexpected"] and not result_changes and not self.connector.missing),
+        })
+
+    def close(self):
+        self.stop()
+        if self.settlement_tracker is not None:
+            self.settlement_tracker.stop()
+        self.history_store.close()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+
+def _compare(recorded_events, replayed_events, name: str, fields: Tuple[str, ...], keep=None) -> Dict[str, Any]:
+    """Events of one kind, keyed by their cycle and fields, in both runs"""
+    def keyed(events):
+        keys = []
+        boundary = None
+        for _, event_name, data in events:
+            if event_name == "cycle":
+                boundary = data.get("boundary")
+            elif event_name == name and (keep is None or keep(data)):
+                keys.append((boundary,) + tuple(data.get(field) for field in fields))
+        return Counter(keys)
+
+    recorded, replayed = keyed(recorded_events), keyed(replayed_events)
+
+    def listed(counter):
+        return [dict(zip(("cycle",) + fields, key)) for key in sorted(counter.elements(), key=repr)]
+
+    return {
+        "recorded": sum(recorded.values()),
+        "replayed": sum(replayed.values()),
+        "missing": listed(recorded - replayed),
+        "unexpected": listed(replayed - recorded),
+    }
@@ -0,0 +1,120 @@
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger("robo-trader.settlement")
+
+
+class SettlementTracker:
+    """
+    Watches every open order of a connector from a single background task.
+
+    Orders returned by IQOptionConnector.place_trade() are registered with
+    track(). The tracker polls all of them together and, when an order
+    settles (or times out), awaits on_settled(order, result) where result has
+    the same shape as IQOptionConnector.execute_trade() returns.
+    """
+
+    def __init__(self, connector, on_settled: Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]],
+                poll_interval: Optional[float] = 1.0, grace_period: float = 30.0, executor=None,
+                now: Callable[[], float] = time.time):
+        """
+        Initialize the tracker
+
+        Args:
+            connector: IQOptionConnector used to check order results
+            on_settled: Coroutine function called with (order, result) for each settled order
+            poll_interval: Seconds between polls of the open orders (None: no background
+                task, orders are only checked when poll() is called)
+            grace_period: Seconds to keep waiting after expiration before giving up
+            executor: Executor for the blocking result checks (default executor if None)
+            now: Clock the expiration times are compared with
+        """
+        self.connector = connector
+        self.on_settled = on_settled
+        self.poll_interval = poll_interval
+        self.grace_period = grace_period
+        self.executor = executor
+        self.now = now
+        self.open_orders: Dict[Any, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def track(self, order: Dict[str, Any]):
+        """Start watching an order placed with IQOptionConnector.place_trade()"""
+        self.open_orders[order["order_id"]] = order
+        logger.debug(f"Tracking order {order['order_id']} ({len(self.open_orders)} open)")
+
+        if self.poll_interval is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Stop the background task; open orders are kept"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        """Poll the open orders until none is left"""
+        while self.open_orders:
+            await asyncio.sleep(self.poll_interval)
+
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Error checking open orders: {str(e)}")
+
+    async def poll(self):
+        """Check every open order once and hand the settled ones to on_settled"""
+        orders = list(self.open_orders.values())
+        if not orders:
+            return
+        settled = await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(self._check_orders, orders))
+
+        for order, result in settled:
+            self.open_orders.pop(order["order_id"], None)
+            try:
+                await self.on_settled(order, result)
+            except Exception as e:
+                logger.error(f"Error handling settlement of order {order['order_id']}: {str(e)}")
+
+    def _check_orders(self, orders: List[Dict[str, Any]]) -> List[tuple]:
+        """Check every open order once (runs on the executor)"""
+        settled = []
+        now = self.now()
+
+        for order in orders:
+            order_id = order["order_id"]
+            option_type = order.get("option_type", "digital")
+
+            # Binary result checks block until the option closes
+            if option_type != "digital" and now < order["expires_at"]:
+                continue
+
+            try:
+                status, profit = self.connector.check_trade_result(order_id, option_type)
+            except Exception as e:
+                logger.warning(f"Error checking order {order_id}: {str(e)}")
+                status, profit = False, None
+
+            if status:
+                outcome = "WIN" if profit > 0 else "LOSS"
+                logger.info(f"Trade result: {outcome}, profit: {profit} (order {order_id})")
+                settled.append((order, {
+                    "success": True,
+                    "order_id": order_id,
+                    "profit_amount": profit,
+                    "outcome": outcome
+                }))
+            elif now >= order["expires_at"] + self.grace_period:
+                logger.warning(f"Timeout waiting for trade result. Order ID: {order_id}")
+                settled.append((order, {
+                    "success": False,
+                    "order_id": order_id,
+                    "error": "Timeout waiting for result",
+                    "profit_amount": -order["amount"]  # Consider it a loss if we can't determine the outcome
+                }))
+
+        return settled
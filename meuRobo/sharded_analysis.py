@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from meuRobo.strategy import OHLC_DTYPE, StochasticStrategy
+
+logger = logging.getLogger("robo-trader.sharded_analysis")
+
+# Per-row analysis results written by the workers
+RESULT_DTYPE = np.dtype([
+    ('signal', np.int8),
+    ('stochastic_k', np.float64),
+    ('stochastic_d', np.float64),
+    ('sma', np.float64),
+    ('price', np.float64),
+])
+
+STRATEGY_PARAMS = ("k_period", "d_period", "slowing", "upper_threshold", "lower_threshold", "sma_period")
+
+
+class SharedArray:
+    """NumPy array backed by a multiprocessing.shared_memory segment"""
+
+    def __init__(self, shape: Tuple[int, ...], dtype: np.dtype, name: Optional[str] = None):
+        """
+        Args:
+            shape: Array shape
+            dtype: Array dtype
+            name: Attach to this existing segment instead of creating one
+        """
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape)) * self.dtype.itemsize, 1)
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.array = np.ndarray(shape, dtype=self.dtype, buffer=self.shm.buf)
+        if self.owner:
+            self.array[...] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self):
+        """Detach (and free, if this process created the segment)"""
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# Worker process state: attached blocks (by role) and strategies, cached across tasks
+_attached: Dict[str, SharedArray] = {}
+_strategies: Dict[tuple, StochasticStrategy] = {}
+
+
+def _attach(role: str, name: str, shape: Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+    block = _attached.get(role)
+    if block is None or block.name != name:
+        # The coordinator reallocated the block: drop the old mapping
+        if block is not None:
+            block.close()
+        block = _attached[role] = SharedArray(shape, dtype, name=name)
+    return block.array
+
+
+def _analyze_shard(candles_name: str, results_name: str, shape: Tuple[int, int],
+                   params: tuple, rows: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Worker task: analyze the given rows of the shared candle block in place.
+
+    Indicators are written to the shared result block; only the signals are
+    sent back, as (row, 1 for CALL / -1 for PUT) pairs.
+    """
+    candles = _attach("candles", candles_name, shape, OHLC_DTYPE)
+    results = _attach("results", results_name, (shape[0],), RESULT_DTYPE)
+
+    strategy = _strategies.get(params)
+    if strategy is None:
+        strategy = _strategies[params] = StochasticStrategy(**dict(zip(STRATEGY_PARAMS, params)))
+
+    # Contiguous row ranges are zero-copy slices; other selections are gathered
+    if len(rows) and rows[-1] - rows[0] == len(rows) - 1:
+        block = candles[rows[0]:rows[-1] + 1]
+    else:
+        block = candles[rows]
+
+    latest = strategy.latest_signal_arrays(block['high'], block['low'], block['close'])
+    for field in RESULT_DTYPE.names:
+        results[field][rows] = latest[field]
+
+    signal_rows = np.flatnonzero(latest['signal'])
+    return [(int(rows[i]), int(latest['signal'][i])) for i in signal_rows]
+
+
+class ShardedAnalyzer:
+    """
+    Runs StochasticStrategy over many asset/timeframe pairs in worker processes.
+
+    The last candles of every pair live in one shared-memory block (pairs x
+    window). The coordinator copies fresh candles into a pair's row; each
+    analysis splits the requested rows into one shard per worker. Workers read
+    their rows without copying, write the indicators to a shared result block
+    and send back only the signals, so the per-cycle IPC is a few row indices.
+    """
+
+    def __init__(self, strategy: StochasticStrategy, workers: Optional[int] = None, capacity: int = 256):
+        """
+        Initialize the analyzer
+
+        Args:
+            strategy: Strategy whose parameters the workers use
+            workers: Number of worker processes (default: CPU count)
+            capacity: Initial number of pairs; the blocks grow when needed
+        """
+        self.strategy = strategy
+        self.params = tuple(getattr(strategy, name) for name in STRATEGY_PARAMS)
+        self.window = strategy.batch_window
+        self.workers = workers or os.cpu_count() or 1
+        self.rows: Dict[Hashable, int] = {}
+        self.last_timestamps: Dict[Hashable, Any] = {}
+        self.free_rows: List[int] = []
+        self.counts = np.zeros(0, dtype=np.int64)  # Candles held per row
+        self.candles: Optional[SharedArray] = None
+        self.results: Optional[SharedArray] = None
+        self._allocate(capacity)
+        # Spawned workers: forking a process that runs threads is unsafe
+        self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        self._pending: Set[Future] = set()  # Shards submitted and not finished
+        logger.info(f"Sharded analysis started with {self.workers} workers")
+
+    def _allocate(self, capacity: int):
+        """(Re)create the shared blocks, keeping the rows already written"""
+        candles = SharedArray((capacity, self.window), OHLC_DTYPE)
+        results = SharedArray((capacity,), RESULT_DTYPE)
+        counts = np.zeros(capacity, dtype=np.int64)
+
+        if self.candles is not None:
+            used = len(self.counts)
+            candles.array[:used] = self.candles.array
+            counts[:used] = self.counts
+            self.candles.close()
+            self.results.close()
+
+        self.candles, self.results, self.counts = candles, results, counts
+
+    def _row(self, key: Hashable) -> int:
+        row = self.rows.get(key)
+        if row is None:
+            if self.free_rows:
+                row = self.free_rows.pop()
+            else:
+                row = len(self.rows)
+                if row >= len(self.counts):
+                    self._allocate(len(self.counts) * 2)
+            self.rows[key] = row
+        return row
+
+    def update(self, key: Hashable, candles: Sequence[Dict[str, Any]]) -> bool:
+        """
+        Store the latest candles of a pair.
+
+        Args:
+            key: Pair identifier, e.g. (session_id, asset, timeframe)
+            candles: Closed candles in chronological order (only the last window are kept)
+
+        Returns:
+            True if the last candle differs from the one stored by the previous update
+        """
+        row = self._row(key)
+        last_timestamp = candles[-1].get('timestamp') if candles else None
+        is_new = last_timestamp is None or self.last_timestamps.get(key) != last_timestamp
+        self.last_timestamps[key] = last_timestamp
+        tail = candles[-self.window:]
+        count = len(tail)
+        target = self.candles.array[row]
+        for field in ('open', 'high', 'low', 'close'):
+            target[field][self.window - count:] = [candle[field] for candle in tail]
+        self.counts[row] = count
+        return is_new
+
+    def remove(self, key: Hashable):
+        """Stop analyzing a pair; its row goes to the next new pair"""
+        self.last_timestamps.pop(key, None)
+        row = self.rows.pop(key, None)
+        if row is not None:
+            self.counts[row] = 0
+            self.free_rows.append(row)
+
+    def _shards(self, rows: np.ndarray) -> List[np.ndarray]:
+        return [shard for shard in np.array_split(rows, min(self.workers, len(rows))) if len(shard)]
+
+    def _collect(self, keys: List[Hashable], rows: np.ndarray,
+                 signals: List[Tuple[int, int]]) -> Dict[Hashable, Tuple[bool, str, Dict[str, Any]]]:
+        # Indicators from the shared result block, signals from the workers' replies
+        latest = {field: self.results.array[field][rows] for field in RESULT_DTYPE.names}
+        directions = dict(signals)
+        latest['signal'] = np.array([directions.get(int(row), 0) for row in rows], dtype=np.int8)
+        return self.strategy.latest_results(keys, latest)
+
+    def _ready_rows(self, keys: Sequence[Hashable]) -> Tuple[List[Hashable], np.ndarray]:
+        ready = [key for key in keys if key in self.rows and self.counts[self.rows[key]] >= self.window]
+        return ready, np.array(sorted(self.rows[key] for key in ready), dtype=np.int64)
+
+    def _submit(self, rows: np.ndarray):
+        shape = (len(self.counts), self.window)
+        futures = [self.pool.submit(_analyze_shard, self.candles.name, self.results.name, shape, self.params, shard)
+                   for shard in self._shards(rows)]
+        self._pending.update(futures)
+        for future in futures:
+            future.add_done_callback(self._pending.discard)
+        return futures
+
+    def analyze(self, keys: Sequence[Hashable]) -> Dict[Hashable, Tuple[bool, str, Dict[str, Any]]]:
+        """
+        Analyze pairs in the worker processes.
+
+        Pairs with fewer than a full window of candles are skipped.
+
+        Returns:
+            Dictionary mapping each analyzed key to the (signal_generated,
+            signal_direction, indicator_values) tuple analyze() would return
+        """
+        ready, rows = self._ready_rows(keys)
+        if not ready:
+            return {}
+        signals = [signal for future in self._submit(rows) for signal in future.result()]
+        ready.sort(key=lambda key: self.rows[key])
+        return self._collect(ready, rows, signals)
+
+    async def analyze_async(self, keys: Sequence[Hashable]) -> Dict[Hashable, Tuple[bool, str, Dict[str, Any]]]:
+        """analyze() without blocking the event loop"""
+        ready, rows = self._ready_rows(keys)
+        if not ready:
+            return {}
+        shards = await asyncio.gather(*(asyncio.wrap_future(future) for future in self._submit(rows)))
+        ready.sort(key=lambda key: self.rows[key])
+        return self._collect(ready, rows, [signal for shard in shards for signal in shard])
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        # Drop the shards not started yet (shutdown(cancel_futures=True) needs Python 3.9)
+        for future in list(self._pending):
+            future.cancel()
+        self.pool.shutdown(wait=True)
+        self.candles.close()
+        self.results.close()
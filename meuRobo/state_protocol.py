@@ -0,0 +1,101 @@
+import json
+import math
+from typing import Any, Dict, Optional, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:  # Optional: binary encoding for dashboards that ask for it
+    msgpack = None
+
+PROTOCOLS = ("full", "delta")
+ENCODINGS = ("json", "msgpack") if msgpack is not None else ("json",)
+
+
+def encode(message: Dict[str, Any], encoding: str = "json") -> Union[str, bytes]:
+    """Serialize a message: text for JSON, bytes for MessagePack"""
+    if encoding == "msgpack":
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def _plain(value: Any) -> Any:
+    # Infinity/NaN are not valid JSON; the dashboard gets null instead
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    return value
+
+
+def _merge(target: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply changes to target in place; returns the fields whose value changed"""
+    delta = {}
+    for key, value in changes.items():
+        current = target.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            nested = _merge(current, value)
+            if nested:
+                delta[key] = nested
+        else:
+            value = _plain(value)
+            if key not in target or current != value:
+                target[key] = value
+                delta[key] = value
+    return delta
+
+
+class StateDocument:
+    """
+    Versioned dashboard state of one session.
+
+    Changes are merged field by field (nested dicts recursively); only fields
+    whose value actually changed make up the delta, which gets the next
+    sequence number. A client applying every delta in order to the snapshot
+    it started from holds the same state as the server.
+    """
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+        self.seq = 0
+
+    def apply(self, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Merge changes into the state.
+
+        Returns:
+            The delta message, or None if nothing changed
+        """
+        delta = _merge(self.state, changes)
+        if not delta:
+            return None
+        self.seq += 1
+        return {"type": "delta", "seq": self.seq, "changes": delta}
+
+    def snapshot(self, session_id: str) -> Dict[str, Any]:
+        return {"type": "snapshot", "seq": self.seq, "session_id": session_id, "state": self.state}
+
+
+def state_changes(data: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Split a broadcast message into state changes and a one-off event.
+
+    'update' and 'analysis' messages only carry state; 'operation' carries
+    both the new daily result and the operation event; anything else
+    (alerts, ...) is an event.
+
+    Returns:
+        (changes, event), either of which may be None
+    """
+    message_type = data.get("type")
+    if message_type == "update":
+        return {"daily_result": data["daily_result"], "is_running": data["is_running"]}, None
+    if message_type == "analysis":
+        return {"analysis": {data["asset"]: {
+            "time": data["time"],
+            "indicators": data["indicators"],
+            "signal": data["signal"],
+            "direction": data["direction"]
+        }}}, None
+    if message_type == "operation":
+        return {"daily_result": data["daily_result"]}, {"type": "operation", "data": data["data"]}
+    return None, data
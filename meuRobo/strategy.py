@@ -1,10 +1,18 @@
 import pandas as pd
 import numpy as np
 import logging
-from typing import Tuple, Dict, Any
+import math
+from collections import deque
+from typing import Tuple, Dict, Any, Hashable, List, Optional, Sequence
+
+from meuRobo.indicator_graph import CLOSE, IndicatorGraph, Node, above, sma, stochastic_k
 
 logger = logging.getLogger("robo-trader.strategy")
 
+# Row layout of the OHLC blocks used by StochasticStrategy.analyze_batch()
+OHLC_DTYPE = np.dtype([('open', np.float64), ('high', np.float64),
+                       ('low', np.float64), ('close', np.float64)])
+
 class StochasticStrategy:
     """
     Trading strategy using Stochastic Oscillator and Simple Moving Average (SMA).
@@ -39,49 +47,20 @@ class StochasticStrategy:
                    f"K={k_period}, D={d_period}, Slowing={slowing}, "
                    f"Upper={upper_threshold}, Lower={lower_threshold}, SMA={sma_period}")
     
-    def calculate_stochastic(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calculate Stochastic Oscillator values"""
-        # Make a copy to avoid modifying the original
-        df = df.copy()
-        
-        # Calculate %K
-        df['highest_high'] = df['high'].rolling(window=self.k_period).max()
-        df['lowest_low'] = df['low'].rolling(window=self.k_period).min()
-        df['%K'] = 100 * ((df['close'] - df['lowest_low']) / 
-                          (df['highest_high'] - df['lowest_low']))
-        
-        # Apply slowing if specified
-        if self.slowing > 1:
-            df['%K'] = df['%K'].rolling(window=self.slowing).mean()
-        
-        # Calculate %D (signal line)
-        df['%D'] = df['%K'].rolling(window=self.d_period).mean()
-        
-        return df
-    
-    def calculate_sma(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calculate Simple Moving Average"""
-        df = df.copy()
-        df['SMA'] = df['close'].rolling(window=self.sma_period).mean()
-        return df
-    
-    def determine_trend(self, df: pd.DataFrame) -> str:
-        """Determine trend direction based on price relative to SMA"""
-        # Get the last two candles
-        last_candles = df.iloc[-3:].copy()
-        
-        # If price is above SMA, trend is up
-        if last_candles['close'].iloc[-1] > last_candles['SMA'].iloc[-1]:
-            return "up"
-        else:
-            return "down"
+    @property
+    def indicators(self) -> Dict[str, Node]:
+        """Series the entry rules read, declared on the shared indicator graph"""
+        k = stochastic_k(self.k_period, self.slowing)
+        trend_sma = sma(CLOSE, self.sma_period)
+        return {'%K': k, '%D': sma(k, self.d_period), 'SMA': trend_sma, 'uptrend': above(CLOSE, trend_sma)}
     
-    def analyze(self, df: pd.DataFrame) -> Tuple[bool, str, Dict[str, Any]]:
+    def analyze(self, df: pd.DataFrame, graph: Optional[IndicatorGraph] = None) -> Tuple[bool, str, Dict[str, Any]]:
         """
         Analyze price data to generate trading signals.
         
         Args:
             df: DataFrame with OHLCV candlestick data
+            graph: Indicator graph of df shared with other strategies (default: a new one)
         
         Returns:
             Tuple with (signal_generated, signal_direction, indicator_values)
@@ -95,47 +74,482 @@ class StochasticStrategy:
                     return False, "", {}
             
             # Calculate indicators
-            df = self.calculate_stochastic(df)
-            df = self.calculate_sma(df)
+            indicators = (graph or IndicatorGraph(df)).evaluate(self.indicators)
             
             # Get the last values
-            last_k = df['%K'].iloc[-1]
-            last_d = df['%D'].iloc[-1]
-            prev_k = df['%K'].iloc[-2]
-            trend = self.determine_trend(df)
+            last_k = float(indicators['%K'][-1])
+            last_d = float(indicators['%D'][-1])
+            prev_k = float(indicators['%K'][-2])
+            trend = "up" if indicators['uptrend'][-1] else "down"
             
-            # Log the indicator values
-            logger.debug(f"Stochastic %K: {last_k:.2f}, %D: {last_d:.2f}, Trend: {trend}")
+            return self.generate_signal(last_k, prev_k, last_d, float(indicators['SMA'][-1]),
+                                        float(df['close'].iloc[-1]), trend)
             
-            # Store indicator values for UI display
+        except Exception as e:
+            logger.error(f"Error in strategy analysis: {str(e)}")
+            return False, "", {}
+    
+    def generate_signal(self, last_k: float, prev_k: float, last_d: float, sma: float,
+                        price: float, trend: str) -> Tuple[bool, str, Dict[str, Any]]:
+        """
+        Apply the entry rules to the latest indicator values.
+        
+        Args:
+            last_k: %K of the last candle
+            prev_k: %K of the previous candle
+            last_d: %D of the last candle
+            sma: SMA of the last candle
+            price: Close of the last candle
+            trend: 'up' or 'down'
+        
+        Returns:
+            Tuple with (signal_generated, signal_direction, indicator_values)
+        """
+        # Log the indicator values
+        logger.debug(f"Stochastic %K: {last_k:.2f}, %D: {last_d:.2f}, Trend: {trend}")
+        
+        # Store indicator values for UI display
+        indicator_values = {
+            "stochastic_k": last_k,
+            "stochastic_d": last_d,
+            "sma": sma,
+            "trend": trend,
+            "price": price
+        }
+        
+        # Generate signals based on conditions
+        signal = False
+        direction = ""
+        
+        # Oversold condition (potential CALL)
+        if last_k < self.lower_threshold and prev_k < self.lower_threshold and last_k > prev_k:
+            if trend == "up":  # Confirm with trend
+                signal = True
+                direction = "call"
+                logger.info(f"CALL signal generated: Stochastic oversold (%K={last_k:.2f}) with uptrend")
+        
+        # Overbought condition (potential PUT)
+        elif last_k > self.upper_threshold and prev_k > self.upper_threshold and last_k < prev_k:
+            if trend == "down":  # Confirm with trend
+                signal = True
+                direction = "put"
+                logger.info(f"PUT signal generated: Stochastic overbought (%K={last_k:.2f}) with downtrend")
+        
+        return signal, direction, indicator_values
+
+
+    def calculate_indicator_arrays(self, high: np.ndarray, low: np.ndarray,
+                                   close: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Vectorized %K, %D and SMA along the last axis of price arrays.
+        
+        Args:
+            high, low, close: Arrays of shape (..., candles)
+        
+        Returns:
+            Dictionary with '%K', '%D', 'SMA' and 'uptrend' (close above SMA)
+            read-only arrays of the same shape, NaN where the windows are not
+            full yet
+        """
+        return IndicatorGraph({'high': high, 'low': low, 'close': close}).evaluate(self.indicators)
+    
+    def signal_arrays(self, high: np.ndarray, low: np.ndarray,
+                      close: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Evaluate the entry rules at every candle along the last axis.
+        
+        Args:
+            high, low, close: Arrays of shape (..., candles)
+        
+        Returns:
+            Tuple with (signals, indicators). signals is an int8 array of the
+            same shape: 1 for CALL, -1 for PUT, 0 for no signal. indicators is
+            the output of calculate_indicator_arrays().
+        """
+        return self.evaluate(IndicatorGraph({'high': high, 'low': low, 'close': close}))
+    
+    def evaluate(self, graph: IndicatorGraph) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """signal_arrays() on an indicator graph shared with other strategies"""
+        indicators = graph.evaluate(self.indicators)
+        return self.entry_signals(indicators['%K'], indicators['uptrend']), indicators
+    
+    def entry_signals(self, k: np.ndarray, uptrend: np.ndarray) -> np.ndarray:
+        """
+        The entry rules of generate_signal() at every candle along the last axis.
+        
+        Args:
+            k: %K array
+            uptrend: Boolean array, True where the close is above the SMA
+        
+        Returns:
+            int8 array: 1 for CALL, -1 for PUT, 0 for no signal
+        """
+        prev_k = np.full(k.shape, np.nan)
+        prev_k[..., 1:] = k[..., :-1]
+        
+        oversold = (k < self.lower_threshold) & (prev_k < self.lower_threshold) & (k > prev_k)
+        overbought = (k > self.upper_threshold) & (prev_k > self.upper_threshold) & (k < prev_k)
+        
+        signals = np.zeros(k.shape, dtype=np.int8)
+        signals[oversold & uptrend] = 1
+        signals[overbought & ~oversold & ~uptrend] = -1
+        return signals
+    
+    @property
+    def batch_window(self) -> int:
+        """Candles that affect the last two %K values and the last %D/SMA"""
+        return max(self.k_period + self.slowing + max(self.d_period, 2) - 2, self.sma_period)
+    
+    def latest_signal_arrays(self, high: np.ndarray, low: np.ndarray,
+                             close: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Signal and indicators at the last candle of every row.
+        
+        Args:
+            high, low, close: 2-D arrays (rows x candles)
+        
+        Returns:
+            Dictionary of 1-D arrays: 'signal' (1 CALL, -1 PUT, 0 none),
+            'stochastic_k', 'stochastic_d', 'sma' and 'price'
+        """
+        # Only the tail of the block affects the result
+        needed = self.batch_window
+        if close.shape[1] > needed:
+            high, low, close = high[:, -needed:], low[:, -needed:], close[:, -needed:]
+        
+        signals, indicators = self.signal_arrays(high, low, close)
+        return {
+            'signal': signals[:, -1],
+            'stochastic_k': indicators['%K'][:, -1],
+            'stochastic_d': indicators['%D'][:, -1],
+            'sma': indicators['SMA'][:, -1],
+            'price': np.asarray(close[:, -1], dtype=np.float64),
+        }
+    
+    def analyze_batch(self, assets: List[str], ohlc: Any) -> Dict[str, Tuple[bool, str, Dict[str, Any]]]:
+        """
+        Analyze many assets at once in a single vectorized pass.
+        
+        The trading loop runs the same pass in worker processes (see
+        meuRobo.sharded_analysis); in-process it keeps one StochasticStream per
+        asset instead, as feeding the candles closed since the last cycle is
+        cheaper than re-analyzing a window.
+        
+        Args:
+            assets: Asset names, one per row of the block
+            ohlc: 2-D OHLC block (assets x candles), either a NumPy structured
+                array or a mapping with 'open', 'high', 'low' and 'close' arrays;
+                see build_ohlc_block()
+        
+        Returns:
+            Dictionary mapping each asset to the (signal_generated,
+            signal_direction, indicator_values) tuple analyze() would return
+        """
+        empty = {asset: (False, "", {}) for asset in assets}
+        
+        try:
+            high = np.asarray(ohlc['high'], dtype=np.float64)
+            low = np.asarray(ohlc['low'], dtype=np.float64)
+            close = np.asarray(ohlc['close'], dtype=np.float64)
+            
+            if close.ndim != 2 or close.shape[0] != len(assets):
+                logger.error(f"OHLC block shape {close.shape} does not match {len(assets)} assets")
+                return empty
+            if close.shape[1] < 2:
+                return empty
+            
+            return self.latest_results(assets, self.latest_signal_arrays(high, low, close))
+            
+        except Exception as e:
+            logger.error(f"Error in batch strategy analysis: {str(e)}")
+            return empty
+    
+    def latest_results(self, keys: Sequence[Hashable],
+                       latest: Dict[str, np.ndarray]) -> Dict[Hashable, Tuple[bool, str, Dict[str, Any]]]:
+        """
+        analyze() tuples from the arrays of latest_signal_arrays(), one per key.
+        
+        Shared by analyze_batch() and the sharded analysis of the trading loop,
+        whose workers compute the arrays in shared memory.
+        """
+        # Plain Python floats once per array, rather than NumPy scalars per key
+        columns = zip(keys, latest['stochastic_k'].tolist(), latest['stochastic_d'].tolist(),
+                      latest['sma'].tolist(), latest['price'].tolist(), latest['signal'].tolist())
+        
+        results = {}
+        for key, last_k, last_d, sma, price, signal in columns:
             indicator_values = {
                 "stochastic_k": last_k,
                 "stochastic_d": last_d,
-                "sma": df['SMA'].iloc[-1],
-                "trend": trend,
-                "price": df['close'].iloc[-1]
+                "sma": sma,
+                "trend": "up" if price > sma else "down",
+                "price": price
             }
+            if signal == 1:
+                logger.info(f"CALL signal generated for {key}: Stochastic oversold "
+                           f"(%K={last_k:.2f}) with uptrend")
+                results[key] = (True, "call", indicator_values)
+            elif signal == -1:
+                logger.info(f"PUT signal generated for {key}: Stochastic overbought "
+                           f"(%K={last_k:.2f}) with downtrend")
+                results[key] = (True, "put", indicator_values)
+            else:
+                results[key] = (False, "", indicator_values)
+        
+        return results
+    
+    @staticmethod
+    def build_ohlc_block(candles_by_asset: Dict[str, List[Dict[str, Any]]],
+                         length: Optional[int] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Stack per-asset candle lists into a 2-D structured OHLC block.
+        
+        Args:
+            candles_by_asset: Candle dictionaries per asset, as returned by
+                IQOptionConnector.get_candles()
+            length: Number of trailing candles to keep (default: shortest list)
+        
+        Returns:
+            Tuple with (asset names, structured array of shape assets x candles)
+        """
+        assets = [asset for asset, candles in candles_by_asset.items() if candles]
+        if length is None:
+            length = min((len(candles_by_asset[asset]) for asset in assets), default=0)
+        assets = [asset for asset in assets if len(candles_by_asset[asset]) >= length]
+        
+        block = np.empty((len(assets), length), dtype=OHLC_DTYPE)
+        for i, asset in enumerate(assets):
+            candles = candles_by_asset[asset][-length:] if length else []
+            for field in ('open', 'high', 'low', 'close'):
+                block[field][i] = [candle[field] for candle in candles]
+        
+        return assets, block
+
+class RollingExtreme:
+    """
+    Rolling maximum or minimum over a fixed window using a monotonic deque.
+    
+    Each update is amortized O(1) and the result is exact, matching
+    pandas' rolling(window).max() / rolling(window).min().
+    """
+    
+    def __init__(self, window: int, mode: str = "max"):
+        """
+        Args:
+            window: Number of values in the window
+            mode: 'max' or 'min'
+        """
+        self.window = window
+        self.mode = mode
+        self.count = 0
+        self._deque = deque()  # (index, value) pairs, monotonic by value
+    
+    def update(self, value: float) -> float:
+        """Push a value and return the extreme of the window (NaN while warming up)"""
+        index = self.count
+        self.count += 1
+        
+        if self.mode == "max":
+            while self._deque and self._deque[-1][1] <= value:
+                self._deque.pop()
+        else:
+            while self._deque and self._deque[-1][1] >= value:
+                self._deque.pop()
+        self._deque.append((index, value))
+        
+        # Drop values that left the window
+        while self._deque[0][0] <= index - self.window:
+            self._deque.popleft()
+        
+        if self.count < self.window:
+            return math.nan
+        return self._deque[0][1]
+
+
+class RollingMean:
+    """
+    Rolling mean over a fixed window with O(1) updates.
+    
+    Keeps a compensated (Kahan) running sum, so the mean stays within
+    rounding of the batch mean of the same window however long it runs.
+    A NaN in the window makes the mean NaN, as in the batch computation.
+    """
+    
+    def __init__(self, window: int):
+        """
+        Args:
+            window: Number of values in the window (also the minimum number of
+                values required for a result)
+        """
+        self.window = window
+        self._values = deque()
+        self._nans = 0
+        self._sum = 0.0
+        self._compensation = 0.0
+    
+    def update(self, value: float) -> float:
+        """Push a value and return the mean of the window (NaN while warming up)"""
+        if len(self._values) == self.window:
+            leaving = self._values.popleft()
+            if leaving != leaving:  # NaN
+                self._nans -= 1
+            else:
+                self._add(-leaving)
+        self._values.append(value)
+        if value != value:
+            self._nans += 1
+        else:
+            self._add(value)
+        
+        if len(self._values) < self.window or self._nans:
+            return math.nan
+        return self._sum / self.window
+    
+    def _add(self, value: float):
+        y = value - self._compensation
+        t = self._sum + y
+        self._compensation = t - self._sum - y
+        self._sum = t
+
+
+class StochasticStream:
+    """
+    Incremental indicator state for a single asset.
+    
+    Consumes one closed candle at a time and keeps rolling high/low, %K, %D
+    and SMA current in O(1) per candle instead of recomputing the whole window.
+    """
+    
+    def __init__(self, strategy: StochasticStrategy):
+        """
+        Args:
+            strategy: Strategy providing the indicator periods and signal rules
+        """
+        self.strategy = strategy
+        self.highest_high = RollingExtreme(strategy.k_period, "max")
+        self.lowest_low = RollingExtreme(strategy.k_period, "min")
+        self.k_smoothing = RollingMean(strategy.slowing) if strategy.slowing > 1 else None
+        self.d_line = RollingMean(strategy.d_period)
+        self.sma = RollingMean(strategy.sma_period)
+        self.count = 0
+        self.last_timestamp = None
+        self.last_k = math.nan
+        self.prev_k = math.nan
+        self.last_result: Tuple[bool, str, Dict[str, Any]] = (False, "", {})
+    
+    def update(self, candle: Dict[str, Any]) -> Tuple[bool, str, Dict[str, Any]]:
+        """
+        Add a closed candle and evaluate the strategy on it.
+        
+        Args:
+            candle: Candle dictionary with open, high, low, close (and timestamp)
+        
+        Returns:
+            Tuple with (signal_generated, signal_direction, indicator_values),
+            the same as StochasticStrategy.analyze over every candle seen so far
+            (indicators equal to within rounding)
+        """
+        try:
+            close = float(candle['close'])
+            highest_high = self.highest_high.update(float(candle['high']))
+            lowest_low = self.lowest_low.update(float(candle['low']))
             
-            # Generate signals based on conditions
-            signal = False
-            direction = ""
-            
-            # Oversold condition (potential CALL)
-            if last_k < self.lower_threshold and prev_k < self.lower_threshold and last_k > prev_k:
-                if trend == "up":  # Confirm with trend
-                    signal = True
-                    direction = "call"
-                    logger.info(f"CALL signal generated: Stochastic oversold (%K={last_k:.2f}) with uptrend")
+            raw_k = 100 * _divide(close - lowest_low, highest_high - lowest_low)
+            k = self.k_smoothing.update(raw_k) if self.k_smoothing else raw_k
+            d = self.d_line.update(k)
+            sma = self.sma.update(close)
             
-            # Overbought condition (potential PUT)
-            elif last_k > self.upper_threshold and prev_k > self.upper_threshold and last_k < prev_k:
-                if trend == "down":  # Confirm with trend
-                    signal = True
-                    direction = "put"
-                    logger.info(f"PUT signal generated: Stochastic overbought (%K={last_k:.2f}) with downtrend")
+            self.prev_k = self.last_k
+            self.last_k = k
+            self.count += 1
+            self.last_timestamp = candle.get('timestamp')
             
-            return signal, direction, indicator_values
+            if self.count < 2:
+                # analyze() needs a previous %K value as well
+                self.last_result = (False, "", {})
+            else:
+                trend = "up" if close > sma else "down"
+                self.last_result = self.strategy.generate_signal(k, self.prev_k, d, sma, close, trend)
+            return self.last_result
             
         except Exception as e:
-            logger.error(f"Error in strategy analysis: {str(e)}")
+            logger.error(f"Error in streaming strategy analysis: {str(e)}")
             return False, "", {}
+
+
+class StreamingStochasticStrategy(StochasticStrategy):
+    """
+    Stateful variant of StochasticStrategy fed with one closed candle at a time.
+    
+    Keeps one StochasticStream per asset. Results are the same
+    (signal, direction, indicator_values) tuple analyze() returns for the full
+    sequence of candles the stream has consumed.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.streams: Dict[str, StochasticStream] = {}
+    
+    def update(self, asset: str, candle: Dict[str, Any]) -> Tuple[bool, str, Dict[str, Any]]:
+        """Feed one new closed candle for an asset"""
+        stream = self.streams.get(asset)
+        if stream is None:
+            stream = self.streams[asset] = StochasticStream(self)
+        return stream.update(candle)
+    
+    def sync(self, asset: str, candles: List[Dict[str, Any]]) -> Tuple[bool, str, Dict[str, Any]]:
+        """
+        Feed the closed candles of a fetched window that the stream has not seen yet.
+        
+        If the window does not overlap the last candle consumed (first call or a
+        gap, e.g. after a reconnect) the stream is reseeded from the window.
+        
+        Args:
+            asset: Asset symbol
+            candles: Closed candles in chronological order, each with a 'timestamp'
+        
+        Returns:
+            Result for the most recent candle. If nothing is new, no signal is
+            returned together with the last indicator values
+        """
+        stream = self.streams.get(asset)
+        new_candles = candles
+        
+        if stream is not None:
+            timestamps = [candle.get('timestamp') for candle in candles]
+            if stream.last_timestamp is None:
+                stream = None
+            elif stream.last_timestamp in timestamps:
+                new_candles = candles[timestamps.index(stream.last_timestamp) + 1:]
+            elif candles and candles[-1]['timestamp'] < stream.last_timestamp:
+                new_candles = []
+            else:
+                logger.info(f"Candle gap detected for {asset}, reseeding stream")
+                stream = None
+        
+        if stream is None:
+            stream = self.streams[asset] = StochasticStream(self)
+        
+        if not new_candles:
+            # Nothing closed since the last call: report the indicators without a new signal
+            return False, "", stream.last_result[2]
+        
+        for candle in new_candles:
+            result = stream.update(candle)
+        return result
+    
+    def reset(self, asset: Optional[str] = None):
+        """Drop the state of one asset, or of every asset"""
+        if asset is None:
+            self.streams.clear()
+        else:
+            self.streams.pop(asset, None)
+
+
+def _divide(numerator: float, denominator: float) -> float:
+    """Float division with NumPy semantics for a zero denominator"""
+    if denominator == 0:
+        if numerator == 0 or numerator != numerator:
+            return math.nan
+        return math.copysign(math.inf, numerator) * math.copysign(1.0, denominator)
+    return numerator / denominator
@@ -0,0 +1,322 @@
+import logging
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger("robo-trader.stats")
+
+
+def _timestamp(operation: Dict[str, Any]) -> float:
+    value = operation.get("time")
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
+class StatsAccumulator:
+    """
+    Running statistics of a stream of settled trades, updated in O(1).
+
+    A result > 0 is a win, < 0 a loss and 0 a draw.
+    """
+
+    def __init__(self):
+        self.total_operations = 0
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.profit_loss = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.max_profit = 0.0
+        self.max_loss = 0.0
+        self.max_amount = 0.0
+        self.min_amount = float('inf')
+        self.total_amount = 0.0
+        self.peak = 0.0  # Highest cumulative profit/loss
+        self.max_drawdown = 0.0
+        self.streak = 0  # > 0 consecutive wins, < 0 consecutive losses
+        self.max_win_streak = 0
+        self.max_loss_streak = 0
+        self.first_time: Optional[float] = None
+        self.last_time: Optional[float] = None
+
+    def add(self, result: float, amount: float, timestamp: float):
+        # Plain comparisons rather than max()/min(): this runs for every
+        # window of every key of every settled trade
+        self.total_operations += 1
+        self.profit_loss += result
+        self.total_amount += amount
+        if amount > self.max_amount:
+            self.max_amount = amount
+        if amount < self.min_amount:
+            self.min_amount = amount
+
+        if result > 0:
+            self.wins += 1
+            self.gross_profit += result
+            if result > self.max_profit:
+                self.max_profit = result
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+            if self.streak > self.max_win_streak:
+                self.max_win_streak = self.streak
+        elif result < 0:
+            self.losses += 1
+            self.gross_loss -= result
+            if result < self.max_loss:
+                self.max_loss = result
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+            if -self.streak > self.max_loss_streak:
+                self.max_loss_streak = -self.streak
+        else:
+            self.draws += 1
+            self.streak = 0
+
+        if self.profit_loss > self.peak:
+            self.peak = self.profit_loss
+        elif self.peak - self.profit_loss > self.max_drawdown:
+            self.max_drawdown = self.peak - self.profit_loss
+
+        if self.first_time is None:
+            self.first_time = timestamp
+        self.last_time = timestamp
+
+    @property
+    def win_rate(self) -> float:
+        return (self.wins / self.total_operations) * 100 if self.total_operations else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_operations": self.total_operations,
+            "wins": self.wins,
+            "losses": self.losses,
+            "draws": self.draws,
+            "win_rate": self.win_rate,
+            "profit_loss": self.profit_loss,
+            "gross_profit": self.gross_profit,
+            "gross_loss": self.gross_loss,
+            "max_profit": self.max_profit,
+            "max_loss": self.max_loss,
+            "max_amount": self.max_amount,
+            "min_amount": self.min_amount if self.total_operations else 0,
+            "average_amount": self.total_amount / self.total_operations if self.total_operations else 0,
+            "max_drawdown": self.max_drawdown,
+            "current_streak": self.streak,
+            "max_win_streak": self.max_win_streak,
+            "max_loss_streak": self.max_loss_streak,
+            "first_time": self.first_time,
+            "last_time": self.last_time,
+        }
+
+
+class SlidingWindow:
+    """
+    Statistics of the last max_trades trades and/or the last max_seconds seconds.
+
+    Sums and counts are updated in O(1) as trades enter and leave the window;
+    the best and worst results use monotonic deques (amortized O(1)).
+    """
+
+    def __init__(self, max_trades: Optional[int] = None, max_seconds: Optional[float] = None):
+        self.max_trades = max_trades
+        self.max_seconds = max_seconds
+        self.trades: deque = deque()  # (sequence, timestamp, result, amount)
+        self._best: deque = deque()  # (sequence, result), results decreasing
+        self._worst: deque = deque()  # (sequence, result), results increasing
+        self._sequence = 0
+        self.wins = 0
+        self.losses = 0
+        self.profit_loss = 0.0
+        self.total_amount = 0.0
+
+    def add(self, result: float, amount: float, timestamp: float):
+        self._sequence += 1
+        self.trades.append((self._sequence, timestamp, result, amount))
+        self.wins += result > 0
+        self.losses += result < 0
+        self.profit_loss += result
+        self.total_amount += amount
+
+        while self._best and self._best[-1][1] <= result:
+            self._best.pop()
+        self._best.append((self._sequence, result))
+        while self._worst and self._worst[-1][1] >= result:
+            self._worst.pop()
+        self._worst.append((self._sequence, result))
+
+        self.expire(timestamp)
+
+    def _remove_oldest(self):
+        sequence, _, result, amount = self.trades.popleft()
+        self.wins -= result > 0
+        self.losses -= result < 0
+        self.profit_loss -= result
+        self.total_amount -= amount
+        if self._best and self._best[0][0] == sequence:
+            self._best.popleft()
+        if self._worst and self._worst[0][0] == sequence:
+            self._worst.popleft()
+
+    def expire(self, now: float):
+        """Drop the trades that left the window"""
+        if self.max_trades is not None:
+            while len(self.trades) > self.max_trades:
+                self._remove_oldest()
+        if self.max_seconds is not None:
+            while self.trades and self.trades[0][1] <= now - self.max_seconds:
+                self._remove_oldest()
+
+    def to_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        if now is not None:
+            self.expire(now)
+        count = len(self.trades)
+        if count == 0:
+            # Only rounding noise of the removed trades can be left
+            self.profit_loss = self.total_amount = 0.0
+        return {
+            "total_operations": count,
+            "wins": self.wins,
+            "losses": self.losses,
+            "draws": count - self.wins - self.losses,
+            "win_rate": (self.wins / count) * 100 if count else 0,
+            "profit_loss": self.profit_loss,
+            "max_profit": max(self._best[0][1], 0.0) if self._best else 0.0,
+            "max_loss": min(self._worst[0][1], 0.0) if self._worst else 0.0,
+            "average_amount": self.total_amount / count if count else 0,
+        }
+
+
+class TumblingWindow:
+    """Statistics per fixed period (hour, day, ...), keeping the last `keep` periods"""
+
+    def __init__(self, period: int, keep: int):
+        self.period = period
+        self.keep = keep
+        self.buckets: "OrderedDict[int, StatsAccumulator]" = OrderedDict()
+
+    def add(self, result: float, amount: float, timestamp: float):
+        start = int(timestamp // self.period) * self.period
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            bucket = self.buckets[start] = StatsAccumulator()
+            # Trades settle in time order, so new buckets are (almost) always the newest
+            if len(self.buckets) > 1 and start < next(reversed(self.buckets)):
+                self.buckets = OrderedDict(sorted(self.buckets.items()))
+            while len(self.buckets) > self.keep:
+                self.buckets.popitem(last=False)
+        bucket.add(result, amount, timestamp)
+
+    def to_list(self) -> list:
+        return [dict(stats.to_dict(), start=start) for start, stats in self.buckets.items()]
+
+
+class StatsAggregator:
+    """
+    Incremental trade statistics, overall, per asset and per direction.
+
+    Every key keeps its totals plus tumbling (hourly and daily, UTC) and
+    sliding (last N trades, last T seconds) windows, so any breakdown can be
+    read without rescanning the operation history. Adding a trade costs a
+    constant amount of work.
+    """
+
+    def __init__(self, last_trades: int = 20, last_seconds: float = 3600,
+                hours_kept: int = 48, days_kept: int = 30):
+        """
+        Initialize the aggregator
+
+        Args:
+            last_trades: Size of the trade-count sliding window
+            last_seconds: Length of the time sliding window in seconds
+            hours_kept: Number of hourly buckets kept
+            days_kept: Number of daily buckets kept
+        """
+        self.last_trades = last_trades
+        self.last_seconds = last_seconds
+        self.hours_kept = hours_kept
+        self.days_kept = days_kept
+        self.groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._windows: Dict[Tuple[str, str], Tuple[Any, ...]] = {}  # group values, for add()
+
+    def _new_group(self) -> Dict[str, Any]:
+        return {
+            "total": StatsAccumulator(),
+            "hourly": TumblingWindow(3600, self.hours_kept),
+            "daily": TumblingWindow(86400, self.days_kept),
+            "last_trades": SlidingWindow(max_trades=self.last_trades),
+            "last_seconds": SlidingWindow(max_seconds=self.last_seconds),
+        }
+
+    def _keys(self, operation: Dict[str, Any]) -> Iterable[Tuple[str, str]]:
+        yield ("all", "")
+        if operation.get("asset"):
+            yield ("asset", operation["asset"])
+        if operation.get("direction"):
+            yield ("direction", operation["direction"])
+
+    def add(self, operation: Dict[str, Any]):
+        """
+        Add a settled operation.
+
+        Args:
+            operation: Operation record with asset, direction, amount, result and time
+        """
+        result = float(operation["result"])
+        amount = float(operation.get("amount") or 0)
+        timestamp = _timestamp(operation)
+
+        for key in self._keys(operation):
+            windows = self._windows.get(key)
+            if windows is None:
+                group = self.groups[key] = self._new_group()
+                windows = self._windows[key] = tuple(group.values())
+            for window in windows:
+                window.add(result, amount, timestamp)
+
+    def load(self, operations: Iterable[Dict[str, Any]]):
+        """Add operations in chronological order (e.g. from the history store)"""
+        for operation in operations:
+            self.add(operation)
+
+    def clear(self):
+        self.groups.clear()
+        self._windows.clear()
+
+    def _group_dict(self, group: Dict[str, Any], now: float) -> Dict[str, Any]:
+        return {
+            "total": group["total"].to_dict(),
+            "hourly": group["hourly"].to_list(),
+            "daily": group["daily"].to_list(),
+            "last_trades": group["last_trades"].to_dict(),
+            "last_seconds": group["last_seconds"].to_dict(now),
+        }
+
+    def snapshot(self, asset: Optional[str] = None, direction: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Current statistics.
+
+        Args:
+            asset: Only return this asset's breakdown
+            direction: Only return this direction's breakdown
+
+        Returns:
+            Dictionary with the overall statistics and the per asset and per
+            direction breakdowns (each with totals and windows)
+        """
+        now = time.time()
+        empty = self._new_group()
+        result = {
+            "windows": {"last_trades": self.last_trades, "last_seconds": self.last_seconds},
+            "overall": self._group_dict(self.groups.get(("all", ""), empty), now),
+            "assets": {},
+            "directions": {},
+        }
+        for (kind, name), group in self.groups.items():
+            if kind == "asset" and asset in (None, name):
+                result["assets"][name] = self._group_dict(group, now)
+            elif kind == "direction" and direction in (None, name):
+                result["directions"][name] = self._group_dict(group, now)
+        return result
@@ -3,11 +3,17 @@
 // Configuration
 const API_URL = 'http://localhost:8000/api'
 const WS_URL = 'ws://localhost:8000/ws'
+const HISTORY_PAGE_SIZE = 50
 
 // Global state
 let selectedAssets = []
 let operationHistory = []
+let historyEtag = null
+let historyCursor = null // next_cursor of the oldest page shown (null: no older operations)
+let historyLimit = 0 // Operations kept in memory: one page per page shown
 let websocket = null
+let dashboardState = null
+let stateSeq = 0
 let isConnected = false
 let isRunning = false
 let availableAssets = {
@@ -37,8 +43,9 @@ document.addEventListener('DOMContentLoaded', () => {
 
 // Initialize the application
 function init() {
-  // Load saved history from local storage
+  // Show the saved history right away, then bring it up to date from the server
   loadHistoryFromLocalStorage()
+  syncHistory()
 
   // Set up event listeners
   setupEventListeners()
@@ -139,6 +146,9 @@ function setupEventListeners() {
   document
     .getElementById('clear-history')
     .addEventListener('click', clearHistory)
+  document
+    .getElementById('load-older-history')
+    .addEventListener('click', loadOlderHistory)
   document
     .getElementById('date-filter')
     .addEventListener('input', filterHistory)
@@ -516,29 +526,50 @@ function connectWebSocket() {
     websocket.close()
   }
 
-  websocket = new WebSocket(WS_URL)
+  // Delta protocol: a snapshot on connect, then only the changed fields
+  websocket = new WebSocket(`${WS_URL}?protocol=delta`)
+  dashboardState = null
 
   websocket.onopen = event => {
     addLogEntry('Conexão WebSocket estabelecida', 'info')
+
+    // Operations settled while disconnected only reach us through the history
+    syncHistory()
   }
 
   websocket.onmessage = event => {
     const data = JSON.parse(event.data)
 
-    if (data.type === 'update') {
-      updateDashboard(data.daily_result)
+    if (data.type === 'snapshot') {
+      dashboardState = data.state
+      stateSeq = data.seq
+      updateDashboard(dashboardState.daily_result)
+    } else if (data.type === 'delta') {
+      if (!dashboardState || data.seq !== stateSeq + 1) {
+        // Missed a delta: ask for a fresh snapshot
+        websocket.send('sync')
+        return
+      }
+      stateSeq = data.seq
+      mergeState(dashboardState, data.changes)
+      if (data.changes.daily_result) {
+        updateDashboard(dashboardState.daily_result)
+      }
+      if (data.changes.analysis) {
+        for (const asset of Object.keys(data.changes.analysis)) {
+          const analysis = dashboardState.analysis[asset]
+          addLogEntry(
+            `Análise para ${asset}: ${
+              analysis.signal ? analysis.direction.toUpperCase() : 'Sem sinal'
+            }`,
+            'info'
+          )
+        }
+      }
     } else if (data.type === 'operation') {
-      updateDashboard(data.daily_result)
       if (data.data && data.data.id) {
         addOperationToHistory(data.data)
       }
-    } else if (data.type === 'analysis') {
-      addLogEntry(
-        `Análise para ${data.asset}: ${
-          data.signal ? data.direction.toUpperCase() : 'Sem sinal'
-        }`,
-        'info'
-      )
     } else if (data.type === 'alert') {
       addLogEntry(data.message, 'warning')
       alert(data.message)
@@ -568,6 +599,23 @@ function connectWebSocket() {
   }, 30000)
 }
 
+// Apply the changed fields of a delta to the state (nested objects are merged)
+function mergeState(target, changes) {
+  for (const [key, value] of Object.entries(changes)) {
+    if (
+      value !== null &&
+      typeof value === 'object' &&
+      !Array.isArray(value) &&
+      target[key] !== null &&
+      typeof target[key] === 'object'
+    ) {
+      mergeState(target[key], value)
+    } else {
+      target[key] = value
+    }
+  }
+}
+
 // Update dashboard with new data
 function updateDashboard(data) {
   if (!data) return
@@ -593,7 +641,7 @@ function updateDashboard(data) {
   ).textContent = `R$ ${data.max_amount.toFixed(2)}`
 
   const minAmountElement = document.getElementById('min-amount')
-  if (data.min_amount !== Infinity) {
+  if (data.min_amount !== Infinity && data.min_amount !== null) {
     minAmountElement.textContent = `R$ ${data.min_amount.toFixed(2)}`
   } else {
     minAmountElement.textContent = `R$ 0.00`
@@ -621,7 +669,18 @@ function updateDashboard(data) {
 
 // Add a new operation to the history
 function addOperationToHistory(operation) {
+  // Already loaded by a history sync that raced the websocket
+  if (operationHistory.some(op => op.id === operation.id)) {
+    return
+  }
   operationHistory.push(operation)
+  historyEtag = null // The saved copy no longer matches a server version
+
+  // Keep memory flat: the oldest operation dropped is the next one to load
+  if (operationHistory.length > historyLimit) {
+    operationHistory = operationHistory.slice(-historyLimit)
+    historyCursor = operationHistory[0].id
+  }
 
   // Update table
   renderHistoryTable()
@@ -632,10 +691,15 @@ function addOperationToHistory(operation) {
 
 // Load operation history from local storage
 function loadHistoryFromLocalStorage() {
+  historyLimit = HISTORY_PAGE_SIZE
   const savedHistory = localStorage.getItem('operationHistory')
   if (savedHistory) {
     try {
-      operationHistory = JSON.parse(savedHistory)
+      // Older versions saved every operation as a bare array: revalidate those
+      const saved = JSON.parse(savedHistory)
+      operationHistory = saved.operations || []
+      historyCursor = saved.cursor || null
+      historyEtag = saved.etag || null
       renderHistoryTable()
     } catch (error) {
       console.error('Error loading history from local storage:', error)
@@ -643,15 +707,78 @@ function loadHistoryFromLocalStorage() {
   }
 }
 
-// Save operation history to local storage
+// Save the newest page of the history to local storage
 function saveHistoryToLocalStorage() {
-  localStorage.setItem('operationHistory', JSON.stringify(operationHistory))
+  const operations = operationHistory.slice(-HISTORY_PAGE_SIZE)
+  const cursor =
+    operations.length < operationHistory.length ? operations[0].id : historyCursor
+  // The ETag only validates the newest page as the server sent it
+  const etag = operations.length === operationHistory.length ? historyEtag : null
+  localStorage.setItem(
+    'operationHistory',
+    JSON.stringify({ operations, cursor, etag })
+  )
+}
+
+// Fetch one page of the history, newest first
+function fetchHistoryPage(cursor, etag) {
+  let url = `${API_URL}/history?order=desc&limit=${HISTORY_PAGE_SIZE}`
+  if (cursor !== null) {
+    url += `&cursor=${cursor}`
+  }
+  // The ETag is the history version: 304 means the copy shown is current
+  return fetch(url, { headers: etag ? { 'If-None-Match': etag } : {} })
+}
+
+// Bring the newest page of the history up to date from the server
+async function syncHistory() {
+  try {
+    const response = await fetchHistoryPage(null, historyEtag)
+    if (response.status === 304 || !response.ok) {
+      return
+    }
+
+    const page = await response.json()
+    operationHistory = page.history.reverse()
+    historyCursor = page.next_cursor
+    historyLimit = HISTORY_PAGE_SIZE
+    historyEtag = response.headers.get('ETag')
+    renderHistoryTable()
+    saveHistoryToLocalStorage()
+  } catch (error) {
+    console.error('Error loading history from the server:', error)
+  }
+}
+
+// Show the page of operations before the oldest one shown
+async function loadOlderHistory() {
+  if (historyCursor === null) {
+    return
+  }
+
+  try {
+    const response = await fetchHistoryPage(historyCursor, null)
+    if (!response.ok) {
+      return
+    }
+
+    const page = await response.json()
+    operationHistory = page.history.reverse().concat(operationHistory)
+    historyCursor = page.next_cursor
+    historyLimit += HISTORY_PAGE_SIZE
+    renderHistoryTable()
+  } catch (error) {
+    addLogEntry(`Erro ao carregar histórico: ${error.message}`, 'error')
+  }
 }
 
 // Render the history table
 function renderHistoryTable() {
   const historyBody = document.getElementById('history-body')
   historyBody.innerHTML = ''
+  document
+    .getElementById('load-older-history')
+    .classList.toggle('hidden', historyCursor === null)
 
   if (operationHistory.length === 0) {
     const noDataRow = document.createElement('tr')
@@ -717,6 +844,9 @@ async function clearHistory() {
 
     if (response.ok) {
       operationHistory = []
+      historyCursor = null
+      historyLimit = HISTORY_PAGE_SIZE
+      historyEtag = null
       renderHistoryTable()
 
       // Clear local storage
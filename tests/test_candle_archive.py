@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from meuRobo.candle_archive import NO_DATA, UNKNOWN, CandleArchive
+
+TIMEFRAME = 60
+
+
+def _candle(timestamp: int) -> dict:
+    return {'open': 1.0, 'high': 1.1, 'low': 0.9, 'close': 1.0, 'volume': 1.0, 'timestamp': timestamp}
+
+
+@pytest.fixture
+def start():
+    # Closed candles, well before the close margin
+    return (int(time.time()) // TIMEFRAME - 50) * TIMEFRAME
+
+
+def test_failed_fetch_leaves_slots_unknown(tmp_path, start):
+    archive = CandleArchive(str(tmp_path), chunk_size=10)
+    end = start + 29 * TIMEFRAME
+
+    def failing(asset, timeframe, count, end_time):
+        raise ConnectionError("timeout")
+
+    assert archive.fill("EURUSD", TIMEFRAME, start, end, failing) == 0
+    assert archive.view("EURUSD", TIMEFRAME, start, end, fetch=False)['timestamp'].tolist() == [UNKNOWN] * 30
+    assert archive.missing_segments("EURUSD", TIMEFRAME, start, end) == [(start, end)]
+
+    def answering(asset, timeframe, count, end_time):
+        return [_candle(end_time - i * timeframe) for i in range(count)]
+
+    # The next fill retries the range
+    assert archive.fill("EURUSD", TIMEFRAME, start, end, answering) == 30
+    assert archive.missing_segments("EURUSD", TIMEFRAME, start, end) == []
+
+
+def test_short_answer_marks_no_data(tmp_path, start):
+    archive = CandleArchive(str(tmp_path), chunk_size=10)
+    end = start + 9 * TIMEFRAME
+
+    def market_closed(asset, timeframe, count, end_time):
+        # Nothing before the last three candles
+        return [_candle(end_time - i * timeframe) for i in range(3)]
+
+    assert archive.fill("EURUSD", TIMEFRAME, start, end, market_closed) == 3
+    timestamps = archive.view("EURUSD", TIMEFRAME, start, end, fetch=False)['timestamp'].tolist()
+    assert timestamps == [NO_DATA] * 7 + [start + i * TIMEFRAME for i in range(7, 10)]
+    assert archive.missing_segments("EURUSD", TIMEFRAME, start, end) == []
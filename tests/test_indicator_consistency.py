@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from meuRobo.indicator_graph import CLOSE, IndicatorGraph, sma, stochastic_d, stochastic_k
+from meuRobo.strategy import StochasticStrategy, StreamingStochasticStrategy
+
+PARAMS = [
+    dict(k_period=14, d_period=3, slowing=3, sma_period=20),
+    dict(k_period=5, d_period=3, slowing=1, sma_period=10),
+    dict(k_period=9, d_period=5, slowing=5, sma_period=50),
+]
+
+
+def _candles(seed: int, count: int = 300) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0005, count))
+    spread = np.abs(rng.normal(0, 0.0003, count))
+    return pd.DataFrame({
+        'open': close + rng.normal(0, 0.0001, count),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': np.ones(count),
+        'timestamp': np.arange(count) * 60,
+    })
+
+
+def _pandas_indicators(df: pd.DataFrame, k_period, d_period, slowing, sma_period):
+    """The indicators as StochasticStrategy computed them with pandas"""
+    highest_high = df['high'].rolling(window=k_period).max()
+    lowest_low = df['low'].rolling(window=k_period).min()
+    k = 100 * ((df['close'] - lowest_low) / (highest_high - lowest_low))
+    if slowing > 1:
+        k = k.rolling(window=slowing).mean()
+    d = k.rolling(window=d_period).mean()
+    return k.to_numpy(), d.to_numpy(), df['close'].rolling(window=sma_period).mean().to_numpy()
+
+
+def _same(left, right) -> bool:
+    """Equality of analysis results, floats to within rounding and NaN equal to NaN"""
+    if isinstance(left, float) and isinstance(right, float):
+        return math.isclose(left, right, rel_tol=1e-9, abs_tol=1e-9) or (math.isnan(left) and math.isnan(right))
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(_same(left[key], right[key]) for key in left)
+    if isinstance(left, tuple) and isinstance(right, tuple):
+        return len(left) == len(right) and all(_same(a, b) for a, b in zip(left, right))
+    return left == right
+
+
+@pytest.mark.parametrize("params", PARAMS)
+@pytest.mark.parametrize("seed", range(3))
+def test_graph_matches_pandas(params, seed):
+    df = _candles(seed)
+    k, d, trend = _pandas_indicators(df, **params)
+    graph = IndicatorGraph(df)
+
+    np.testing.assert_allclose(graph[stochastic_k(params['k_period'], params['slowing'])], k, atol=1e-9)
+    np.testing.assert_allclose(
+        graph[stochastic_d(params['k_period'], params['slowing'], params['d_period'])], d, atol=1e-9)
+    np.testing.assert_allclose(graph[sma(CLOSE, params['sma_period'])], trend, atol=1e-12)
+
+
+@pytest.mark.parametrize("params", PARAMS)
+@pytest.mark.parametrize("seed", range(3))
+def test_stream_matches_analyze(params, seed):
+    df = _candles(seed, 150)
+    strategy = StochasticStrategy(upper_threshold=60, lower_threshold=40, **params)
+    streaming = StreamingStochasticStrategy(upper_threshold=60, lower_threshold=40, **params)
+
+    for end, candle in enumerate(df.to_dict('records'), start=1):
+        streamed = streaming.update("EURUSD", candle)
+        if end < 2:
+            continue
+        assert _same(streamed, strategy.analyze(df.iloc[:end]))
+
+
+@pytest.mark.parametrize("params", PARAMS)
+def test_batch_matches_analyze(params):
+    frames = [_candles(seed, 120) for seed in range(4)]
+    strategy = StochasticStrategy(upper_threshold=60, lower_threshold=40, **params)
+    assets = [f"A{i}" for i in range(len(frames))]
+    block = {field: np.stack([df[field].to_numpy() for df in frames]) for field in ('high', 'low', 'close')}
+
+    signals, indicators = strategy.signal_arrays(block['high'], block['low'], block['close'])
+    for row, df in enumerate(frames):
+        row_signals, row_indicators = strategy.signal_arrays(
+            df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy())
+        np.testing.assert_array_equal(signals[row], row_signals)
+        for name in ('%K', '%D', 'SMA'):
+            np.testing.assert_array_equal(indicators[name][row], row_indicators[name])
+
+    batch = strategy.analyze_batch(assets, block)
+    for asset, df in zip(assets, frames):
+        signal, direction, values = strategy.analyze(df)
+        assert batch[asset][:2] == (signal, direction)
+        assert batch[asset][2]["stochastic_k"] == values["stochastic_k"]
+        assert batch[asset][2]["stochastic_d"] == values["stochastic_d"]
+        assert batch[asset][2]["sma"] == values["sma"]
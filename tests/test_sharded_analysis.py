@@ -0,0 +1,27 @@
+import numpy as np
+
+from meuRobo.sharded_analysis import ShardedAnalyzer
+from meuRobo.strategy import StochasticStrategy
+
+
+def _candles(seed: int, count: int = 60) -> list:
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0005, count))
+    spread = np.abs(rng.normal(0, 0.0003, count))
+    return [{'open': float(c), 'high': float(c + s), 'low': float(c - s), 'close': float(c),
+             'volume': 1.0, 'timestamp': i * 60}
+            for i, (c, s) in enumerate(zip(close, spread))]
+
+
+def test_sharded_matches_analyze_batch():
+    strategy = StochasticStrategy(upper_threshold=60, lower_threshold=40)
+    candles = {f"A{i}": _candles(i) for i in range(8)}
+    assets, block = StochasticStrategy.build_ohlc_block(candles)
+
+    analyzer = ShardedAnalyzer(strategy, workers=2)
+    try:
+        for asset in assets:
+            analyzer.update(asset, candles[asset])
+        assert analyzer.analyze(assets) == strategy.analyze_batch(assets, block)
+    finally:
+        analyzer.close()